@@ -0,0 +1,7 @@
+"""
+Performance benchmarks of the onemsdk conversion pipeline. They are not part of
+the test suite, run them from the repository root, e.g.:
+
+    python -m benchmarks --output results.json
+    python -m benchmarks.node
+"""
@@ -0,0 +1,81 @@
+"""
+Runs the benchmarks of every conversion stage and prints the results, which
+can also be exported as json to compare the SDK versions:
+
+    python -m benchmarks --output results.json
+    python -m benchmarks --sizes 10 100 --stage build_node --stage Response.json
+"""
+import argparse
+import json
+import platform
+import statistics
+import sys
+import timeit
+from datetime import datetime
+from os.path import abspath, dirname, join
+
+from .stages import cases
+
+BASE_DIR = dirname(dirname(abspath(__file__)))
+
+
+def _sdk_version() -> str:
+    with open(join(BASE_DIR, 'VERSION')) as f:
+        return f.read().strip()
+
+
+def measure(func, repeat: int, min_time: float) -> dict:
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    number = max(1, int(number * min_time / 0.2))
+    timings = [t / number for t in timer.repeat(repeat=repeat, number=number)]
+    return {
+        'number': number,
+        'repeat': repeat,
+        'min': min(timings),
+        'median': statistics.median(timings),
+        'mean': statistics.mean(timings),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000, 10000],
+                        help='number of <li> (or of form steps x 10) per document')
+    parser.add_argument('--stage', action='append',
+                        help='run only this stage, may be repeated')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--min-time', type=float, default=0.2,
+                        help='minimum duration in seconds of each repetition')
+    parser.add_argument('--output', help='write the results as json to this file')
+    args = parser.parse_args(argv)
+
+    results = []
+    for case in cases(args.sizes):
+        if args.stage and case.stage not in args.stage:
+            continue
+        result = {
+            'stage': case.stage,
+            'document': case.document,
+            'size': case.size,
+            'html_bytes': case.html_bytes,
+            **measure(case.func, args.repeat, args.min_time),
+        }
+        results.append(result)
+        print(f'{case.stage:<30}{case.document:<14}{case.size:>7}'
+              f'{result["min"] * 1000:>12.3f} ms', flush=True)
+
+    if args.output:
+        report = {
+            'onemsdk_version': _sdk_version(),
+            'python_version': platform.python_version(),
+            'platform': platform.platform(),
+            'date': datetime.utcnow().isoformat(timespec='seconds') + 'Z',
+            'results': results,
+        }
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
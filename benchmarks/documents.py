@@ -0,0 +1,70 @@
+""" Generators of ONEm html documents of parametrized sizes """
+
+
+def menu_html(items: int) -> str:
+    lis = ''.join(
+        f'<li value="opt-{i}" text-search="Option {i}">'
+        f'<a href="/route-{i}">Option {i}</a></li>\n'
+        for i in range(items)
+    )
+    return (f'<section auto-select>\n'
+            f'<header>Menu of {items} options</header>\n'
+            f'<p>Choose an option</p>\n'
+            f'<ul>\n{lis}</ul>\n'
+            f'<footer>Reply A-Z</footer>\n'
+            f'</section>\n')
+
+
+def form_html(sections: int) -> str:
+    body = []
+    for i in range(sections):
+        if i % 2:
+            body.append(
+                f'<section name="step-{i}" required>\n'
+                f'<header>Step {i}</header>\n'
+                f'<label>Enter a number</label>\n'
+                f'<input type="number" min="1" max="100" step="1" '
+                f'min-error="Too small" max-error="Too big"/>\n'
+                f'<footer>Reply with a number</footer>\n'
+                f'</section>\n'
+            )
+        else:
+            body.append(
+                f'<section name="step-{i}" auto-select numbered>\n'
+                f'<header>Step {i}</header>\n'
+                f'<ul>\n'
+                f'<li value="yes-{i}">Yes</li>\n'
+                f'<li value="no-{i}">No</li>\n'
+                f'</ul>\n'
+                f'</section>\n'
+            )
+    return (f'<form action="/form" header="Form of {sections} steps">\n'
+            f'{"".join(body)}'
+            f'</form>\n')
+
+
+def form_menu_html(options: int, lists: int = 1) -> str:
+    """ A form with a single step choosing one of many options, split in
+    `lists` <ul>
+    """
+    per_list = -(-options // lists)
+    uls = ''.join(
+        '<ul>\n' +
+        ''.join(f'<li value="opt-{i}">Option {i}</li>\n'
+                for i in range(start, min(start + per_list, options))) +
+        '</ul>\n'
+        for start in range(0, options, per_list)
+    )
+    return (f'<form action="/form">\n'
+            f'<section name="choice" auto-select>\n'
+            f'<header>Choose one of {options} options</header>\n'
+            f'{uls}'
+            f'<footer>Reply with a letter</footer>\n'
+            f'</section>\n'
+            f'</form>\n')
+
+
+def long_section_html(children: int) -> str:
+    """ A section made of many paragraphs, line breaks and text nodes """
+    body = ''.join(f'<p>Paragraph {i}</p>\nText {i}\n<br/>\n' for i in range(children))
+    return f'<section>\n<header>Long section</header>\n{body}</section>\n'
@@ -0,0 +1,53 @@
+"""
+Checks that `FormItem.from_tag` scales linearly with the number of options of
+a form-menu, up to 100k options, in one <ul> and split in 10 <ul>. The walk of
+the <section> as it was before the dispatch tables, which went over the first
+<ul> again for each <ul>, is timed for reference.
+
+    python -m benchmarks.form_menu
+"""
+import gc
+import timeit
+import tracemalloc
+
+from onemsdk.parser import load_html
+from onemsdk.schema.v1 import FormItem
+
+from .documents import form_menu_html
+from .visitor import isinstance_form_menu
+
+SIZES = (1000, 10000, 100000)
+
+
+def best_time(func, number: int) -> float:
+    return min(timeit.repeat(func, number=number, repeat=3)) / number
+
+
+def allocated_blocks(func) -> int:
+    """ The number of memory blocks allocated by `func` and still alive """
+    gc.collect()
+    tracemalloc.start()
+    before = sum(stat.count for stat in tracemalloc.take_snapshot().statistics('filename'))
+    result = func()
+    after = sum(stat.count for stat in tracemalloc.take_snapshot().statistics('filename'))
+    tracemalloc.stop()
+    del result
+    return after - before
+
+
+def main():
+    print(f'{"options":>8}{"lists":>7}{"before ms":>12}{"after ms":>11}'
+          f'{"after us/option":>17}{"blocks/option":>15}')
+    for lists in (1, 10):
+        for options in SIZES:
+            section = load_html(html_str=form_menu_html(options, lists)).children[0]
+            number = max(1, 10000 // options)
+            before = best_time(lambda: isinstance_form_menu(section), number)
+            after = best_time(lambda: FormItem.from_tag(section), number)
+            blocks = allocated_blocks(lambda: FormItem.from_tag(section))
+            print(f'{options:>8}{lists:>7}{before * 1000:>12.2f}{after * 1000:>11.2f}'
+                  f'{after * 1e6 / options:>17.3f}{blocks / options:>15.2f}')
+
+
+if __name__ == '__main__':
+    main()
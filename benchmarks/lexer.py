@@ -0,0 +1,45 @@
+"""
+Compares the parsing of the documents by the `html.parser` based `Parser`
+and by the `Lexer` of `onemsdk.parser.lexer`.
+
+    python -m benchmarks.lexer
+"""
+import os
+import timeit
+
+from onemsdk.parser.util import build_node
+
+from .documents import form_html, form_menu_html, menu_html
+
+STATIC_DIR = os.path.join(os.path.dirname(__file__), os.pardir, 'tests', 'static')
+
+
+def documents():
+    for name in ('index.html', 'form-big.html'):
+        with open(os.path.join(STATIC_DIR, name)) as f:
+            yield name, f.read()
+    for size in (100, 1000, 10000):
+        yield f'menu {size}', menu_html(size)
+    for size in (10, 100, 1000):
+        yield f'form {size}', form_html(size)
+    yield 'form-menu 10000', form_menu_html(10000)
+
+
+def best_time(parser: str, html: str, number: int) -> float:
+    return min(timeit.repeat(lambda: build_node(html, parser), number=number,
+                             repeat=5)) / number
+
+
+def main():
+    print(f'{"document":<18}{"size":>10}{"html.parser ms":>16}{"lexer ms":>10}'
+          f'{"speedup":>9}')
+    for document, html in documents():
+        number = max(1, 200000 // len(html))
+        before = best_time('html.parser', html, number)
+        after = best_time('lexer', html, number)
+        print(f'{document:<18}{len(html):>10}{before * 1000:>16.3f}{after * 1000:>10.3f}'
+              f'{before / after:>8.1f}x')
+
+
+if __name__ == '__main__':
+    main()
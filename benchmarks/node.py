@@ -0,0 +1,71 @@
+"""
+Compares the parser built on the pydantic `Node` with the one built on the
+slotted `LightNode`: parsing throughput and memory held by the node tree.
+
+    python -m benchmarks.node
+"""
+import gc
+import timeit
+import tracemalloc
+
+from onemsdk.parser.node import Node
+from onemsdk.parser.util import Parser, build_node
+
+from .documents import menu_html, form_html
+
+
+class PydanticNodeParser(Parser):
+    """ The parser as it was before `LightNode` """
+
+    def handle_starttag(self, tag, attrs):
+        if self.node:
+            raise Exception('Only one root tag permitted')
+
+        tag_obj = Node(tag=tag, attrs=dict(attrs))
+
+        if not self.stack.is_empty():
+            self.stack.peek().add_child(tag_obj)
+
+        self.stack.push(tag_obj)
+
+    def handle_startendtag(self, tag, attrs):
+        self.stack.peek().add_child(Node(tag=tag, attrs=dict(attrs)))
+
+
+def build_pydantic_node(html: str) -> Node:
+    parser = PydanticNodeParser()
+    parser.feed(html)
+    return parser.node
+
+
+def retained_bytes(build, html: str) -> int:
+    gc.collect()
+    tracemalloc.start()
+    node = build(html)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del node
+    return size
+
+
+def best_time(build, html: str, number: int) -> float:
+    return min(timeit.repeat(lambda: build(html), number=number, repeat=5)) / number
+
+
+def main():
+    documents = [('menu', n, menu_html(n)) for n in (100, 1000, 10000)]
+    documents += [('form', n, form_html(n)) for n in (10, 100, 1000)]
+
+    print(f'{"document":<12}{"size":>10}{"Node ms":>12}{"LightNode ms":>14}'
+          f'{"Node KiB":>12}{"LightNode KiB":>15}')
+    for kind, n, html in documents:
+        number = max(1, 2000 // n)
+        print(f'{kind + " " + str(n):<12}{len(html):>10}'
+              f'{best_time(build_pydantic_node, html, number) * 1000:>12.2f}'
+              f'{best_time(build_node, html, number) * 1000:>14.2f}'
+              f'{retained_bytes(build_pydantic_node, html) / 1024:>12.0f}'
+              f'{retained_bytes(build_node, html) / 1024:>15.0f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""
+The benchmarks of each conversion stage: every stage is timed on its own, with
+the input built by the previous stages prepared in advance.
+"""
+from typing import Callable, Iterator, NamedTuple
+
+from onemsdk.parser import frozen, get_tag_cls
+from onemsdk.parser.util import build_node
+from onemsdk.schema.v1 import Form, Menu, Response
+
+from .documents import form_html, form_menu_html, long_section_html, menu_html
+
+
+class Case(NamedTuple):
+    stage: str
+    document: str
+    size: int
+    html_bytes: int
+    func: Callable[[], object]
+
+
+def _documents(sizes):
+    for size in sizes:
+        yield 'menu', size, menu_html(size)
+    for size in sizes:
+        yield 'long-section', size, long_section_html(size)
+    for size in sizes:
+        # A form step per option would be a too big document
+        yield 'form', max(1, size // 10), form_html(max(1, size // 10))
+    for size in sizes:
+        yield 'form-menu', size, form_menu_html(size)
+
+
+def _tag(html: str):
+    node = build_node(html)
+    return get_tag_cls(node.tag).from_node(node)
+
+
+def _frozen(func: Callable[[], object]) -> Callable[[], object]:
+    """ Calls `func` in the frozen mode, the rendered texts are cached """
+    def frozen_func():
+        with frozen():
+            return func()
+    return frozen_func
+
+
+def _middleware(html: str) -> Callable[[], object]:
+    try:
+        from django.conf import settings
+        from django.http import HttpResponse
+    except ImportError:
+        return None
+
+    if not settings.configured:
+        settings.configure(DEFAULT_CHARSET='utf-8')
+
+    from django.test import RequestFactory
+
+    from onemsdk.contrib.django import HtmlToOnemResponseMiddleware
+
+    content = html.encode('utf-8')
+    middleware = HtmlToOnemResponseMiddleware(lambda request: HttpResponse(content))
+    request = RequestFactory().get('/')
+    return lambda: middleware(request)
+
+
+def cases(sizes) -> Iterator[Case]:
+    for document, size, html in _documents(sizes):
+        node = build_node(html)
+        tag_cls = get_tag_cls(node.tag)
+        tag = tag_cls.from_node(node)
+        response = Response.from_tag(tag)
+
+        def case(stage, func):
+            return Case(stage, document, size, len(html.encode('utf-8')), func)
+
+        yield case('build_node', lambda html=html: build_node(html))
+        yield case('Tag.from_node', lambda node=node: tag_cls.from_node(node))
+        yield case(f'{tag_cls.__name__}.render', tag.render)
+        yield case(f'{tag_cls.__name__}.render frozen', _frozen(tag.render))
+        if document in ('menu', 'long-section'):
+            yield case('Menu.from_tag', lambda tag=tag: Menu.from_tag(tag))
+        else:
+            yield case('Form.from_tag', lambda tag=tag: Form.from_tag(tag))
+        yield case('Response.json', response.json)
+        yield case('load_html+Response.json',
+                   lambda html=html: Response.from_tag(_tag(html)).json())
+
+        middleware = _middleware(html)
+        if middleware is not None:
+            yield case('HtmlToOnemResponseMiddleware', middleware)
@@ -0,0 +1,182 @@
+"""
+Compares the tree walkers built on the `TagDispatcher` tables with the
+`isinstance` chains they replaced, on wide sections and form-menus.
+
+    python -m benchmarks.visitor
+"""
+import timeit
+
+from onemsdk.parser import (ATag, FooterTag, HeaderTag, LiTag, PTag, SectionTag, UlTag,
+                            load_html)
+from onemsdk.schema.v1 import (FormItem, FormItemType, Menu, MenuFormItemMeta, MenuItem,
+                               MenuItemFormItem, MenuMeta)
+
+from .documents import form_menu_html, long_section_html, menu_html
+
+
+def isinstance_render(section: SectionTag, exclude_header: bool = False,
+                      exclude_footer: bool = False) -> str:
+    """ `SectionTag.render` as it was before the dispatch tables """
+    rendered_children = ['\n']
+
+    for child in section.children:
+        if isinstance(child, HeaderTag) and exclude_header:
+            continue
+        if isinstance(child, FooterTag) and exclude_footer:
+            continue
+
+        if isinstance(child, str):
+            text = child
+        else:
+            text = child.render()
+
+        if text:
+            if isinstance(child, PTag) or isinstance(child, UlTag):
+                if rendered_children[-1] != '\n':
+                    rendered_children.append('\n')
+                rendered_children.append(text)
+                rendered_children.append('\n')
+            else:
+                rendered_children.append(text)
+
+    del rendered_children[0]
+    if rendered_children and rendered_children[-1] == '\n':
+        del rendered_children[-1]
+    return ''.join(rendered_children)
+
+
+def isinstance_menu_item(tag) -> MenuItem:
+    if isinstance(tag, str):
+        description = tag
+    else:
+        description = tag.render()
+    if not description:
+        return None
+
+    method = None
+    path = None
+    text_search = None
+    if isinstance(tag, LiTag):
+        child = tag.children[0]
+        if isinstance(child, ATag):
+            method = child.attrs.method
+            path = child.attrs.href
+            text_search = tag.attrs.text_search
+
+    return MenuItem(description=description, text_search=text_search, method=method,
+                    path=path)
+
+
+def isinstance_menu(section: SectionTag) -> Menu:
+    """ `Menu.from_tag` as it was before the dispatch tables """
+    body = []
+    header = None
+    footer = None
+
+    for child in section.children:
+        if isinstance(child, UlTag):
+            body.extend([isinstance_menu_item(li) for li in child.children])
+        elif isinstance(child, HeaderTag):
+            header = child.render()
+        elif isinstance(child, FooterTag):
+            footer = child.render()
+        else:
+            body.append(isinstance_menu_item(child))
+
+    return Menu(body=list(filter(None, body)), header=header or section.attrs.header,
+                footer=footer or section.attrs.footer,
+                meta=MenuMeta(auto_select=section.attrs.auto_select))
+
+
+def isinstance_menu_item_form_item(tag) -> MenuItemFormItem:
+    if isinstance(tag, str):
+        description = tag
+    else:
+        description = tag.render()
+    if not description:
+        return None
+
+    value = None
+    text_search = None
+    if isinstance(tag, LiTag):
+        value = tag.attrs.value
+        text_search = tag.attrs.text_search
+
+    return MenuItemFormItem(value=value, description=description,
+                            text_search=text_search)
+
+
+def isinstance_form_menu(section: SectionTag) -> FormItem:
+    """ `FormItem.from_tag` for a form-menu as it was before the dispatch
+    tables: the <section> is walked again from its first <ul>
+    """
+    body = []
+    for child in section.children:
+        if isinstance(child, UlTag):
+            for child2 in section.children:
+                if isinstance(child2, UlTag):
+                    for li in child.children:
+                        item = isinstance_menu_item_form_item(li)
+                        if item:
+                            body.append(item)
+                elif isinstance(child2, HeaderTag):
+                    pass
+                elif isinstance(child2, FooterTag):
+                    pass
+                else:
+                    item = isinstance_menu_item_form_item(child2)
+                    if item:
+                        body.append(item)
+            break
+
+    header = None
+    footer = None
+    if isinstance(section.children[0], HeaderTag):
+        header = section.children[0].render()
+    if isinstance(section.children[-1], FooterTag):
+        footer = section.children[-1].render()
+
+    return FormItem(
+        type=FormItemType.form_menu, name=section.attrs.name, body=body,
+        header=header or section.attrs.header, footer=footer or section.attrs.footer,
+        meta=MenuFormItemMeta(auto_select=section.attrs.auto_select,
+                              multi_select=section.attrs.multi_select,
+                              numbered=section.attrs.numbered),
+        method=section.attrs.method, required=section.attrs.required,
+        status_exclude=section.attrs.status_exclude,
+        status_prepend=section.attrs.status_prepend,
+    )
+
+
+def best_time(func, number: int) -> float:
+    return min(timeit.repeat(func, number=number, repeat=5)) / number
+
+
+def main():
+    cases = []
+    for n in (100, 1000, 10000):
+        number = max(1, 2000 // n)
+        long_section = load_html(html_str=long_section_html(n))
+        menu = load_html(html_str=menu_html(n))
+        form_section = load_html(html_str=form_menu_html(n)).children[0]
+        cases += [
+            ('SectionTag.render', f'long section {n}', number,
+             lambda s=long_section: isinstance_render(s), long_section.render),
+            ('Menu.from_tag', f'long section {n}', number,
+             lambda s=long_section: isinstance_menu(s),
+             lambda s=long_section: Menu.from_tag(s)),
+            ('Menu.from_tag', f'menu {n}', number,
+             lambda s=menu: isinstance_menu(s), lambda s=menu: Menu.from_tag(s)),
+            ('FormItem.from_tag', f'form-menu {n}', number,
+             lambda s=form_section: isinstance_form_menu(s),
+             lambda s=form_section: FormItem.from_tag(s)),
+        ]
+
+    print(f'{"stage":<20}{"document":<20}{"isinstance ms":>15}{"dispatch ms":>13}')
+    for stage, document, number, before, after in cases:
+        print(f'{stage:<20}{document:<20}{best_time(before, number) * 1000:>15.3f}'
+              f'{best_time(after, number) * 1000:>13.3f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+import pickle
+from concurrent.futures import (Executor, ProcessPoolExecutor, ThreadPoolExecutor,
+                                as_completed)
+from typing import (Any, Callable, Dict, Iterable, Iterator, NamedTuple, Optional, Tuple,
+                    Union)
+
+from onemsdk.config import get_static_dir, set_static_dir
+from onemsdk.exceptions import ONEmSDKException
+from onemsdk.parser.compiler import compile_html_json, compile_template_json
+from onemsdk.parser.limits import ParseLimits, get_parse_limits, set_parse_limits
+from onemsdk.parser.util import load_html
+
+__all__ = ['BatchResult', 'load_html_many', 'render_responses']
+
+TemplateItem = Tuple[str, Dict[str, Any]]
+
+
+class BatchResult(NamedTuple):
+    """ The outcome of one item of a batch: either `value` or `error` is set """
+    index: int
+    value: Any
+    error: Optional[BaseException]
+
+
+def _portable_error(error: BaseException) -> BaseException:
+    # Not all the exceptions survive the trip back from a worker process
+    try:
+        pickle.loads(pickle.dumps(error))
+        return error
+    except Exception:
+        return ONEmSDKException(f'{type(error).__name__}: {error}')
+
+
+def _run(func: Callable[[Any], Any], index: int, item: Any,
+         worker_config: Optional[Tuple[Optional[str], ParseLimits]]) -> BatchResult:
+    in_process = worker_config is not None
+    try:
+        if in_process:
+            _init_worker(*worker_config)
+        return BatchResult(index, func(item), None)
+    except (ONEmSDKException, Exception) as e:
+        return BatchResult(index, None, _portable_error(e) if in_process else e)
+
+
+def _worker_config() -> Tuple[Optional[str], ParseLimits]:
+    """ The configuration of this process, which the worker processes may not
+    inherit. It is sent with each task, `ProcessPoolExecutor` has no
+    initializer before Python 3.7
+    """
+    return get_static_dir(), get_parse_limits()
+
+
+def _init_worker(static_dir: Optional[str], parse_limits: ParseLimits) -> None:
+    """ Sets the configuration of this process in a worker process """
+    if static_dir and static_dir != get_static_dir():
+        set_static_dir(static_dir)
+    if parse_limits != get_parse_limits():
+        set_parse_limits(*parse_limits)
+
+
+def _load_html(html: str):
+    return load_html(html_str=html)
+
+
+def _render_response(item: Union[str, TemplateItem]) -> str:
+    if isinstance(item, str):
+        return compile_html_json(item)
+    template_file, data = item
+    return compile_template_json(template_file, **data)
+
+
+def _run_batch(func: Callable[[Any], Any], items: Iterable[Any],
+               executor: Optional[Executor], max_workers: Optional[int],
+               use_threads: bool, ordered: bool) -> Iterator[BatchResult]:
+    own_executor = executor is None
+    if own_executor:
+        if use_threads:
+            executor = ThreadPoolExecutor(max_workers=max_workers)
+        else:
+            executor = ProcessPoolExecutor(max_workers=max_workers)
+    worker_config = None
+    if isinstance(executor, ProcessPoolExecutor):
+        worker_config = _worker_config()
+
+    try:
+        futures = [executor.submit(_run, func, index, item, worker_config)
+                   for index, item in enumerate(items)]
+        for future in (futures if ordered else as_completed(futures)):
+            yield future.result()
+    finally:
+        if own_executor:
+            executor.shutdown(wait=True)
+
+
+def load_html_many(html_strs: Iterable[str], *, executor: Executor = None,
+                   max_workers: int = None, use_threads: bool = False,
+                   ordered: bool = True) -> Iterator[BatchResult]:
+    """ Builds the tag trees of many html documents in parallel
+
+    By default the work is done by a new `ProcessPoolExecutor` of
+    `max_workers` processes, `use_threads=True` uses threads instead and
+    `executor` any existing executor. The results are yielded in the order of
+    the documents, or as they complete if `ordered=False`. The error of a
+    document is returned in its `BatchResult` and does not stop the batch.
+    """
+    return _run_batch(_load_html, html_strs, executor, max_workers, use_threads,
+                      ordered)
+
+
+def render_responses(items: Iterable[Union[str, TemplateItem]], *,
+                     executor: Executor = None, max_workers: int = None,
+                     use_threads: bool = False,
+                     ordered: bool = True) -> Iterator[BatchResult]:
+    """ Converts many html documents or `(template_file, data)` pairs into
+    `Response` json strings in parallel, see `load_html_many`
+    """
+    return _run_batch(_render_response, items, executor, max_workers, use_threads,
+                      ordered)
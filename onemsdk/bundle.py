@@ -0,0 +1,179 @@
+"""
+A bundle is a single file holding many named, pre-serialized `Response` json
+documents. It is memory mapped, so the workers of a server share its pages
+through the page cache instead of each holding a copy of the documents.
+
+Layout (little endian):
+
+- header: magic `ONEMBNDL`, version (u16), reserved (u16), entry count (u32)
+- index, sorted by name: offset (u64), length (u32), name length (u16), name
+  (utf-8)
+- the documents
+
+This module does not import the parser nor the schema models.
+"""
+import io
+import mmap
+import os
+import struct
+import tempfile
+from typing import Dict, Iterable, Iterator, Tuple
+
+from onemsdk.exceptions import ONEmSDKException
+
+__all__ = ['ResponseBundle', 'BundleSlice', 'write_bundle']
+
+MAGIC = b'ONEMBNDL'
+VERSION = 1
+
+_HEADER = struct.Struct('<8sHHI')
+_ENTRY = struct.Struct('<QIH')
+
+
+def write_bundle(path: str, documents: Iterable[Tuple[str, bytes]]) -> None:
+    """ Writes the `(name, json)` documents into a bundle file. The file is
+    replaced atomically, so the bundles already opened keep their content
+    """
+    documents = sorted(documents)
+    names = [name.encode('utf-8') for name, _ in documents]
+    if len(set(names)) != len(names):
+        raise ONEmSDKException('The names of the bundled documents must be unique')
+
+    offset = _HEADER.size + sum(_ENTRY.size + len(name) for name in names)
+    index = []
+    for name, (_, content) in zip(names, documents):
+        index.append(_ENTRY.pack(offset, len(content), len(name)) + name)
+        offset += len(content)
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.bundle-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(_HEADER.pack(MAGIC, VERSION, 0, len(documents)))
+            f.writelines(index)
+            for _, content in documents:
+                f.write(content)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+class ResponseBundle:
+    """ A memory mapped bundle file. `get` returns `memoryview` slices of the
+    mapping, which must be released before the bundle is closed
+    """
+
+    def __init__(self, path: str):
+        self.path = os.path.abspath(path)
+        with open(self.path, 'rb') as f:
+            self._stat = os.fstat(f.fileno())
+            if self._stat.st_size < _HEADER.size:
+                raise ONEmSDKException(f'{self.path} is not a response bundle')
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+        self._index = self._read_index()
+
+    def _read_index(self) -> Dict[str, Tuple[int, int]]:
+        magic, version, _, count = _HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise ONEmSDKException(f'{self.path} is not a response bundle')
+        if version != VERSION:
+            raise ONEmSDKException(f'Unsupported bundle version {version}')
+
+        index = {}
+        position = _HEADER.size
+        for _ in range(count):
+            offset, length, name_length = _ENTRY.unpack_from(self._mmap, position)
+            position += _ENTRY.size
+            name = bytes(self._view[position:position + name_length]).decode('utf-8')
+            position += name_length
+            index[name] = (offset, length)
+        return index
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._index
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._index)
+
+    def locate(self, name: str) -> Tuple[int, int]:
+        """ The (offset, length) of a document in the bundle file """
+        try:
+            return self._index[name]
+        except KeyError:
+            raise ONEmSDKException(f'{name} is not in the bundle')
+
+    def get(self, name: str) -> memoryview:
+        """ The json of a document, without copying it """
+        offset, length = self.locate(name)
+        return self._view[offset:offset + length]
+
+    def open_slice(self, name: str) -> 'BundleSlice':
+        """ A file object reading a document from its own file descriptor, e.g.
+        to be sent with `sendfile` by the server
+        """
+        offset, length = self.locate(name)
+        f = open(self.path, 'rb', buffering=0)
+        stat = os.fstat(f.fileno())
+        if (stat.st_dev, stat.st_ino) != (self._stat.st_dev, self._stat.st_ino):
+            f.close()
+            raise ONEmSDKException(f'{self.path} was replaced since it was opened')
+        return BundleSlice(f, offset, length)
+
+    def close(self) -> None:
+        self._view.release()
+        self._mmap.close()
+
+    def __enter__(self) -> 'ResponseBundle':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class BundleSlice(io.RawIOBase):
+    """ A read only file object restricted to a document of a bundle file.
+    Its positions are the ones of the whole file, so `fileno()` and `tell()`
+    can be used by `sendfile`
+    """
+
+    def __init__(self, f: io.FileIO, offset: int, length: int):
+        super(BundleSlice, self).__init__()
+        self._file = f
+        self.start = offset
+        self.end = offset + length
+        f.seek(offset)
+
+    def fileno(self) -> int:
+        return self._file.fileno()
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._file.tell()
+
+    def seek(self, position: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            position += self.tell()
+        elif whence == io.SEEK_END:
+            position += self.end
+        return self._file.seek(min(max(position, self.start), self.end))
+
+    def readinto(self, buffer) -> int:
+        size = min(len(buffer), self.end - self.tell())
+        if size <= 0:
+            return 0
+        return self._file.readinto(memoryview(buffer)[:size])
+
+    def close(self) -> None:
+        if not self.closed:
+            self._file.close()
+        super(BundleSlice, self).close()
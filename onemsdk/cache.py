@@ -0,0 +1,171 @@
+import time
+from collections import OrderedDict
+from threading import RLock
+from typing import Any, Hashable, NamedTuple, Optional
+
+__all__ = ['CacheInfo', 'LRUCache', 'BytesLRUCache']
+
+
+class CacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    maxsize: Optional[int]
+    currsize: Optional[int]
+
+    @property
+    def hit_rate(self) -> float:
+        """ The share of the lookups which hit, 0 before the first lookup """
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class LRUCache:
+    """ A thread safe, size bounded mapping which evicts the least recently used
+    entries first and counts the lookups that hit or missed
+
+    `maxsize=None` means unbounded, `maxsize=0` disables caching. If `ttl` is
+    set, the entries expire `ttl` seconds after they were set.
+    """
+    _missing = object()
+
+    def __init__(self, maxsize: Optional[int] = 128, ttl: Optional[float] = None):
+        if maxsize is not None and maxsize < 0:
+            raise ValueError('maxsize must be None or a positive integer')
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = RLock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key, self._missing)
+            if entry is self._missing:
+                self.misses += 1
+                return default
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if self.maxsize == 0:
+            return
+        expires_at = None
+        if self.ttl is not None:
+            expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            if self.maxsize is not None:
+                while len(self._data) > self.maxsize:
+                    self._data.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.pop(key, self._missing)
+            if entry is self._missing:
+                return default
+            return entry[0]
+
+    def resize(self, maxsize: Optional[int]) -> None:
+        if maxsize is not None and maxsize < 0:
+            raise ValueError('maxsize must be None or a positive integer')
+        with self._lock:
+            self.maxsize = maxsize
+            if maxsize is not None:
+                while len(self._data) > maxsize:
+                    self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def info(self) -> CacheInfo:
+        with self._lock:
+            return CacheInfo(self.hits, self.misses, self.maxsize, len(self._data))
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class BytesLRUCache(LRUCache):
+    """ A `LRUCache` of `bytes` values bounded by their total length instead of
+    their number: the least recently used entries are evicted until the values
+    fit in `maxbytes`. A value longer than `maxbytes` is not stored.
+
+    `maxsize` and `currsize` of its `info()` are in bytes.
+    """
+
+    def __init__(self, maxbytes: int, ttl: Optional[float] = None):
+        if maxbytes < 0:
+            raise ValueError('maxbytes must be a positive integer')
+        super(BytesLRUCache, self).__init__(maxsize=maxbytes, ttl=ttl)
+        self.currbytes = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key, self._missing)
+            if entry is self._missing:
+                self.misses += 1
+                return default
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                self.pop(key)
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: bytes) -> None:
+        size = len(value)
+        if size > self.maxsize:
+            return
+        expires_at = None
+        if self.ttl is not None:
+            expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            self.pop(key)
+            self._data[key] = (value, expires_at)
+            self.currbytes += size
+            self._evict(self.maxsize)
+
+    def _evict(self, maxbytes: int) -> None:
+        while self.currbytes > maxbytes:
+            _, (value, _) = self._data.popitem(last=False)
+            self.currbytes -= len(value)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.pop(key, self._missing)
+            if entry is self._missing:
+                return default
+            self.currbytes -= len(entry[0])
+            return entry[0]
+
+    def resize(self, maxbytes: int) -> None:
+        if maxbytes < 0:
+            raise ValueError('maxbytes must be a positive integer')
+        with self._lock:
+            self.maxsize = maxbytes
+            self._evict(maxbytes)
+
+    def clear(self) -> None:
+        with self._lock:
+            super(BytesLRUCache, self).clear()
+            self.currbytes = 0
+
+    def info(self) -> CacheInfo:
+        with self._lock:
+            return CacheInfo(self.hits, self.misses, self.maxsize, self.currbytes)
@@ -1,4 +1,5 @@
 import os
+from functools import lru_cache
 from pathlib import Path
 
 from onemsdk.exceptions import ONEmSDKException
@@ -17,3 +18,20 @@ def set_static_dir(static_dir: str) -> None:
     if not path.exists() or not path.is_dir():
         raise ONEmSDKException(f'{path.absolute()} is not a dir')
     _static_dir = str(path.absolute())
+
+
+@lru_cache(maxsize=None)
+def get_sdk_version() -> str:
+    """ The version of the installed ONEmSDK distribution, or the one of the
+    VERSION file of a source checkout
+    """
+    try:
+        import pkg_resources
+        return pkg_resources.get_distribution('ONEmSDK').version
+    except Exception:
+        pass
+    try:
+        with open(Path(__file__).parent.parent / 'VERSION') as f:
+            return f.read().strip()
+    except OSError:
+        return 'unknown'
@@ -1,29 +1,441 @@
+import asyncio
+import hashlib
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+from threading import Lock
+from time import perf_counter
+from typing import Any, Optional, Tuple
+
+from onemsdk import instrumentation
+from onemsdk.batch import _init_worker, _worker_config
+from onemsdk.bundle import ResponseBundle
+from onemsdk.cache import BytesLRUCache, CacheInfo
+from onemsdk.config import get_sdk_version
+from onemsdk.exceptions import ONEmSDKException
+from onemsdk.parser.limits import set_parse_limits
 from onemsdk.parser.util import load_html
+from onemsdk.schema.encoder import encode_json_bytes
 from onemsdk.schema.v1 import Response
+from onemsdk.shared_cache import SharedResponseCache
+
+try:
+    from asgiref.sync import markcoroutinefunction
+except ImportError:  # asgiref < 3.6
+    def markcoroutinefunction(obj):
+        obj._is_coroutine = asyncio.coroutines._is_coroutine
+        return obj
+
+
+def _dont_convert(response) -> bool:
+    return (
+        response['Content-Type'] == 'application/json' or
+        response.status_code != 200
+    )
+
+
+def convert_content(content: bytes) -> bytes:
+    """ Converts an utf-8 html document into the json of its ONEm response """
+    timed = instrumentation.enabled
+    if timed:
+        started_at = perf_counter()
+
+    html = content.decode('utf-8')
+    tag = load_html(html_str=html)
+    json_content = encode_json_bytes(Response.from_tag(tag))
+
+    if timed:
+        instrumentation.emit(instrumentation.Stage.middleware, started_at,
+                             size=len(html))
+    return json_content
+
+
+@lru_cache(maxsize=None)
+def _version_hash() -> bytes:
+    return hashlib.blake2b(get_sdk_version().encode('utf-8'), digest_size=16).digest()
+
+
+def content_key(content: bytes) -> str:
+    """ A 128 bits hash of a html document and of the version of the SDK which
+    converts it. It keys the json of its ONEm response in the response caches
+    and is the ETag of that response
+    """
+    return hashlib.blake2b(content, digest_size=16, person=_version_hash()).hexdigest()
+
+
+def converted_etag(etag: str) -> str:
+    """ The ETag of the json converted from a html response whose ETag was
+    set upstream, e.g. by a view decorated with `django.views.decorators.http.etag`.
+    It has the same strength, weak or strong, and changes with the SDK version
+    """
+    weak = etag.startswith('W/')
+    opaque = (etag[2:] if weak else etag).strip('"')
+    converted = f'"{opaque}-onem-{get_sdk_version()}"'
+    return 'W/' + converted if weak else converted
+
+
+class DjangoResponseCache:
+    """ Stores the json of the converted responses in a cache of the Django
+    cache framework (`settings.CACHES[alias]`), e.g. memcached or redis shared
+    by the processes of a deployment
+
+    The budget and the eviction are the ones of that cache, the json longer
+    than `maxbytes` is not stored. `timeout` defaults to the timeout of the
+    cache. The hits and misses are counted in this process, `clear()` only
+    resets them.
+    """
+    _default = object()
+
+    def __init__(self, alias: str = 'default', timeout: Optional[float] = _default,
+                 maxbytes: Optional[int] = None, key_prefix: str = 'onemsdk'):
+        from django.core.cache import caches
+
+        caches[alias]  # raises InvalidCacheBackendError early
+        self.alias = alias
+        self.timeout = timeout
+        self.maxbytes = maxbytes
+        self.key_prefix = key_prefix
+        self.hits = 0
+        self.misses = 0
+        self._lock = Lock()
+
+    def get(self, key: str, default: Optional[bytes] = None) -> Optional[bytes]:
+        from django.core.cache import caches
+
+        # The connections of the Django caches are per thread
+        value = caches[self.alias].get(f'{self.key_prefix}:{key}')
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return default
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: bytes) -> None:
+        if self.maxbytes is not None and len(value) > self.maxbytes:
+            return
+        from django.core.cache import caches
+
+        # The connections of the Django caches are per thread
+        cache = caches[self.alias]
+        if self.timeout is self._default:
+            cache.set(f'{self.key_prefix}:{key}', value)
+        else:
+            cache.set(f'{self.key_prefix}:{key}', value, self.timeout)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+    def info(self) -> CacheInfo:
+        with self._lock:
+            return CacheInfo(self.hits, self.misses, self.maxbytes, None)
+
+
+# The response cache backends which can be named in settings.ONEMSDK_RESPONSE_CACHE
+RESPONSE_CACHE_BACKENDS = {
+    'locmem': BytesLRUCache,
+    'django': DjangoResponseCache,
+    'shared': SharedResponseCache,
+}
+
+# The backends which never block, called from the event loop
+_IN_MEMORY_CACHES = (BytesLRUCache,)
+
+_response_cache = None
+_response_cache_lock = Lock()
+
+
+def get_response_cache():
+    """ The cache of the converted responses shared by the middlewares, keyed
+    by the `content_key` of the html, or None if there is no
+    settings.ONEMSDK_RESPONSE_CACHE.
+
+    That setting is a dict with a "BACKEND", "locmem" (the default), "django"
+    or the dotted path of a class, and the "OPTIONS" passed to the backend. A
+    "locmem" cache is a `BytesLRUCache` of this process, bounded to
+    16 MiB of json unless its "maxbytes" option is set. A "shared" cache is a
+    `SharedResponseCache`, whose "path" option is required, shared by the
+    worker processes of the node. A backend implements
+    `get(key)`, `set(key, value)`, `clear()` and `info()`, see
+    `DjangoResponseCache`
+    """
+    global _response_cache
+    with _response_cache_lock:
+        if _response_cache is None:
+            from django.conf import settings
+            from django.utils.module_loading import import_string
+
+            config = getattr(settings, 'ONEMSDK_RESPONSE_CACHE', None)
+            if config is None:
+                return None
+            backend = config.get('BACKEND', 'locmem')
+            options = dict(config.get('OPTIONS', {}))
+            if backend in RESPONSE_CACHE_BACKENDS:
+                backend_cls = RESPONSE_CACHE_BACKENDS[backend]
+            else:
+                backend_cls = import_string(backend)
+            if backend_cls is BytesLRUCache:
+                options.setdefault('maxbytes', 16 * 1024 * 1024)
+            _response_cache = backend_cls(**options)
+        return _response_cache
+
+
+def response_cache_info() -> Optional[CacheInfo]:
+    """ The hits, misses and size of the response cache, see `get_response_cache` """
+    cache = get_response_cache()
+    if cache is None:
+        return None
+    return cache.info()
 
 
 class HtmlToOnemResponseMiddleware:
     """ Converts the html rendered by the Django templating engine into a ONEm
     json response
 
-    This middleware should be placed last in the settings.MIDDLEWARE chain
+    This middleware should be placed last in the settings.MIDDLEWARE chain.
+    The callables listed by dotted path in the optional
+    settings.ONEMSDK_INSTRUMENTATION_LISTENERS are registered as
+    `onemsdk.instrumentation` listeners. The optional
+    settings.ONEMSDK_PARSE_LIMITS dict holds the arguments of
+    `onemsdk.parser.set_parse_limits`, e.g. `{'max_depth': 16}`. The
+    converted responses are cached if settings.ONEMSDK_RESPONSE_CACHE is set,
+    see `get_response_cache`
+
+    The converted responses have a strong ETag, `content_key` of the html, or
+    `converted_etag` of the ETag set by the view. A GET request whose
+    If-None-Match matches it gets a 304 response without any conversion. It is
+    disabled by settings.ONEMSDK_ETAGS = False
     """
     def __init__(self, get_response):
         self.get_response = get_response
 
+        from django.conf import settings
+        from django.utils.module_loading import import_string
+
+        for path in getattr(settings, 'ONEMSDK_INSTRUMENTATION_LISTENERS', ()):
+            instrumentation.add_listener(import_string(path))
+
+        parse_limits = getattr(settings, 'ONEMSDK_PARSE_LIMITS', None)
+        if parse_limits is not None:
+            set_parse_limits(**parse_limits)
+
+        self.response_cache = get_response_cache()
+        self.etags = getattr(settings, 'ONEMSDK_ETAGS', True)
+
+    def conditional_response(self, request, response) -> Tuple[Optional[str], Any]:
+        """ Sets the ETag of the response to convert. Returns the `content_key`
+        of its html if it was computed, and the 304 (or 412) response answering
+        the conditional request, if any
+        """
+        if not self.etags:
+            return None, None
+
+        from django.utils.cache import get_conditional_response
+
+        key = None
+        upstream_etag = response.get('ETag')
+        if upstream_etag:
+            etag = converted_etag(upstream_etag)
+        else:
+            key = content_key(response.content)
+            etag = f'"{key}"'
+        response['ETag'] = etag
+
+        conditional = get_conditional_response(request, etag=etag, response=response)
+        return key, conditional if conditional is not response else None
+
+    def convert(self, content: bytes, key: str = None) -> bytes:
+        cache = self.response_cache
+        if cache is None:
+            return convert_content(content)
+
+        if key is None:
+            key = content_key(content)
+        json_content = cache.get(key)
+        if json_content is None:
+            json_content = convert_content(content)
+            cache.set(key, json_content)
+        return json_content
+
     def __call__(self, request):
         response = self.get_response(request)
+        if _dont_convert(response):
+            return response
+
+        key, conditional = self.conditional_response(request, response)
+        if conditional is not None:
+            return conditional
+
+        response.content = self.convert(response.content, key)
+        response['Content-Type'] = 'application/json'
+
+        return response
+
+
+def _convert_in_worker(worker_config, content: bytes) -> bytes:
+    _init_worker(*worker_config)
+    return convert_content(content)
+
+
+class ConversionPool:
+    """ A bounded pool of threads (or processes) converting the html documents
+    out of the event loop, which counts the conversions waiting for a worker
+    """
+    def __init__(self, max_workers: int, use_processes: bool = False):
+        if max_workers < 1:
+            raise ONEmSDKException('The conversion pool needs at least 1 worker')
+        self.max_workers = max_workers
+        self.use_processes = use_processes
+        self._executor = None
+        self._lock = Lock()
+        self._pending = 0
+
+    @property
+    def queue_depth(self) -> int:
+        """ The number of conversions waiting for a free worker """
+        return max(0, self._pending - self.max_workers)
+
+    @property
+    def pending(self) -> int:
+        """ The number of conversions submitted and not finished yet """
+        return self._pending
+
+    def _get_executor(self) -> Executor:
+        with self._lock:
+            if self._executor is None:
+                if self.use_processes:
+                    self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+                else:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers,
+                        thread_name_prefix='onemsdk-conversion',
+                    )
+            return self._executor
+
+    async def convert(self, content: bytes) -> bytes:
+        executor = self._get_executor()
+        with self._lock:
+            self._pending += 1
+        try:
+            loop = asyncio.get_event_loop()
+            if self.use_processes:
+                return await loop.run_in_executor(executor, _convert_in_worker,
+                                                  _worker_config(), content)
+            return await loop.run_in_executor(executor, convert_content, content)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
 
-        dont_convert = (
-            response['Content-Type'] == 'application/json' or
-            response.status_code != 200
-        )
-        if dont_convert:
+
+_pool = None
+_pool_lock = Lock()
+
+
+def get_conversion_pool() -> ConversionPool:
+    """ The pool shared by the `AsyncHtmlToOnemResponseMiddleware` instances,
+    sized by settings.ONEMSDK_CONVERSION_MAX_WORKERS (4 by default). The
+    conversions run in processes instead of threads if
+    settings.ONEMSDK_CONVERSION_EXECUTOR is "process", in which case the
+    instrumentation listeners of this process are not called
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            from django.conf import settings
+
+            executor = getattr(settings, 'ONEMSDK_CONVERSION_EXECUTOR', 'thread')
+            if executor not in ('thread', 'process'):
+                raise ONEmSDKException(
+                    f'ONEMSDK_CONVERSION_EXECUTOR must be "thread" or "process", '
+                    f'not {executor!r}')
+            _pool = ConversionPool(
+                max_workers=getattr(settings, 'ONEMSDK_CONVERSION_MAX_WORKERS', 4),
+                use_processes=executor == 'process',
+            )
+        return _pool
+
+
+class AsyncHtmlToOnemResponseMiddleware(HtmlToOnemResponseMiddleware):
+    """ The same as `HtmlToOnemResponseMiddleware`, which also runs in the
+    Django async stack without switching to a thread for the whole middleware
+
+    Under ASGI, the conversion runs in the pool of `get_conversion_pool()`, so
+    it does not block the event loop. So do the lookups of the response caches
+    other than "locmem", in the default executor of the loop. Under WSGI, it
+    runs in the request thread
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        super(AsyncHtmlToOnemResponseMiddleware, self).__init__(get_response)
+        self.pool = get_conversion_pool()
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        return super(AsyncHtmlToOnemResponseMiddleware, self).__call__(request)
+
+    async def aconvert(self, content: bytes, key: str = None) -> bytes:
+        cache = self.response_cache
+        if cache is None:
+            return await self.pool.convert(content)
+
+        if key is None:
+            key = content_key(content)
+        if isinstance(cache, _IN_MEMORY_CACHES):
+            json_content = cache.get(key)
+        else:
+            json_content = await self._run_in_thread(cache.get, key)
+        if json_content is None:
+            json_content = await self.pool.convert(content)
+            if isinstance(cache, _IN_MEMORY_CACHES):
+                cache.set(key, json_content)
+            else:
+                await self._run_in_thread(cache.set, key, json_content)
+        return json_content
+
+    @staticmethod
+    async def _run_in_thread(func, *args):
+        """ Runs a call of a response cache which may block, e.g. on the network
+        or on a file lock, in the default executor of the event loop
+        """
+        return await asyncio.get_event_loop().run_in_executor(None, func, *args)
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        if _dont_convert(response):
             return response
 
-        tag = load_html(html_str=response.content.decode('utf-8'))
+        key, conditional = self.conditional_response(request, response)
+        if conditional is not None:
+            return conditional
 
-        response.content = Response.from_tag(tag).json()
+        response.content = await self.aconvert(response.content, key)
         response['Content-Type'] = 'application/json'
 
         return response
+
+
+def bundle_response(bundle: ResponseBundle, name: str, status: int = 200):
+    """ A response serving a document of a `ResponseBundle` from its own file
+    descriptor. The servers implementing `wsgi.file_wrapper` with `sendfile`
+    (e.g. gunicorn) send it straight from the page cache, the others read it
+    block by block
+    """
+    from django.http import FileResponse
+
+    document = bundle.open_slice(name)
+    response = FileResponse(document, content_type='application/json', status=status)
+    response['Content-Length'] = document.end - document.start
+    return response
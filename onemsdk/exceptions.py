@@ -3,8 +3,29 @@ class ONEmSDKException(BaseException):
 
 
 class MalformedHTMLException(ONEmSDKException):
-    pass
+    """ Raised for the documents which are not well formed. `line` and
+    `column` (starting at 1) locate the error when they are known
+    """
+    def __init__(self, message: str = None, line: int = None, column: int = None):
+        if line is not None:
+            message = f'{message} (line {line}, column {column})'
+        args = () if message is None else (message,)
+        super(MalformedHTMLException, self).__init__(*args)
+        self.line = line
+        self.column = column
 
 
 class NodeTagMismatchException(ONEmSDKException):
     pass
+
+
+class ParseLimitException(ONEmSDKException):
+    """ Raised as soon as a document exceeds one of the parse limits, see
+    `onemsdk.parser.set_parse_limits`. `limit` is the name of the limit
+    """
+    def __init__(self, message: str, limit: str):
+        super(ParseLimitException, self).__init__(message)
+        self.limit = limit
+
+    def __reduce__(self):
+        return type(self), (self.args[0], self.limit)
@@ -0,0 +1,148 @@
+from bisect import bisect_left
+from enum import Enum
+from threading import Lock
+from time import perf_counter
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+__all__ = ['Stage', 'StageEvent', 'StageStats', 'Metrics', 'add_listener',
+           'remove_listener', 'clear_listeners']
+
+
+class Stage(str, Enum):
+    template = 'template'
+    parse = 'parse'
+    tag = 'tag'
+    schema = 'schema'
+    serialize = 'serialize'
+    middleware = 'middleware'
+
+
+class StageEvent(NamedTuple):
+    """ The duration (in seconds) of a conversion stage, the size (in
+    characters) of its input or output document and the number of nodes of the
+    tree it built, when they are known
+    """
+    stage: Stage
+    duration: float
+    size: Optional[int]
+    nodes: Optional[int]
+
+
+Listener = Callable[[StageEvent], Any]
+
+# Checked by the conversion functions before timing anything, so there is no
+# overhead while no listener is registered
+enabled = False
+
+_listeners: Tuple[Listener, ...] = ()
+_listeners_lock = Lock()
+
+
+def add_listener(listener: Listener) -> None:
+    """ Registers a callable which is called with a `StageEvent` after each
+    conversion stage, in the thread doing the conversion. Registering the same
+    listener again has no effect
+    """
+    global _listeners, enabled
+    with _listeners_lock:
+        if listener not in _listeners:
+            _listeners = _listeners + (listener,)
+        enabled = True
+
+
+def remove_listener(listener: Listener) -> None:
+    global _listeners, enabled
+    with _listeners_lock:
+        _listeners = tuple(l for l in _listeners if l != listener)
+        enabled = bool(_listeners)
+
+
+def clear_listeners() -> None:
+    global _listeners, enabled
+    with _listeners_lock:
+        _listeners = ()
+        enabled = False
+
+
+def emit(stage: Stage, started_at: float, size: int = None,
+         nodes: int = None) -> float:
+    """ Sends the event of a stage started at `started_at` (a `perf_counter()`
+    value) to the listeners and returns the current `perf_counter()`, to be
+    used as the start of the next stage
+    """
+    now = perf_counter()
+    event = StageEvent(stage, now - started_at, size, nodes)
+    for listener in _listeners:
+        listener(event)
+    return perf_counter()
+
+
+def count_nodes(root) -> int:
+    """ The number of nodes (or tags) of a tree, the text children excluded """
+    count = 0
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        count += 1
+        stack.extend(child for child in node.children if not isinstance(child, str))
+    return count
+
+
+class StageStats(NamedTuple):
+    count: int
+    total_duration: float
+    max_duration: float
+    # Cumulative counts of the durations lower or equal to each bound, the last
+    # bound being infinity
+    buckets: List[Tuple[float, int]]
+    total_size: int
+    total_nodes: int
+
+
+class Metrics:
+    """ A listener which aggregates the events of each stage into a histogram
+    of the durations, e.g. to be exported to a metrics system::
+
+        metrics = Metrics()
+        add_listener(metrics)
+        ...
+        metrics.snapshot()[Stage.parse].buckets
+    """
+    DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25,
+                       0.5, 1.0)
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.bounds = tuple(sorted(buckets)) + (float('inf'),)
+        self._lock = Lock()
+        self._stats: Dict[Stage, list] = {}
+
+    def __call__(self, event: StageEvent) -> None:
+        with self._lock:
+            stats = self._stats.get(event.stage)
+            if stats is None:
+                # count, total duration, max duration, total size, total nodes,
+                # count per bucket
+                stats = [0, 0.0, 0.0, 0, 0, [0] * len(self.bounds)]
+                self._stats[event.stage] = stats
+            stats[0] += 1
+            stats[1] += event.duration
+            stats[2] = max(stats[2], event.duration)
+            stats[3] += event.size or 0
+            stats[4] += event.nodes or 0
+            stats[5][bisect_left(self.bounds, event.duration)] += 1
+
+    def snapshot(self) -> Dict[Stage, StageStats]:
+        with self._lock:
+            result = {}
+            for stage, (count, total, max_, size, nodes, counts) in self._stats.items():
+                buckets = []
+                cumulative = 0
+                for bound, bucket_count in zip(self.bounds, counts):
+                    cumulative += bucket_count
+                    buckets.append((bound, cumulative))
+                result[stage] = StageStats(count, total, max_, buckets, size, nodes)
+            return result
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
@@ -1,2 +1,5 @@
+from .visitor import *
 from .tag import *
+from .limits import *
 from .util import *
+from .compiler import *
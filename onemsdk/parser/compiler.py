@@ -0,0 +1,641 @@
+import json
+import weakref
+from html.parser import HTMLParser
+from typing import Any, Dict, List, Optional, Union
+
+import jinja2
+from jinja2 import nodes
+
+from onemsdk.exceptions import (MalformedHTMLException, ONEmSDKException,
+                                 ParseLimitException)
+from onemsdk.parser.limits import ParseBudget
+from onemsdk.parser.util import feed_chunks, _get_template
+
+__all__ = ['compile_html', 'compile_html_json', 'compile_template',
+           'compile_template_json']
+
+# Values accepted by the enums the pydantic models validate against
+_INPUT_TYPES = {'text', 'date', 'number', 'hidden', 'email', 'url', 'datetime',
+                'location'}
+_HTTP_METHODS = {'GET', 'POST', 'PUT', 'PATCH', 'DELETE', 'HEAD', 'OPTIONS', 'TRACE'}
+
+_CONTENT_TYPES_MAP = {
+    'date': 'date',
+    'datetime': 'datetime',
+    'text': 'string',
+    'hidden': 'hidden',
+    'email': 'email',
+    'location': 'location',
+    'url': 'url',
+}
+
+
+class _Fallback(Exception):
+    """ Raised when the document needs the validation of the pydantic models """
+
+
+class _Text:
+    """ <header>, <footer>, <p>, <label> and <br> """
+    __slots__ = ('tag', 'text')
+
+    def __init__(self, tag: str, text: str):
+        self.tag = tag
+        self.text = text
+
+
+class _Input:
+    __slots__ = ('attrs',)
+
+    def __init__(self, attrs: Dict[str, Any]):
+        self.attrs = attrs
+
+
+class _A:
+    __slots__ = ('text', 'href', 'method')
+
+    def __init__(self, text: str, href: str, method: str):
+        self.text = text
+        self.href = href
+        self.method = method
+
+
+class _Li:
+    __slots__ = ('text', 'value', 'text_search', 'a')
+
+    def __init__(self, text: str, value: Optional[str], text_search: Optional[str],
+                 a: Optional[_A]):
+        self.text = text
+        self.value = value
+        self.text_search = text_search
+        self.a = a
+
+
+class _Ul:
+    __slots__ = ('items', 'text')
+
+    def __init__(self, items: List[_Li]):
+        self.items = items
+        self.text = '\n'.join([li.text for li in items])
+
+
+class _Section:
+    __slots__ = ('attrs', 'children')
+
+    def __init__(self, attrs: Dict[str, str], children: list):
+        self.attrs = attrs
+        self.children = children
+
+
+def _int(value: Optional[str]) -> Optional[int]:
+    if value is None:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise _Fallback()
+
+
+def _number(value: Optional[str]) -> Union[int, float, None]:
+    if value is None:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        pass
+    try:
+        return float(value)
+    except ValueError:
+        raise _Fallback()
+
+
+def _float(value: Union[int, float, None]) -> Optional[float]:
+    if value is None:
+        return None
+    return float(value)
+
+
+def _http_method(value: Optional[str]) -> Optional[str]:
+    if value is not None and value not in _HTTP_METHODS:
+        raise _Fallback()
+    return value
+
+
+def _max_one_text_child(tag: str, children: list) -> str:
+    if len(children) > 1 or children and not isinstance(children[0], str):
+        raise ONEmSDKException(f'<{tag}> must have max 1 text child')
+    if children:
+        return children[0]
+    return ''
+
+
+def _compile_header(attrs, children):
+    return _Text('header', _max_one_text_child('header', children))
+
+
+def _compile_footer(attrs, children):
+    return _Text('footer', _max_one_text_child('footer', children))
+
+
+def _compile_p(attrs, children):
+    return _Text('p', _max_one_text_child('p', children))
+
+
+def _compile_label(attrs, children):
+    text = _max_one_text_child('label', children)
+    if not children:
+        # An empty <label> cannot be rendered
+        raise _Fallback()
+    return _Text('label', text)
+
+
+def _compile_br(attrs, children):
+    return _Text('br', '\n')
+
+
+def _compile_input(attrs, children):
+    input_type = attrs.get('type')
+    if input_type not in _INPUT_TYPES:
+        raise _Fallback()
+    return _Input({
+        'type': input_type,
+        'min': _number(attrs.get('min')),
+        'minlength': _int(attrs.get('minlength')),
+        'max': _number(attrs.get('max')),
+        'maxlength': _int(attrs.get('maxlength')),
+        'step': _int(attrs.get('step')),
+        'value': attrs.get('value'),
+        'pattern': attrs.get('pattern'),
+        'min_error': attrs.get('min-error'),
+        'minlength_error': attrs.get('minlength-error'),
+        'max_error': attrs.get('max-error'),
+        'maxlength_error': attrs.get('maxlength-error'),
+    })
+
+
+def _compile_a(attrs, children):
+    href = attrs.get('href')
+    if href is None:
+        raise _Fallback()
+    if len(children) != 1 or not isinstance(children[0], str):
+        raise ONEmSDKException('<a> must have 1 text child')
+    return _A(children[0], href, attrs.get('method') or 'GET')
+
+
+def _compile_li(attrs, children):
+    if len(children) != 1 or not isinstance(children[0], (str, _A)):
+        raise ONEmSDKException('<li> must have 1 (text or <a>) child')
+    child = children[0]
+    if isinstance(child, _A):
+        return _Li(child.text, attrs.get('value'), attrs.get('text-search'), child)
+    return _Li(child, attrs.get('value'), attrs.get('text-search'), None)
+
+
+def _compile_ul(attrs, children):
+    if not children or not isinstance(children[0], _Li):
+        raise ONEmSDKException('<ul> must have min 1 <li> child')
+    for child in children:
+        if not isinstance(child, _Li):
+            raise _Fallback()
+    return _Ul(children)
+
+
+def _compile_section(attrs, children):
+    for child in children:
+        if not isinstance(child, (_Text, _Ul, _Input, str)):
+            raise ONEmSDKException(f'<{_tag_name(child)}> cannot be child for <section>')
+    return _Section(attrs, children)
+
+
+def _compile_form(attrs, children):
+    action = attrs.get('action')
+    if action is None:
+        raise _Fallback()
+    if not children:
+        raise ONEmSDKException('<form> must have at least 1 child')
+    for child in children:
+        if not isinstance(child, _Section):
+            raise ONEmSDKException('<form> can have only <section> children')
+        if not child.attrs.get('name'):
+            raise ONEmSDKException('<form> can contain only named <section> tags. '
+                                   'Please add a unique "name" attribute in each form '
+                                   'section.')
+
+    return {
+        'content_type': 'form',
+        'content': {
+            'type': 'form',
+            'body': [_form_item(section) for section in children],
+            'method': _http_method(attrs.get('method') or 'POST'),
+            'path': action,
+            'header': attrs.get('header'),
+            'footer': attrs.get('footer'),
+            'meta': {
+                'completion_status_show': 'completion-status-show' in attrs,
+                'completion_status_in_header': 'completion-status-in-header' in attrs,
+                'skip_confirmation': 'skip-confirmation' in attrs,
+            },
+        },
+    }
+
+
+_compilers = {
+    'header': _compile_header,
+    'footer': _compile_footer,
+    'p': _compile_p,
+    'label': _compile_label,
+    'br': _compile_br,
+    'input': _compile_input,
+    'a': _compile_a,
+    'li': _compile_li,
+    'ul': _compile_ul,
+    'section': _compile_section,
+    'form': _compile_form,
+}
+
+
+def _tag_name(compiled) -> str:
+    if isinstance(compiled, _Text):
+        return compiled.tag
+    if isinstance(compiled, _A):
+        return 'a'
+    if isinstance(compiled, _Li):
+        return 'li'
+    if isinstance(compiled, _Section):
+        return 'section'
+    return 'form'
+
+
+def _render_section(section: _Section, exclude_header: bool = False,
+                    exclude_footer: bool = False) -> str:
+    # Mirrors SectionTag.render()
+    rendered_children = ['\n']
+
+    for child in section.children:
+        if isinstance(child, str):
+            text = child
+        elif isinstance(child, _Text):
+            if child.tag == 'header' and exclude_header:
+                continue
+            if child.tag == 'footer' and exclude_footer:
+                continue
+            text = child.text
+        elif isinstance(child, _Ul):
+            text = child.text
+        else:
+            text = ''
+
+        if text:
+            if isinstance(child, _Ul) or isinstance(child, _Text) and child.tag == 'p':
+                if rendered_children[-1] != '\n':
+                    rendered_children.append('\n')
+                rendered_children.append(text)
+                rendered_children.append('\n')
+            else:
+                rendered_children.append(text)
+
+    del rendered_children[0]
+
+    if rendered_children and rendered_children[-1] == '\n':
+        del rendered_children[-1]
+
+    return ''.join(rendered_children)
+
+
+def _menu_item(description: str, li: _Li = None) -> dict:
+    method = None
+    path = None
+    text_search = None
+
+    if li is not None and li.a is not None:
+        method = _http_method(li.a.method)
+        path = li.a.href
+        text_search = li.text_search
+
+    return {
+        'type': 'option' if path else 'content',
+        'description': description,
+        'text_search': text_search,
+        'method': method,
+        'path': path,
+    }
+
+
+def _menu(section: _Section) -> dict:
+    body = []
+    header = None
+    footer = None
+
+    for child in section.children:
+        if isinstance(child, _Ul):
+            for li in child.items:
+                body.append(_menu_item(li.text, li))
+        elif isinstance(child, str):
+            body.append(_menu_item(child))
+        elif isinstance(child, _Text):
+            if child.tag == 'header':
+                header = child.text
+            elif child.tag == 'footer':
+                footer = child.text
+            elif child.text:
+                body.append(_menu_item(child.text))
+
+    attrs = section.attrs
+    return {
+        'content_type': 'menu',
+        'content': {
+            'type': 'menu',
+            'body': body,
+            'header': header or attrs.get('header'),
+            'footer': footer or attrs.get('footer'),
+            'meta': {
+                'auto_select': 'auto-select' in attrs,
+            },
+        },
+    }
+
+
+def _menu_item_form_item(description: str, li: _Li = None) -> dict:
+    value = None
+    text_search = None
+
+    if li is not None:
+        value = li.value
+        text_search = li.text_search
+
+    return {
+        'type': 'option' if value else 'content',
+        'description': description,
+        'value': value,
+        'text_search': text_search,
+    }
+
+
+def _form_item(section: _Section) -> dict:
+    # Mirrors FormItem.from_tag()
+    type_ = None
+    body = []
+    value = None
+    description = None
+    input_attrs = {}
+
+    for child in section.children:
+        if isinstance(child, _Input):
+            input_attrs = child.attrs
+            input_type = input_attrs['type']
+
+            if input_type == 'number':
+                if input_attrs['step'] == 1:
+                    type_ = 'int'
+                else:
+                    type_ = 'float'
+            elif input_type == 'hidden':
+                value = input_attrs['value']
+                if value is None:
+                    raise ONEmSDKException(
+                        'value attribute is required for input type="hidden"'
+                    )
+
+            if input_attrs['pattern'] is not None:
+                type_ = 'regex'
+
+            if type_ is None:
+                type_ = _CONTENT_TYPES_MAP[input_type]
+
+            description = _render_section(section, True, True)
+            break
+        if isinstance(child, _Ul):
+            type_ = 'form-menu'
+
+            for child2 in section.children:
+                if isinstance(child2, _Ul):
+                    for li in child2.items:
+                        body.append(_menu_item_form_item(li.text, li))
+                elif isinstance(child2, str):
+                    body.append(_menu_item_form_item(child2))
+                elif isinstance(child2, _Text):
+                    if child2.tag in ('header', 'footer'):
+                        continue
+                    if child2.text:
+                        body.append(_menu_item_form_item(child2.text))
+            break
+    else:
+        raise ONEmSDKException(
+            'When <section> plays the role of a form item, '
+            'it must contain a <input/> or <ul></ul>'
+        )
+
+    if not body and type_ == 'form-menu':
+        raise _Fallback()
+
+    header = None
+    footer = None
+    first = section.children[0]
+    last = section.children[-1]
+    if isinstance(first, _Text) and first.tag == 'header':
+        header = first.text
+    if isinstance(last, _Text) and last.tag == 'footer':
+        footer = last.text
+
+    attrs = section.attrs
+    return {
+        'type': type_,
+        'name': attrs.get('name'),
+        'description': description,
+        'header': header or attrs.get('header'),
+        'footer': footer or attrs.get('footer'),
+        'body': body or None,
+        'value': value,
+        'chunking_footer': attrs.get('chunking-footer'),
+        'confirmation_label': attrs.get('confirmation-label'),
+        'min_length': input_attrs.get('minlength'),
+        'min_length_error': input_attrs.get('minlength_error'),
+        'max_length': input_attrs.get('maxlength'),
+        'max_length_error': input_attrs.get('maxlength_error'),
+        'min_value': _float(input_attrs.get('min')),
+        'min_value_error': input_attrs.get('min_error'),
+        'max_value': _float(input_attrs.get('max')),
+        'max_value_error': input_attrs.get('max_error'),
+        'meta': {
+            'auto_select': 'auto-select' in attrs,
+            'multi_select': 'multi-select' in attrs,
+            'numbered': 'numbered' in attrs,
+        },
+        'method': _http_method(attrs.get('method')),
+        'required': 'required' in attrs,
+        'default': None,
+        'pattern': input_attrs.get('pattern'),
+        'status_exclude': 'status-exclude' in attrs,
+        'status_prepend': 'status-prepend' in attrs,
+        'url': attrs.get('url'),
+        'validate_type_error': attrs.get('validate-type-error'),
+        'validate_type_error_footer': attrs.get('validate-type-error-footer'),
+        'validate_url': attrs.get('validate-url'),
+    }
+
+
+class Compiler(HTMLParser):
+    """ Builds the `Response` structure straight from the parser events
+
+    Each element is compiled as soon as its end tag is received, so neither
+    the `Node` tree nor the `Tag` tree is ever built. The structural rules are
+    the ones enforced by the tags in `onemsdk.parser.tag`.
+    """
+
+    def __init__(self):
+        super(Compiler, self).__init__()
+        self.result: Optional[dict] = None
+        self.stack: List[tuple] = []
+        self.root_closed = False
+        self.budget = ParseBudget.from_settings()
+
+    def handle_starttag(self, tag, attrs):
+        if self.root_closed:
+            raise Exception('Only one root tag permitted')
+        if tag not in _compilers:
+            raise ONEmSDKException(f'Tag <{tag}> is not supported')
+        attrs = dict(attrs)
+        if self.budget is not None:
+            self.budget.add_tag(len(self.stack) + 1, attrs)
+        self.stack.append((tag, attrs, []))
+
+    def handle_endtag(self, tag):
+        last_tag, attrs, children = self.stack.pop()
+
+        if last_tag != tag:
+            raise MalformedHTMLException(
+                f'<{last_tag}> is the last opened tag, '
+                f'but </{tag}> was received.'
+            )
+
+        compiled = _compilers[tag](attrs, children)
+
+        if self.stack:
+            self.stack[-1][2].append(compiled)
+            return
+
+        self.root_closed = True
+        if isinstance(compiled, _Section):
+            self.result = _menu(compiled)
+        elif isinstance(compiled, dict):
+            self.result = compiled
+        else:
+            raise ONEmSDKException(f'Cannot create response from {tag} tag')
+
+    def handle_startendtag(self, tag, attrs):
+        if tag not in _compilers:
+            raise ONEmSDKException(f'Tag <{tag}> is not supported')
+        attrs = dict(attrs)
+        if self.budget is not None:
+            self.budget.add_tag(len(self.stack) + 1, attrs)
+        compiled = _compilers[tag](attrs, [])
+        self.stack[-1][2].append(compiled)
+
+    def handle_data(self, data):
+        data = data.strip()
+        if not data:
+            return
+        data_bits = data.split()
+        data = ' '.join(data_bits)
+        if self.budget is not None:
+            self.budget.add_text(data)
+        self.stack[-1][2].append(data)
+
+    def close_document(self) -> dict:
+        if self.stack or self.result is None:
+            raise MalformedHTMLException()
+        return self.result
+
+
+def _reference_response_dict(html: str) -> dict:
+    # Imported here, the schema module depends on this package
+    from onemsdk.parser.util import load_html
+    from onemsdk.schema.v1 import Response
+
+    return Response.from_tag(load_html(html_str=html)).dict()
+
+
+def compile_html(html: str) -> dict:
+    """ Converts an html document into the dict of its `Response`, equal to
+    `Response.from_tag(load_html(html_str=html)).dict()`
+
+    Errors are re-raised by the regular conversion path, so a document fails
+    here exactly the way it fails with `load_html`, except the
+    `ParseLimitException`s which are raised as soon as a limit is exceeded.
+    """
+    compiler = Compiler()
+    try:
+        compiler.feed(html)
+        return compiler.close_document()
+    except ParseLimitException:
+        raise
+    except (ONEmSDKException, Exception):
+        return _reference_response_dict(html)
+
+
+def compile_html_json(html: str) -> str:
+    """ The same as `Response.from_tag(load_html(html_str=html)).json()` """
+    return json.dumps(compile_html(html))
+
+
+# The json of the compiled response of the templates without any dynamic part,
+# they are the same whatever the rendering data is
+_static_templates: 'weakref.WeakKeyDictionary[jinja2.Template, str]' = \
+    weakref.WeakKeyDictionary()
+_dynamic_templates: 'weakref.WeakSet[jinja2.Template]' = weakref.WeakSet()
+
+
+def _is_static(template: jinja2.Template) -> bool:
+    env = template.environment
+    source, _, _ = env.loader.get_source(env, template.name)
+    for node in env.parse(source).body:
+        if not isinstance(node, nodes.Output):
+            return False
+        if not all(isinstance(child, nodes.TemplateData) for child in node.nodes):
+            return False
+    return True
+
+
+def _compile_template(template: jinja2.Template, data: Dict[str, Any]) -> dict:
+    compiler = Compiler()
+    try:
+        feed_chunks(compiler, template.generate(data))
+        result = compiler.close_document()
+    except ParseLimitException:
+        raise
+    except (ONEmSDKException, Exception):
+        return _reference_response_dict(template.render(data))
+
+    if template not in _dynamic_templates:
+        if _is_static(template):
+            _static_templates[template] = json.dumps(result)
+        else:
+            _dynamic_templates.add(template)
+
+    return result
+
+
+def compile_template(template_file: str, **data) -> dict:
+    """ Renders a jinja template into the dict of its `Response`, equal to
+    `Response.from_template(template_file, **data).dict()`
+
+    The rendered fragments are fed to the compiler as jinja produces them, so
+    the html is never joined into a string nor parsed into a tree. Templates
+    which have no dynamic part are compiled only once, each call returns a new
+    dict decoded from their json.
+    """
+    template = _get_template(template_file)
+
+    static_json = _static_templates.get(template)
+    if static_json is not None:
+        return json.loads(static_json)
+    return _compile_template(template, data)
+
+
+def compile_template_json(template_file: str, **data) -> str:
+    """ The same as `Response.from_template(template_file, **data).json()` """
+    template = _get_template(template_file)
+
+    static_json = _static_templates.get(template)
+    if static_json is not None:
+        return static_json
+    return json.dumps(_compile_template(template, data))
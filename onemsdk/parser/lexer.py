@@ -0,0 +1,192 @@
+"""
+A tokenizer of the html subset of the ONEm documents, which builds the same
+`LightNode` tree as the `html.parser` based `Parser` (see `build_node`).
+
+It scans the document with a few regular expressions: the text between the
+tags is normalized (whitespace collapsed, entities converted) while it is
+scanned, and the errors report their line and column. The comments, doctypes
+and processing instructions are skipped. `<script>` and `<style>` are not
+parsed as raw text, ONEm does not support them.
+"""
+import re
+from html import unescape
+from string import ascii_letters
+from typing import List, Optional
+
+from onemsdk.exceptions import MalformedHTMLException
+from onemsdk.parser.limits import ParseBudget
+from onemsdk.parser.node import LightNode
+
+__all__ = ['Lexer', 'lex_node']
+
+# The patterns of html.parser, so the tags and attributes are read the same way
+_START_TAG = re.compile(r'''
+    <([a-zA-Z][^\t\n\r\f />\x00]*)
+    ((?:[\s/]*(?<=['"\s/])[^\s/>][^\s/=>]*
+        (?:\s*=+\s*(?:'[^']*'|"[^"]*"|(?!['"])[^>\s]*))?)*)
+    \s*(/?)>
+''', re.VERBOSE)
+_ATTR = re.compile(r'''
+    [\s/]*([^\s/>][^\s/=>]*)
+    (?:\s*(=+)\s*('[^']*'|"[^"]*"|(?!['"])[^>\s]*))?
+''', re.VERBOSE)
+_END_TAG = re.compile(r'</\s*([a-zA-Z][^\t\n\r\f />\x00]*)\s*>')
+_COMMENT_END = re.compile(r'--\s*>')
+
+
+class Lexer:
+    """ Builds the node tree of a document fed in one or several parts, like
+    `Parser`. A feed must not end in the middle of a text, see `feed_chunks`
+    """
+
+    def __init__(self):
+        self.node: Optional[LightNode] = None
+        self.stack: List[LightNode] = []
+        self.budget = ParseBudget.from_settings()
+        self._buffer = ''
+        # The line of the first character of the buffer and the offset (from
+        # the start of the buffer, may be negative) of that line
+        self._line = 1
+        self._line_start = 0
+
+    def _error(self, message: str, position: int):
+        line = self._line + self._buffer.count('\n', 0, position)
+        line_start = self._buffer.rfind('\n', 0, position) + 1 or self._line_start
+        raise MalformedHTMLException(message, line=line, column=position - line_start + 1)
+
+    def _add_text(self, raw_text: str, position: int) -> None:
+        text = unescape(raw_text) if '&' in raw_text else raw_text
+        text = ' '.join(text.split())
+        if text:
+            if not self.stack:
+                position += len(raw_text) - len(raw_text.lstrip())
+                self._error('Text is only permitted inside the root tag', position)
+            if self.budget is not None:
+                self.budget.add_text(text)
+            self.stack[-1].children.append(text)
+
+    def _add_start_tag(self, tag: str, attrs: str, self_closing: bool,
+                       position: int) -> None:
+        node = LightNode(tag.lower(), self._parse_attrs(attrs) if attrs else {})
+        if self.budget is not None:
+            self.budget.add_tag(len(self.stack) + 1, node.attrs)
+        if self.stack:
+            self.stack[-1].children.append(node)
+        elif self.node is not None:
+            self._error('Only one root tag permitted', position)
+        elif self_closing:
+            self.node = node
+
+        if not self_closing:
+            self.stack.append(node)
+
+    @staticmethod
+    def _parse_attrs(attrs: str) -> dict:
+        parsed = {}
+        for name, equals, value in _ATTR.findall(attrs):
+            if not equals:
+                value = None
+            elif value:
+                if value[0] in '\'"' and value[0] == value[-1] and len(value) > 1:
+                    value = value[1:-1]
+                if '&' in value:
+                    value = unescape(value)
+            parsed[name.lower()] = value
+        return parsed
+
+    def _add_end_tag(self, tag: str, position: int) -> None:
+        tag = tag.lower()
+        if not self.stack:
+            self._error(f'</{tag}> was received, but no tag is opened', position)
+        node = self.stack.pop()
+        if node.tag != tag:
+            self._error(f'<{node.tag}> is the last opened tag, '
+                        f'but </{tag}> was received.', position)
+        if not self.stack:
+            self.node = node
+
+    def feed(self, data: str) -> None:
+        buffer = self._buffer + data if self._buffer else data
+        self._buffer = buffer
+        size = len(buffer)
+        position = 0
+
+        while position < size:
+            start = buffer.find('<', position)
+            if start < 0:
+                self._add_text(buffer[position:], position)
+                position = size
+                break
+            if start > position:
+                self._add_text(buffer[position:start], position)
+                position = start
+            if start + 1 == size:
+                # Wait for the next part
+                break
+
+            char = buffer[start + 1]
+            if char in ascii_letters:
+                match = _START_TAG.match(buffer, start)
+                if match is None:
+                    # A '>' may belong to a quoted attribute value which ends
+                    # in the next part, see `close`
+                    break
+                tag, attrs, slash = match.groups()
+                self._add_start_tag(tag, attrs, bool(slash), start)
+                position = match.end()
+            elif char == '/':
+                match = _END_TAG.match(buffer, start)
+                if match is None:
+                    if buffer.find('>', start) < 0:
+                        break
+                    self._error('Malformed end tag', start)
+                self._add_end_tag(match.group(1), start)
+                position = match.end()
+            elif char == '!' or char == '?':
+                if buffer.startswith('<!--', start):
+                    match = _COMMENT_END.search(buffer, start + 4)
+                    end = match.end() if match else -1
+                else:
+                    end = buffer.find('>', start) + 1 or -1
+                if end < 0:
+                    break
+                position = end
+            else:
+                # A '<' which does not start a tag is a text of its own
+                self._add_text('<', start)
+                position = start + 1
+
+        self._discard(position)
+
+    def _discard(self, position: int) -> None:
+        """ Drops the start of the buffer, which has been scanned """
+        buffer = self._buffer
+        lines = buffer.count('\n', 0, position)
+        if lines:
+            self._line += lines
+            self._line_start = buffer.rfind('\n', 0, position) + 1 - position
+        else:
+            self._line_start -= position
+        self._buffer = buffer[position:]
+
+    def close(self) -> None:
+        """ Checks that the whole document has been scanned and all its tags
+        closed
+        """
+        buffer = self._buffer
+        if buffer:
+            if len(buffer) > 1 and buffer[1] in ascii_letters and '>' in buffer:
+                self._error('Malformed start tag', 0)
+            self._error('Unterminated tag', 0)
+        if self.stack:
+            self._error(f'<{self.stack[-1].tag}> is not closed', 0)
+        if self.node is None:
+            raise MalformedHTMLException('The document has no root tag')
+
+
+def lex_node(html: str) -> LightNode:
+    """ The node tree of a document, see `onemsdk.parser.util.build_node` """
+    lexer = Lexer()
+    lexer.feed(html)
+    lexer.close()
+    return lexer.node
@@ -0,0 +1,86 @@
+from typing import Dict, NamedTuple, Optional
+
+from onemsdk.exceptions import ParseLimitException
+
+__all__ = ['ParseLimits', 'get_parse_limits', 'set_parse_limits']
+
+
+class ParseLimits(NamedTuple):
+    """ The limits of the documents accepted by the parsers, `None` for no
+    limit. `max_nodes` is the number of tags and text nodes of the whole
+    document, `max_text_bytes` the utf-8 size of its text and attribute values,
+    `max_attributes` the number of attributes of a tag
+    """
+    max_depth: Optional[int] = None
+    max_nodes: Optional[int] = None
+    max_text_bytes: Optional[int] = None
+    max_attributes: Optional[int] = None
+
+
+_limits = ParseLimits()
+
+
+def get_parse_limits() -> ParseLimits:
+    return _limits
+
+
+def set_parse_limits(max_depth: int = None, max_nodes: int = None,
+                     max_text_bytes: int = None, max_attributes: int = None) -> None:
+    """ Sets the limits enforced while the documents are parsed, by
+    `build_node`, `load_html` and `compile_html`. A document is rejected with
+    a `ParseLimitException` as soon as it exceeds one of them
+    """
+    global _limits
+    _limits = ParseLimits(max_depth, max_nodes, max_text_bytes, max_attributes)
+
+
+class ParseBudget:
+    """ What is left of the limits while a document is parsed """
+    __slots__ = ('limits', 'nodes', 'text_bytes')
+
+    def __init__(self, limits: ParseLimits):
+        self.limits = limits
+        self.nodes = 0
+        self.text_bytes = 0
+
+    @classmethod
+    def from_settings(cls) -> Optional['ParseBudget']:
+        """ The budget of a new document, `None` if there is no limit """
+        if _limits == ParseLimits():
+            return None
+        return cls(_limits)
+
+    def _exceeded(self, limit: str):
+        raise ParseLimitException(
+            f'The document exceeds {limit}={getattr(self.limits, limit)}', limit
+        )
+
+    def _add_node(self) -> None:
+        self.nodes += 1
+        if self.limits.max_nodes is not None and self.nodes > self.limits.max_nodes:
+            self._exceeded('max_nodes')
+
+    def _add_text_bytes(self, text: str) -> None:
+        if self.limits.max_text_bytes is not None:
+            self.text_bytes += len(text.encode('utf-8'))
+            if self.text_bytes > self.limits.max_text_bytes:
+                self._exceeded('max_text_bytes')
+
+    def add_tag(self, depth: int, attrs: Dict[str, Optional[str]]) -> None:
+        """ Counts a tag at `depth` (1 for the root) """
+        limits = self.limits
+        self._add_node()
+        if limits.max_depth is not None and depth > limits.max_depth:
+            self._exceeded('max_depth')
+        if attrs:
+            if limits.max_attributes is not None and len(attrs) > limits.max_attributes:
+                self._exceeded('max_attributes')
+            if limits.max_text_bytes is not None:
+                for value in attrs.values():
+                    if value:
+                        self._add_text_bytes(value)
+
+    def add_text(self, text: str) -> None:
+        """ Counts a text node """
+        self._add_node()
+        self._add_text_bytes(text)
@@ -13,3 +13,40 @@ class Node(BaseModel):
 
 
 Node.update_forward_refs()
+
+
+class LightNode:
+    """ The node built by the parser: the same interface as `Node`, without
+    the pydantic validation and without a `__dict__` per instance
+    """
+    __slots__ = ('tag', 'attrs', 'children')
+
+    def __init__(self, tag: str, attrs: Dict[str, Union[str, None]] = None,
+                 children: List[Union['LightNode', str]] = None):
+        self.tag = tag
+        self.attrs = attrs if attrs is not None else {}
+        self.children = children if children is not None else []
+
+    def add_child(self, child: Union['LightNode', str]):
+        self.children.append(child)
+
+    def to_node(self) -> Node:
+        """ Converts the whole tree into pydantic `Node` objects """
+        return Node(
+            tag=self.tag,
+            attrs=self.attrs,
+            children=[child if isinstance(child, str) else child.to_node()
+                      for child in self.children]
+        )
+
+    def __eq__(self, other):
+        if not isinstance(other, (LightNode, Node)):
+            return NotImplemented
+        return (self.tag == other.tag and self.attrs == other.attrs
+                and self.children == other.children)
+
+    def __repr__(self):
+        return f'<LightNode tag={self.tag!r} attrs={self.attrs!r}>'
+
+
+AnyNode = Union[Node, LightNode]
@@ -1,53 +1,199 @@
+import functools
 import inspect
 import sys
+import threading
 from abc import ABC, abstractmethod
+from contextlib import contextmanager
 from enum import Enum
-from typing import List, Union, Type, Optional, Dict, Any
-
-from pydantic import BaseModel
+from typing import Callable, Iterator, List, Union, Type, Optional, Dict, Any
 
 from onemsdk.exceptions import NodeTagMismatchException, ONEmSDKException
-from .node import Node
+from onemsdk.trusted import TrustedModel
+from .node import AnyNode
+from .visitor import TagDispatcher
 
 __all__ = ['Tag', 'HeaderTag', 'FooterTag', 'BrTag', 'UlTag', 'LiTag', 'FormTag',
            'SectionTag', 'InputTagAttrs', 'InputTag', 'FormTagAttrs', 'PTag', 'ATag',
-           'ATagAttrs', 'get_tag_cls', 'SectionTagAttrs', 'LiTagAttrs', 'InputTagType']
+           'ATagAttrs', 'get_tag_cls', 'SectionTagAttrs', 'LiTagAttrs', 'InputTagType',
+           'register_tag_cls', 'unregister_tag_cls', 'section_child_renderers',
+           'TagChildren', 'memoized_render', 'invalidate_render_caches',
+           'set_frozen_mode', 'get_frozen_mode', 'frozen']
+
+_frozen_mode = False
+
+# The mode set by frozen() in the current thread, overrides _frozen_mode
+_local = threading.local()
+
+# Incremented by each change of a tag, the rendered texts cached before are stale
+_mutation_epoch = 0
+
+
+def get_frozen_mode() -> bool:
+    enabled = getattr(_local, 'frozen', None)
+    return _frozen_mode if enabled is None else enabled
+
+
+def set_frozen_mode(enabled: bool) -> None:
+    """ Enables the frozen mode globally, see `memoized_render` """
+    global _frozen_mode
+    _frozen_mode = enabled
+
 
+@contextmanager
+def frozen(enabled: bool = True) -> Iterator[None]:
+    """ Enables (or disables) the frozen mode in the current thread, for the
+    duration of the `with` block
+    """
+    previous = getattr(_local, 'frozen', None)
+    _local.frozen = enabled
+    try:
+        yield
+    finally:
+        _local.frozen = previous
+
+
+def invalidate_render_caches() -> None:
+    """ Drops the texts cached by `memoized_render` in all the tags. Needed
+    only after a change the tags cannot see, e.g. an attribute assigned in the
+    attrs of a custom tag whose rendering depends on them
+    """
+    global _mutation_epoch
+    _mutation_epoch += 1
+
+
+def _mutator(method: Callable) -> Callable:
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        invalidate_render_caches()
+        return method(self, *args, **kwargs)
+    return wrapper
+
+
+class TagChildren(list):
+    """ The list of the children of a tag, whose changes invalidate the render
+    caches
+    """
+    __slots__ = ()
+
+    append = _mutator(list.append)
+    extend = _mutator(list.extend)
+    insert = _mutator(list.insert)
+    remove = _mutator(list.remove)
+    pop = _mutator(list.pop)
+    clear = _mutator(list.clear)
+    sort = _mutator(list.sort)
+    reverse = _mutator(list.reverse)
+    __setitem__ = _mutator(list.__setitem__)
+    __delitem__ = _mutator(list.__delitem__)
+    __iadd__ = _mutator(list.__iadd__)
+    __imul__ = _mutator(list.__imul__)
+
+    def __reduce__(self):
+        return TagChildren, (list(self),)
+
+
+def memoized_render(render: Callable[..., str]) -> Callable[..., str]:
+    """ Decorates the `render` method of a tag, so that while the frozen mode
+    is enabled the text is rendered once per tag and per combination of
+    arguments, then returned from a cache
+
+    The tags are treated as immutable: any change of a tag, i.e. an attribute
+    assigned or its children list changed in place, invalidates the caches of
+    all the tags. The tags whose children are not a `TagChildren` (e.g. built
+    by `construct`) are never cached.
+    """
+    @functools.wraps(render)
+    def wrapper(self, *args, **kwargs):
+        if (not get_frozen_mode() or
+                type(self.__dict__.get('children')) is not TagChildren):
+            return render(self, *args, **kwargs)
+
+        key = (args, tuple(kwargs.items())) if kwargs else args
+        epoch = _mutation_epoch
+        try:
+            cache_epoch, cache = self._render_cache
+        except AttributeError:
+            cache_epoch = cache = None
+        if cache_epoch != epoch:
+            cache = {}
+            object.__setattr__(self, '_render_cache', (epoch, cache))
+
+        try:
+            return cache[key]
+        except KeyError:
+            text = cache[key] = render(self, *args, **kwargs)
+            return text
+    return wrapper
+
+
+class Tag(TrustedModel, ABC):
+    # The texts cached by memoized_render, not a field
+    __slots__ = ('_render_cache',)
 
-class Tag(BaseModel, ABC):
     class Config:
         tag_name: str = None
 
     attrs: Any = None
     children: List[Union['Tag', str]] = []
 
+    def __init__(self, **data):
+        super(Tag, self).__init__(**data)
+        self.__dict__['children'] = TagChildren(self.__dict__['children'])
+
+    def __setattr__(self, name, value):
+        if name == 'children':
+            value = TagChildren(value)
+        invalidate_render_caches()
+        super(Tag, self).__setattr__(name, value)
+
     @abstractmethod
     def render(self) -> str:
         pass
 
     @classmethod
-    def from_node(cls, node: Node) -> 'Tag':
+    def from_node(cls, node: AnyNode) -> 'Tag':
+        """ Builds the tag tree of a node tree. The tree is walked with a
+        stack, not recursively, so its depth is not limited by the recursion
+        limit. The tags whose class overrides `from_node` are built by it
+        """
         if node.tag != cls.Config.tag_name:
             raise NodeTagMismatchException(
                 f'Expected tag <{cls.Config.tag_name}>, received <{node.tag}>')
 
-        attrs = cls.get_attrs(node)
-        children = []
+        root_children = []
+        # The tags being built: (class, attrs, iterator on the node children,
+        # tag children built so far)
+        stack = [(cls, cls.get_attrs(node), iter(node.children), [])]
+        while stack:
+            tag_cls, attrs, node_children, children = stack[-1]
+            for node_child in node_children:
+                if isinstance(node_child, str):
+                    children.append(node_child)
+                    continue
 
-        for node_child in node.children:
-            if isinstance(node_child, str):
-                children.append(node_child)
-            else:
                 child_tag_cls = get_tag_cls(node_child.tag)
-                children.append(child_tag_cls.from_node(node_child))
+                if child_tag_cls.from_node.__func__ is not _tag_from_node:
+                    children.append(child_tag_cls.from_node(node_child))
+                    continue
 
-        return cls(attrs=attrs, children=children)
+                stack.append((child_tag_cls, child_tag_cls.get_attrs(node_child),
+                              iter(node_child.children), []))
+                break
+            else:
+                stack.pop()
+                tag = tag_cls(attrs=attrs, children=children)
+                (stack[-1][3] if stack else root_children).append(tag)
+
+        return root_children[0]
 
     @classmethod
-    def get_attrs(cls, node: Node):
+    def get_attrs(cls, node: AnyNode):
         return None
 
 
+_tag_from_node = Tag.from_node.__func__
+
+
 class HeaderTag(Tag):
     class Config:
         tag_name = 'header'
@@ -106,7 +252,7 @@ class InputTagType(str, Enum):
     location = 'location'
 
 
-class InputTagAttrs(BaseModel):
+class InputTagAttrs(TrustedModel):
     # standard HTML5 attributes
     type: InputTagType
     min: Union[int, float] = None
@@ -134,7 +280,7 @@ class InputTag(Tag):
         super(InputTag, self).__init__(attrs=attrs)
 
     @classmethod
-    def get_attrs(cls, node: Node):
+    def get_attrs(cls, node: AnyNode):
         return InputTagAttrs(
             type=node.attrs.get('type'),
             min=node.attrs.get('min'),
@@ -177,7 +323,7 @@ class LabelTag(Tag):
 LabelTag.update_forward_refs()
 
 
-class ATagAttrs(BaseModel):
+class ATagAttrs(TrustedModel):
     href: str
     method: Optional[str] = 'GET'
 
@@ -194,7 +340,7 @@ class ATag(Tag):
         super(ATag, self).__init__(attrs=attrs, children=children)
 
     @classmethod
-    def get_attrs(cls, node: Node) -> ATagAttrs:
+    def get_attrs(cls, node: AnyNode) -> ATagAttrs:
         return ATagAttrs(href=node.attrs.get('href'),
                          method=node.attrs.get('method') or 'GET')
 
@@ -211,7 +357,7 @@ class ATag(Tag):
 ATag.update_forward_refs()
 
 
-class LiTagAttrs(BaseModel):
+class LiTagAttrs(TrustedModel):
     value: Optional[str]
     text_search: Optional[str]
 
@@ -232,7 +378,7 @@ class LiTag(Tag):
         super(LiTag, self).__init__(attrs=attrs, children=children)
 
     @classmethod
-    def get_attrs(cls, node: Node):
+    def get_attrs(cls, node: AnyNode):
         return LiTagAttrs(
             value=node.attrs.get('value'),
             text_search=node.attrs.get('text-search'),
@@ -256,6 +402,7 @@ class UlTag(Tag):
             raise ONEmSDKException('<ul> must have min 1 <li> child')
         super(UlTag, self).__init__(children=children)
 
+    @memoized_render
     def render(self):
         return '\n'.join([child.render() for child in self.children])
 
@@ -310,7 +457,39 @@ class BrTag(Tag):
 BrTag.update_forward_refs()
 
 
-class SectionTagAttrs(BaseModel):
+# The functions rendering the children of a <section>, called with the child,
+# exclude_header and exclude_footer. They return the text of the child and
+# whether it is a block, which is rendered on its own lines. Only the children
+# handled here are allowed in a <section>
+section_child_renderers = TagDispatcher('<section> renderer')
+
+
+@section_child_renderers.register(str)
+def _render_text(child: str, exclude_header: bool, exclude_footer: bool):
+    return child, False
+
+
+@section_child_renderers.register(InputTag, LabelTag, BrTag)
+def _render_inline(child: Tag, exclude_header: bool, exclude_footer: bool):
+    return child.render(), False
+
+
+@section_child_renderers.register(PTag, UlTag)
+def _render_block(child: Tag, exclude_header: bool, exclude_footer: bool):
+    return child.render(), True
+
+
+@section_child_renderers.register(HeaderTag)
+def _render_header(child: HeaderTag, exclude_header: bool, exclude_footer: bool):
+    return '' if exclude_header else child.render(), False
+
+
+@section_child_renderers.register(FooterTag)
+def _render_footer(child: FooterTag, exclude_header: bool, exclude_footer: bool):
+    return '' if exclude_footer else child.render(), False
+
+
+class SectionTagAttrs(TrustedModel):
     header: Optional[str]
     footer: Optional[str]
     name: Optional[str]
@@ -337,35 +516,24 @@ class SectionTag(Tag):
 
     def __init__(self, attrs: SectionTagAttrs = None, children: List = None):
         children = children or []
-        allowed_children = (FooterTag, HeaderTag, UlTag, PTag,
-                            InputTag, LabelTag, BrTag, str)
 
         for child in children:
-            if not isinstance(child, allowed_children):
+            if not section_child_renderers.handles(type(child)):
                 raise ONEmSDKException(
                     f'<{child.Config.tag_name}> cannot be child for <section>')
 
         super(SectionTag, self).__init__(attrs=attrs, children=children)
 
+    @memoized_render
     def render(self, exclude_header: bool = False, exclude_footer: bool = False):
         # Add a temporary \n for help
         rendered_children = ['\n']
 
         for child in self.children:
-            if isinstance(child, HeaderTag) and exclude_header:
-                # Do not include header
-                continue
-            if isinstance(child, FooterTag) and exclude_footer:
-                # Do not include footer
-                continue
-
-            if isinstance(child, str):
-                text = child
-            else:
-                text = child.render()
-
+            text, is_block = section_child_renderers(child, exclude_header,
+                                                     exclude_footer)
             if text:
-                if isinstance(child, PTag) or isinstance(child, UlTag):
+                if is_block:
                     if rendered_children[-1] != '\n':
                         rendered_children.append('\n')
                     rendered_children.append(text)
@@ -382,7 +550,7 @@ class SectionTag(Tag):
         return ''.join(rendered_children)
 
     @classmethod
-    def get_attrs(cls, node: Node) -> SectionTagAttrs:
+    def get_attrs(cls, node: AnyNode) -> SectionTagAttrs:
         return SectionTagAttrs(
             header=node.attrs.get('header'),
             footer=node.attrs.get('footer'),
@@ -409,7 +577,7 @@ class SectionTag(Tag):
 SectionTag.update_forward_refs()
 
 
-class FormTagAttrs(BaseModel):
+class FormTagAttrs(TrustedModel):
     header: Optional[str]
     footer: Optional[str]
     action: str
@@ -441,7 +609,7 @@ class FormTag(Tag):
         super(FormTag, self).__init__(attrs=attrs, children=children)
 
     @classmethod
-    def get_attrs(cls, node: Node):
+    def get_attrs(cls, node: AnyNode):
         return FormTagAttrs(
             header=node.attrs.get('header'),
             footer=node.attrs.get('footer'),
@@ -452,6 +620,7 @@ class FormTag(Tag):
             skip_confirmation='skip-confirmation' in node.attrs,
         )
 
+    @memoized_render
     def render(self):
         return '\n'.join([child.render() for child in self.children])
 
@@ -465,6 +634,18 @@ for name, obj in inspect.getmembers(sys.modules[__name__]):
         _map_tag_cls[obj.Config.tag_name] = obj
 
 
+def register_tag_cls(tag_cls: Type[Tag]) -> Type[Tag]:
+    """ Makes a custom tag class (keyed by its `Config.tag_name`) known to the
+    parser. Can be used as a class decorator
+    """
+    _map_tag_cls[tag_cls.Config.tag_name] = tag_cls
+    return tag_cls
+
+
+def unregister_tag_cls(tag_cls: Type[Tag]) -> None:
+    _map_tag_cls.pop(tag_cls.Config.tag_name, None)
+
+
 def get_tag_cls(tag_name: str) -> Type[Tag]:
     global _map_tag_cls
 
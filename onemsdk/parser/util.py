@@ -1,15 +1,34 @@
+import codecs
+import hashlib
+import os
+from datetime import date, time
+from decimal import Decimal
+from functools import partial
 from html.parser import HTMLParser
 from pathlib import Path
-from typing import Union, TypeVar
+from threading import Lock
+from time import perf_counter
+from typing import Any, Callable, Dict, Iterable, Optional, Union, TypeVar
 
 import jinja2
 
+from onemsdk import instrumentation
+from onemsdk.cache import CacheInfo, LRUCache
 from onemsdk.config import get_static_dir
 from onemsdk.exceptions import MalformedHTMLException, ONEmSDKException
-from onemsdk.parser.node import Node
+from onemsdk.parser.lexer import Lexer, lex_node
+from onemsdk.parser.limits import ParseBudget
+from onemsdk.parser.node import LightNode
 from onemsdk.parser.tag import get_tag_cls, Tag
+from onemsdk.trusted import trusted
 
-__all__ = ['load_html', 'load_template']
+__all__ = ['load_html', 'load_template', 'clear_html_cache', 'invalidate_html_cache',
+           'html_cache_info', 'set_html_cache_size', 'build_node_from_chunks',
+           'configure_templates', 'memoize_templates', 'clear_template_cache',
+           'template_cache_info', 'set_default_parser', 'get_default_parser']
+
+# How much of an html file is read at once
+_CHUNK_SIZE = 64 * 1024
 
 
 class Stack:
@@ -38,23 +57,26 @@ StackT = TypeVar('StackT', bound=Stack)
 class Parser(HTMLParser):
     def __init__(self):
         super(Parser, self).__init__()
-        self.node: Union[Node, None] = None
-        self.stack: StackT[Node] = Stack()
+        self.node: Union[LightNode, None] = None
+        self.stack: StackT[LightNode] = Stack()
+        self.budget = ParseBudget.from_settings()
 
     def handle_starttag(self, tag, attrs):
         if self.node:
             raise Exception('Only one root tag permitted')
 
-        tag_obj = Node(tag=tag, attrs=dict(attrs))
+        tag_obj = LightNode(tag, dict(attrs))
+        if self.budget is not None:
+            self.budget.add_tag(self.stack.size() + 1, tag_obj.attrs)
 
         if not self.stack.is_empty():
-            last_tag_obj: Node = self.stack.peek()
+            last_tag_obj: LightNode = self.stack.peek()
             last_tag_obj.add_child(tag_obj)
 
         self.stack.push(tag_obj)
 
     def handle_endtag(self, tag):
-        last_tag_obj: Node = self.stack.pop()
+        last_tag_obj: LightNode = self.stack.pop()
 
         if last_tag_obj.tag != tag:
             raise MalformedHTMLException(
@@ -66,8 +88,10 @@ class Parser(HTMLParser):
             self.node = last_tag_obj
 
     def handle_startendtag(self, tag, attrs):
-        tag_obj = Node(tag=tag, attrs=dict(attrs))
-        last_tag_obj: Node = self.stack.peek()
+        tag_obj = LightNode(tag, dict(attrs))
+        if self.budget is not None:
+            self.budget.add_tag(self.stack.size() + 1, tag_obj.attrs)
+        last_tag_obj: LightNode = self.stack.peek()
         last_tag_obj.add_child(tag_obj)
 
     def handle_data(self, data):
@@ -76,11 +100,40 @@ class Parser(HTMLParser):
             return
         data_bits = data.split()
         data = ' '.join(data_bits)
-        last_tag_obj: Node = self.stack.peek()
+        if self.budget is not None:
+            self.budget.add_text(data)
+        last_tag_obj: LightNode = self.stack.peek()
         last_tag_obj.add_child(data)
 
 
-def build_node(html: str) -> Node:
+# The parsers building the node trees: the subclass of the stdlib
+# html.parser.HTMLParser, or the tokenizer of onemsdk.parser.lexer
+_PARSERS = ('html.parser', 'lexer')
+_default_parser = 'html.parser'
+
+
+def get_default_parser() -> str:
+    return _default_parser
+
+
+def set_default_parser(parser: str) -> None:
+    """ Sets the parser used by `build_node`, `build_node_from_chunks` and
+    `load_html`: "html.parser" (the default) or "lexer", which is faster and
+    reports the line and column of the errors
+    """
+    global _default_parser
+    if parser not in _PARSERS:
+        raise ONEmSDKException(f'Unknown parser {parser!r}, expected one of {_PARSERS}')
+    _default_parser = parser
+
+
+def build_node(html: str, parser: str = None) -> LightNode:
+    """ The node tree of a document, built by `parser` ("html.parser" or
+    "lexer"), the default parser if it is not set
+    """
+    if (parser or _default_parser) == 'lexer':
+        return lex_node(html)
+
     parser = Parser()
     parser.feed(html)
     if not parser.stack.is_empty():
@@ -88,46 +141,348 @@ def build_node(html: str) -> Node:
     return parser.node
 
 
-def load_html(*, html_file: str = None, html_str: str = None) -> Tag:
-    if html_file:
-        html_file_path = Path(html_file)
-        if not html_file_path.is_absolute():
-            static_dir = get_static_dir()
+def feed_chunks(parser: Union[HTMLParser, Lexer], chunks: Iterable[Union[str, bytes]],
+                encoding: str = 'utf-8') -> None:
+    """ Feeds the parser with a document split in chunks, decoding the bytes
+    chunks with the given encoding
+
+    The parser emits the text it has at the end of each feed, which would split
+    a text node in two if the chunk ended in the middle of it. So each feed
+    stops right before a `<` and the rest is kept for the next one.
+    """
+    decoder = None
+    pending = ''
+
+    for chunk in chunks:
+        if not isinstance(chunk, str):
+            if decoder is None:
+                decoder = codecs.getincrementaldecoder(encoding)()
+            chunk = decoder.decode(chunk)
+
+        pending += chunk
+        cut = pending.rfind('<')
+        if cut > 0:
+            parser.feed(pending[:cut])
+            pending = pending[cut:]
+
+    if decoder is not None:
+        pending += decoder.decode(b'', final=True)
+    if pending:
+        parser.feed(pending)
+
+
+def build_node_from_chunks(chunks: Iterable[Union[str, bytes]],
+                           encoding: str = 'utf-8', parser: str = None) -> LightNode:
+    """ The same as `build_node`, for a document given as an iterable of
+    `str` or `bytes` chunks (a file object, a streaming response...)
+    """
+    if (parser or _default_parser) == 'lexer':
+        lexer = Lexer()
+        feed_chunks(lexer, chunks, encoding)
+        lexer.close()
+        return lexer.node
+
+    parser = Parser()
+    feed_chunks(parser, chunks, encoding)
+    if not parser.stack.is_empty():
+        raise MalformedHTMLException()
+    return parser.node
+
+
+def _resolve_html_file(html_file: str) -> Path:
+    html_file_path = Path(html_file)
+    if not html_file_path.is_absolute():
+        static_dir = get_static_dir()
+
+        if static_dir:
+            html_file_path = Path(static_dir).joinpath(html_file_path)
+
+    return html_file_path.resolve()
 
-            if static_dir:
-                html_file_path = Path(static_dir).joinpath(html_file_path)
 
-        with open(str(html_file_path), 'r') as f:
-            html_str = f.read()
+# Parsed html files, keyed by their resolved path. Each entry remembers the
+# mtime and size of the file it was parsed from, so a changed file is reparsed
+_html_cache = LRUCache(maxsize=128)
+
+
+def clear_html_cache() -> None:
+    """ Drops all the cached html files and resets the hit/miss counters """
+    _html_cache.clear()
+
+
+def invalidate_html_cache(html_file: str) -> None:
+    """ Drops the cached entry of a single html file, if there is one """
+    _html_cache.pop(str(_resolve_html_file(html_file)))
+
+
+def html_cache_info() -> CacheInfo:
+    return _html_cache.info()
+
+
+def set_html_cache_size(maxsize: Optional[int]) -> None:
+    """ Sets how many parsed html files are kept in memory. `None` means no
+    limit, `0` disables the cache
+    """
+    _html_cache.resize(maxsize)
+
+
+def _load_html_file(html_file: str) -> Tag:
+    html_file_path = _resolve_html_file(html_file)
+    key = str(html_file_path)
+
+    stat = os.stat(key)
+    stamp = (stat.st_mtime_ns, stat.st_size)
+
+    cached = _html_cache.get(key)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+
+    with open(key, 'r') as f:
+        tag = load_html(html_chunks=iter(partial(f.read, _CHUNK_SIZE), ''))
+
+    _html_cache.set(key, (stamp, tag))
+    return tag
+
+
+def load_html(*, html_file: str = None, html_str: str = None,
+              html_chunks: Iterable[Union[str, bytes]] = None) -> Tag:
+    """ Builds the tag tree of an html document, given as a string, as an
+    iterable of `str`/`bytes` chunks (utf-8) or as a file path (relative paths
+    are looked up in the static dir)
+
+    Trees loaded from files are cached and shared between the callers, so they
+    must be treated as read only.
+    """
+    if html_file:
+        return _load_html_file(html_file)
+
+    timed = instrumentation.enabled
+    if timed:
+        started_at = perf_counter()
+
+    if html_chunks is not None:
+        node = build_node_from_chunks(html_chunks)
+    else:
+        node = build_node(html_str)
+
+    if timed:
+        nodes = instrumentation.count_nodes(node)
+        started_at = instrumentation.emit(
+            instrumentation.Stage.parse, started_at,
+            size=len(html_str) if html_chunks is None else None, nodes=nodes
+        )
 
-    node = build_node(html_str)
     tag_cls = get_tag_cls(node.tag)
-    return tag_cls.from_node(node)
+    tag = tag_cls.from_node(node)
+
+    if timed:
+        instrumentation.emit(instrumentation.Stage.tag, started_at, nodes=nodes)
+    return tag
+
+
+# One jinja environment per templates dir, so the compiled templates are kept
+# between the calls
+_jinja_envs: Dict[str, jinja2.Environment] = {}
+_jinja_envs_lock = Lock()
+_jinja_bytecode_cache: Optional[jinja2.BytecodeCache] = None
+_jinja_auto_reload = True
+
+# The (mtime, size) of the template files built once with the validation, by
+# (kind, file), when the templates are trusted once validated
+_validated_templates: Optional[Dict[tuple, tuple]] = None
+
+
+def configure_templates(*, bytecode_cache_dir: str = None, auto_reload: bool = True,
+                        trust_validated: bool = False) -> None:
+    """ Configures the jinja environments used by `load_template`
+
+    :param bytecode_cache_dir: if set, the compiled templates are also stored
+        in this dir, so they are shared by all the worker processes and survive
+        the restarts
+    :param auto_reload: if `False`, the template files are never checked for
+        changes once they are compiled
+    :param trust_validated: if `True`, the result of a template is built with
+        the validation the first time, then in trusted mode (see
+        `onemsdk.trusted`) until the template file changes. The data must not
+        change the structure of the document in a way the first rendering did
+        not check
+    """
+    global _jinja_bytecode_cache, _jinja_auto_reload, _validated_templates
+
+    bytecode_cache = None
+    if bytecode_cache_dir is not None:
+        path = Path(bytecode_cache_dir)
+        if not path.exists() or not path.is_dir():
+            raise ONEmSDKException(f'{path.absolute()} is not a dir')
+        bytecode_cache = jinja2.FileSystemBytecodeCache(str(path.absolute()))
+
+    with _jinja_envs_lock:
+        _jinja_bytecode_cache = bytecode_cache
+        _jinja_auto_reload = auto_reload
+        _jinja_envs.clear()
+        _validated_templates = {} if trust_validated else None
+
+
+def _get_jinja_env(templates_dir: str) -> jinja2.Environment:
+    env = _jinja_envs.get(templates_dir)
+    if env is None:
+        with _jinja_envs_lock:
+            env = _jinja_envs.get(templates_dir)
+            if env is None:
+                env = jinja2.Environment(
+                    loader=jinja2.FileSystemLoader(templates_dir),
+                    bytecode_cache=_jinja_bytecode_cache,
+                    auto_reload=_jinja_auto_reload,
+                )
+                _jinja_envs[templates_dir] = env
+    return env
+
+
+def _get_template(template_file: str) -> jinja2.Template:
+    static_dir = get_static_dir()
+
+    if static_dir:
+        return _get_jinja_env(static_dir).get_template(template_file)
+
+    template_file_path = Path(template_file)
+    templates_dir = str(template_file_path.parent.absolute())
+
+    return _get_jinja_env(templates_dir).get_template(template_file_path.name)
+
+
+def _render(template: jinja2.Template, data: Dict[str, Any]) -> str:
+    if not instrumentation.enabled:
+        return template.render(data)
+    started_at = perf_counter()
+    html = template.render(data)
+    instrumentation.emit(instrumentation.Stage.template, started_at, size=len(html))
+    return html
+
 
+def _file_stamp(path: str) -> tuple:
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
 
-_jinja_env = None
+
+def _build(kind: str, template: jinja2.Template, data: Dict[str, Any],
+           build: Callable[[str], Any]) -> Any:
+    html = _render(template, data)
+
+    validated = _validated_templates
+    if validated is None:
+        return build(html)
+
+    key = (kind, template.filename)
+    stamp = _file_stamp(template.filename)
+    if validated.get(key) == stamp:
+        with trusted():
+            return build(html)
+
+    result = build(html)
+    validated[key] = stamp
+    return result
 
 
 def _load_template(template_file: str, **data) -> str:
-    global _jinja_env
+    return _render(_get_template(template_file), data)
 
-    template_file_path = Path(template_file)
-    static_dir = get_static_dir()
 
-    if not _jinja_env and static_dir:
-        _jinja_env = jinja2.Environment(
-            loader=jinja2.FileSystemLoader(str(static_dir))
-        )
+# Results of load_template, disabled unless memoize_templates() is called
+_template_cache: Optional[LRUCache] = None
+
+_REPR_TYPES = (type(None), bool, int, float, str, bytes, Decimal, date, time)
+
+
+def memoize_templates(maxsize: Optional[int] = 128, ttl: Optional[float] = None,
+                      cache=None) -> None:
+    """ Enables the memoization of `load_template` and `Response.from_template`
+
+    The results are keyed by the template file and a hash of the rendering
+    data. An entry is dropped when the template file changes, when it expires
+    after `ttl` seconds or when it is the least recently used one and the cache
+    holds `maxsize` entries. Calling it again drops all the memoized results,
+    `maxsize=0` disables the memoization.
+
+    `cache` replaces that cache of the process, e.g. with a
+    `onemsdk.shared_cache.SharedResponseCache` shared by the worker processes,
+    in which case `maxsize` and `ttl` are not used.
+
+    Only the data made of `dict`, `list`, `tuple`, `set` and of scalar values
+    can be hashed, the templates rendered with other objects are not memoized.
+    The memoized trees are shared between the callers and must be treated as
+    read only.
+    """
+    global _template_cache
+    if cache is not None:
+        _template_cache = cache
+    else:
+        _template_cache = LRUCache(maxsize=maxsize, ttl=ttl) if maxsize != 0 else None
+
+
+def clear_template_cache() -> None:
+    if _template_cache is not None:
+        _template_cache.clear()
+
+
+def template_cache_info() -> Optional[CacheInfo]:
+    if _template_cache is None:
+        return None
+    return _template_cache.info()
+
+
+def _canonical_repr(value: Any) -> str:
+    if isinstance(value, _REPR_TYPES):
+        return repr(value)
+    if isinstance(value, list):
+        return '[' + ', '.join([_canonical_repr(item) for item in value]) + ']'
+    if isinstance(value, tuple):
+        return '(' + ', '.join([_canonical_repr(item) for item in value]) + ')'
+    if isinstance(value, (set, frozenset)):
+        return '{' + ', '.join(sorted([_canonical_repr(item) for item in value])) + '}'
+    if isinstance(value, dict):
+        items = sorted([f'{_canonical_repr(k)}: {_canonical_repr(v)}'
+                        for k, v in value.items()])
+        return '{' + ', '.join(items) + '}'
+    raise TypeError(f'{type(value)} cannot be hashed')
+
+
+def context_hash(data: Dict[str, Any]) -> str:
+    """ A hash of the rendering data, stable between processes. Raises
+    `TypeError` for the data which cannot be hashed
+    """
+    return hashlib.sha1(_canonical_repr(data).encode('utf-8')).hexdigest()
+
+
+def render_template_cached(kind: str, template_file: str, data: Dict[str, Any],
+                           build: Callable[[str], Any]) -> Any:
+    """ Calls `build` with the rendered template, memoizing the result if
+    `memoize_templates()` was called. `kind` tells apart the different results
+    which may be built from the same template
+    """
+    cache = _template_cache
+    template = _get_template(template_file)
+
+    if cache is None:
+        return _build(kind, template, data, build)
+
+    try:
+        key = (kind, template.filename, context_hash(data))
+    except TypeError:
+        return _build(kind, template, data, build)
+
+    stamp = _file_stamp(template.filename)
+    cached = cache.get(key)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
 
-    if _jinja_env:
-        return _jinja_env.get_template(template_file).render(data)
+    result = _build(kind, template, data, build)
+    cache.set(key, (stamp, result))
+    return result
 
-    static_dir_ = str(template_file_path.parent.absolute())
 
-    return jinja2.Environment(
-        loader=jinja2.FileSystemLoader(static_dir_)
-    ).get_template(template_file_path.name).render(data)
+def _build_tag(html: str) -> Tag:
+    return load_html(html_str=html)
 
 
 def load_template(template_file: str, **data) -> Tag:
-    return load_html(html_str=_load_template(template_file, **data))
+    return render_template_cached('tag', template_file, data, _build_tag)
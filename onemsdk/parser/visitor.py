@@ -0,0 +1,61 @@
+from typing import Callable, Dict, Optional, Type
+
+from onemsdk.exceptions import ONEmSDKException
+
+__all__ = ['TagDispatcher']
+
+
+class TagDispatcher:
+    """ A table of functions keyed on the class of the tags (or `str` for the
+    text children), called with the tag as first argument
+
+    The function registered for the closest base class in the MRO is used when
+    a class has no function of its own, then `default` if it is set. The custom
+    tags are supported by registering their function in the dispatchers of the
+    tree walkers, e.g. `onemsdk.parser.tag.section_child_renderers` or
+    `onemsdk.schema.v1.menu_item_fields`.
+    """
+
+    def __init__(self, name: str, default: Callable = None):
+        self.name = name
+        self.default = default
+        self.registry: Dict[type, Callable] = {}
+        self._cache: Dict[type, Optional[Callable]] = {}
+
+    def register(self, *classes: Type) -> Callable[[Callable], Callable]:
+        """ Decorates the function handling the tags of `classes` """
+        def decorator(func: Callable) -> Callable:
+            for cls in classes:
+                self.registry[cls] = func
+            self._cache.clear()
+            return func
+        return decorator
+
+    def unregister(self, *classes: Type) -> None:
+        for cls in classes:
+            self.registry.pop(cls, None)
+        self._cache.clear()
+
+    def find(self, cls: Type) -> Optional[Callable]:
+        """ The function handling `cls`, or `None` if there is none """
+        try:
+            return self._cache[cls]
+        except KeyError:
+            pass
+
+        func = self.default
+        for base in cls.__mro__:
+            if base in self.registry:
+                func = self.registry[base]
+                break
+        self._cache[cls] = func
+        return func
+
+    def handles(self, cls: Type) -> bool:
+        return self.find(cls) is not None
+
+    def __call__(self, tag, *args, **kwargs):
+        func = self._cache.get(type(tag)) or self.find(type(tag))
+        if func is None:
+            raise ONEmSDKException(f'{self.name} does not handle {type(tag).__name__}')
+        return func(tag, *args, **kwargs)
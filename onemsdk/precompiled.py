@@ -0,0 +1,94 @@
+"""
+Serves the `Response` json artifacts written by `scripts/precompile.py`. This
+module does not import the parser nor the schema models.
+"""
+import hashlib
+import json
+import os
+from threading import Lock
+from typing import Dict, List
+
+from onemsdk.exceptions import ONEmSDKException
+
+__all__ = ['PrecompiledResponses']
+
+MANIFEST_FILE = 'manifest.json'
+MANIFEST_VERSION = 1
+
+
+class PrecompiledResponses:
+    """ The precompiled responses of a static dir, by html file path relative
+    to the static dir (with `/` separators)
+
+    The artifacts are read on their first use and kept in memory. If `verify`
+    is set, their content is checked against the hashes of the manifest.
+    """
+
+    def __init__(self, artifacts_dir: str, verify: bool = False):
+        self.artifacts_dir = os.path.abspath(artifacts_dir)
+        self.verify = verify
+
+        manifest_path = os.path.join(self.artifacts_dir, MANIFEST_FILE)
+        try:
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            raise ONEmSDKException(f'{manifest_path} does not exist')
+        if manifest.get('version') != MANIFEST_VERSION:
+            raise ONEmSDKException(
+                f'Unsupported manifest version {manifest.get("version")!r}')
+
+        self.onemsdk_version: str = manifest['onemsdk_version']
+        self.files: Dict[str, dict] = manifest['files']
+        self._contents: Dict[str, bytes] = {}
+        self._lock = Lock()
+
+    def __contains__(self, html_file: str) -> bool:
+        return html_file in self.files
+
+    def __len__(self) -> int:
+        return len(self.files)
+
+    def get(self, html_file: str) -> bytes:
+        """ The json of the response of an html file """
+        content = self._contents.get(html_file)
+        if content is not None:
+            return content
+
+        try:
+            entry = self.files[html_file]
+        except KeyError:
+            raise ONEmSDKException(f'{html_file} was not precompiled')
+
+        with open(os.path.join(self.artifacts_dir, entry['artifact']), 'rb') as f:
+            content = f.read()
+        if self.verify and hashlib.sha256(content).hexdigest() != entry['sha256']:
+            raise ONEmSDKException(f'The artifact of {html_file} does not match '
+                                   f'the manifest')
+
+        with self._lock:
+            self._contents[html_file] = content
+        return content
+
+    def etag(self, html_file: str) -> str:
+        """ The content hash of the response of an html file """
+        try:
+            return self.files[html_file]['sha256']
+        except KeyError:
+            raise ONEmSDKException(f'{html_file} was not precompiled')
+
+    def stale_files(self, static_dir: str) -> List[str]:
+        """ The html files of `static_dir` which changed or disappeared since
+        they were precompiled
+        """
+        stale = []
+        for html_file, entry in sorted(self.files.items()):
+            path = os.path.join(static_dir, *html_file.split('/'))
+            try:
+                with open(path, 'rb') as f:
+                    source_hash = hashlib.sha256(f.read()).hexdigest()
+            except FileNotFoundError:
+                source_hash = None
+            if source_hash != entry['source_sha256']:
+                stale.append(html_file)
+        return stale
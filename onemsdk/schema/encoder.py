@@ -0,0 +1,126 @@
+import json
+from enum import Enum
+from json.encoder import encode_basestring_ascii
+from time import perf_counter
+from typing import Any, Callable, Dict, List
+
+from pydantic import BaseModel
+from pydantic.json import pydantic_encoder
+
+from onemsdk import instrumentation
+
+__all__ = ['encode_json', 'encode_json_bytes']
+
+# '"key": ' fragments, by key
+_key_fragments: Dict[str, str] = {}
+
+# Encoded enum members, by member
+_enum_fragments: Dict[Enum, str] = {}
+
+
+def _key_fragment(key: str) -> str:
+    fragment = _key_fragments.get(key)
+    if fragment is None:
+        fragment = encode_basestring_ascii(key) + ': '
+        _key_fragments[key] = fragment
+    return fragment
+
+
+def _encode_float(value: float) -> str:
+    # The same representation as json.dumps()
+    if value != value:
+        return 'NaN'
+    if value == float('inf'):
+        return 'Infinity'
+    if value == -float('inf'):
+        return '-Infinity'
+    return float.__repr__(value)
+
+
+def _encode_model(model: BaseModel, append: Callable[[str], None]) -> None:
+    separator = '{'
+    for key, value in model.__dict__.items():
+        append(separator)
+        append(_key_fragment(key))
+        # Most of the fields are strings or not set
+        if value is None:
+            append('null')
+        elif type(value) is str:
+            append(encode_basestring_ascii(value))
+        else:
+            _encode(value, append)
+        separator = ', '
+    append('}' if separator == ', ' else '{}')
+
+
+def _encode_dict(value: dict, append: Callable[[str], None]) -> None:
+    separator = '{'
+    for key, item in value.items():
+        append(separator)
+        append(_key_fragment(key))
+        _encode(item, append)
+        separator = ', '
+    append('}' if separator == ', ' else '{}')
+
+
+def _encode_list(value: list, append: Callable[[str], None]) -> None:
+    separator = '['
+    for item in value:
+        append(separator)
+        _encode(item, append)
+        separator = ', '
+    append(']' if separator == ', ' else '[]')
+
+
+def _encode(value: Any, append: Callable[[str], None]) -> None:
+    value_type = type(value)
+
+    if value_type is str:
+        append(encode_basestring_ascii(value))
+    elif value is None:
+        append('null')
+    elif value is True:
+        append('true')
+    elif value is False:
+        append('false')
+    elif isinstance(value, Enum):
+        fragment = _enum_fragments.get(value)
+        if fragment is None:
+            fragment = json.dumps(value, default=pydantic_encoder)
+            _enum_fragments[value] = fragment
+        append(fragment)
+    elif isinstance(value, BaseModel):
+        _encode_model(value, append)
+    elif isinstance(value, (list, tuple)):
+        _encode_list(value, append)
+    elif isinstance(value, dict) and all(isinstance(key, str) for key in value):
+        _encode_dict(value, append)
+    elif value_type is int:
+        append(int.__repr__(value))
+    elif value_type is float:
+        append(_encode_float(value))
+    else:
+        append(json.dumps(value, default=pydantic_encoder))
+
+
+def encode_json(model: BaseModel) -> str:
+    """ Serializes a model exactly like `model.json()` does, without building
+    the intermediary dicts and reusing the encoded keys and enum values
+    """
+    timed = instrumentation.enabled
+    if timed:
+        started_at = perf_counter()
+
+    parts: List[str] = []
+    _encode(model, parts.append)
+    result = ''.join(parts)
+
+    if timed:
+        instrumentation.emit(instrumentation.Stage.serialize, started_at,
+                             size=len(result))
+    return result
+
+
+def encode_json_bytes(model: BaseModel) -> bytes:
+    """ The same as `encode_json`, encoded as bytes. The json is pure ascii """
+    return encode_json(model).encode('ascii')
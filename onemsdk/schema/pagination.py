@@ -0,0 +1,151 @@
+import re
+from typing import List, Optional, Sequence, Union
+
+from onemsdk.exceptions import ONEmSDKException
+from onemsdk.schema.v1 import (FormItem, FormItemType, Menu, MenuItem,
+                               MenuItemFormItem)
+
+__all__ = ['paginate_menu', 'paginate_form_item', 'page_cursor', 'encode_cursor',
+           'decode_cursor']
+
+_DIGITS = '0123456789abcdefghijklmnopqrstuvwxyz'
+_CURSOR = re.compile('[0-9a-z]+')
+
+AnyMenuItem = Union[MenuItem, MenuItemFormItem]
+
+
+def encode_cursor(page: int) -> str:
+    """ The cursor of a page: its index in base 36 """
+    if page < 0:
+        raise ValueError('The page index must be positive')
+    digits = []
+    while True:
+        page, digit = divmod(page, 36)
+        digits.append(_DIGITS[digit])
+        if not page:
+            return ''.join(reversed(digits))
+
+
+def decode_cursor(cursor: Optional[str]) -> int:
+    """ The index of the page of a cursor, the first page if it is empty. The
+    cursors come from the clients: only the lowercase base 36 digits are
+    accepted, without sign nor whitespace
+    """
+    if not cursor:
+        return 0
+    if not isinstance(cursor, str) or not _CURSOR.fullmatch(cursor):
+        raise ONEmSDKException(f'Invalid page cursor {cursor!r}')
+    return int(cursor, 36)
+
+
+def _page_starts(items: Sequence[AnyMenuItem], page_size: Optional[int],
+                 max_chars: Optional[int]) -> List[int]:
+    if page_size is None and max_chars is None:
+        raise ONEmSDKException('page_size or max_chars is required')
+    if page_size is not None and page_size < 1:
+        raise ONEmSDKException('page_size must be at least 1')
+
+    if max_chars is None:
+        return list(range(0, max(len(items), 1), page_size))
+
+    starts = [0]
+    count = 0
+    chars = 0
+    for index, item in enumerate(items):
+        # Each item is displayed on its own line
+        item_chars = len(item.description) + 1
+        page_full = (
+            page_size is not None and count == page_size or
+            count and chars + item_chars > max_chars
+        )
+        if page_full:
+            starts.append(index)
+            count = 0
+            chars = 0
+        count += 1
+        chars += item_chars
+    return starts
+
+
+def _page(items: Sequence[AnyMenuItem], cursor: Optional[str], page_size: Optional[int],
+          max_chars: Optional[int], labels: Sequence[str]):
+    if max_chars is not None:
+        # Room for the navigation items, which are on all the pages
+        max_chars -= sum(len(label) + 1 for label in labels)
+
+    starts = _page_starts(items, page_size, max_chars)
+    page = decode_cursor(cursor)
+    if page >= len(starts):
+        raise ONEmSDKException(f'Page cursor {cursor!r} is out of range')
+
+    end = starts[page + 1] if page + 1 < len(starts) else len(items)
+    next_cursor = encode_cursor(page + 1) if page + 1 < len(starts) else None
+    previous_cursor = encode_cursor(page - 1) if page > 0 else None
+    return items[starts[page]:end], next_cursor, previous_cursor
+
+
+def _cursor_path(path: str, cursor_param: str, cursor: str) -> str:
+    separator = '&' if '?' in path else '?'
+    return f'{path}{separator}{cursor_param}={cursor}'
+
+
+def paginate_menu(menu: Menu, path: str, cursor: str = None, *, page_size: int = None,
+                  max_chars: int = None, next_label: str = 'Next',
+                  previous_label: str = 'Previous', cursor_param: str = 'page') -> Menu:
+    """ Returns the page of `menu` given by `cursor` (the first one if it is
+    not set), followed by the options leading to the next and previous pages
+
+    The pages hold at most `page_size` items and/or at most `max_chars`
+    characters of item descriptions, one line per item and the navigation
+    options included. The navigation options call `path` with the cursor of
+    their page in the `cursor_param` query parameter.
+    """
+    body, next_cursor, previous_cursor = _page(
+        menu.body, cursor, page_size, max_chars, (next_label, previous_label)
+    )
+    body = list(body)
+    if next_cursor is not None:
+        body.append(MenuItem(description=next_label,
+                             path=_cursor_path(path, cursor_param, next_cursor)))
+    if previous_cursor is not None:
+        body.append(MenuItem(description=previous_label,
+                             path=_cursor_path(path, cursor_param, previous_cursor)))
+
+    return Menu(body=body, header=menu.header, footer=menu.footer, meta=menu.meta)
+
+
+def paginate_form_item(form_item: FormItem, cursor: str = None, *,
+                       page_size: int = None, max_chars: int = None,
+                       next_label: str = 'Next', previous_label: str = 'Previous',
+                       value_prefix: str = 'page:') -> FormItem:
+    """ Returns a copy of a form-menu `FormItem` whose body is the page given
+    by `cursor`, followed by the options leading to the next and previous pages,
+    see `paginate_menu`
+
+    The value of a navigation option is `value_prefix` followed by the cursor
+    of its page, `page_cursor` extracts it from the submitted value.
+    """
+    if form_item.type != FormItemType.form_menu:
+        raise ONEmSDKException(f'Only a {FormItemType.form_menu} FormItem can be paginated')
+
+    body, next_cursor, previous_cursor = _page(
+        form_item.body, cursor, page_size, max_chars, (next_label, previous_label)
+    )
+    body = list(body)
+    if next_cursor is not None:
+        body.append(MenuItemFormItem(description=next_label,
+                                     value=f'{value_prefix}{next_cursor}'))
+    if previous_cursor is not None:
+        body.append(MenuItemFormItem(description=previous_label,
+                                     value=f'{value_prefix}{previous_cursor}'))
+
+    return form_item.copy(update={'body': body})
+
+
+def page_cursor(value: Optional[str], value_prefix: str = 'page:') -> Optional[str]:
+    """ The cursor of the page a form-menu value leads to, or `None` if the
+    value is not the one of a navigation option
+    """
+    if value and value.startswith(value_prefix):
+        return value[len(value_prefix):]
+    return None
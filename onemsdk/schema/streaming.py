@@ -0,0 +1,76 @@
+import io
+from typing import IO, Iterable, Iterator, List, Union
+
+from onemsdk.parser import BrTag, LiTag, PTag
+from onemsdk.schema.encoder import _encode, encode_json
+from onemsdk.schema.v1 import Menu, MenuItem, MenuMeta, Response
+
+__all__ = ['iter_menu_json', 'iter_menu_json_bytes', 'write_menu_json']
+
+MenuItemSource = Union[MenuItem, LiTag, PTag, BrTag, str]
+
+_EMPTY_BODY = '"body": []'
+
+_CHUNK_SIZE = 64 * 1024
+
+
+def iter_menu_json(items: Iterable[MenuItemSource], header: str = None,
+                   footer: str = None, meta: MenuMeta = None,
+                   chunk_size: int = _CHUNK_SIZE) -> Iterator[str]:
+    """ Yields the json of a menu `Response` in chunks of about `chunk_size`
+    characters, consuming `items` as it goes, so the whole menu is never held
+    in memory
+
+    The items are `MenuItem`s or the tags (or text) accepted by
+    `MenuItem.from_tag`. The json is the same as the one of
+    `Response(content=Menu(body=list(items), ...))`
+    """
+    # The json of the response without items gives the parts around the body
+    envelope = encode_json(Response(content=Menu(body=[], header=header, footer=footer,
+                                                 meta=meta)))
+    prefix, suffix = envelope.split(_EMPTY_BODY, 1)
+
+    parts: List[str] = [prefix, '"body": [']
+    size = 0
+    separator = ''
+    for item in items:
+        if not isinstance(item, MenuItem):
+            item = MenuItem.from_tag(item)
+            if item is None:
+                continue
+        parts.append(separator)
+        item_parts: List[str] = []
+        _encode(item, item_parts.append)
+        parts.extend(item_parts)
+        separator = ', '
+
+        size += sum(map(len, item_parts))
+        if size >= chunk_size:
+            yield ''.join(parts)
+            parts = []
+            size = 0
+
+    parts.append(']')
+    parts.append(suffix)
+    yield ''.join(parts)
+
+
+def iter_menu_json_bytes(items: Iterable[MenuItemSource], header: str = None,
+                         footer: str = None, meta: MenuMeta = None,
+                         chunk_size: int = _CHUNK_SIZE) -> Iterator[bytes]:
+    """ The same as `iter_menu_json`, encoded as bytes, e.g. to be the content
+    of a `django.http.StreamingHttpResponse`
+    """
+    for chunk in iter_menu_json(items, header, footer, meta, chunk_size):
+        yield chunk.encode('ascii')
+
+
+def write_menu_json(fp: IO, items: Iterable[MenuItemSource], header: str = None,
+                    footer: str = None, meta: MenuMeta = None) -> None:
+    """ Writes the json of `iter_menu_json` to a text or binary file object """
+    if isinstance(fp, io.TextIOBase):
+        chunks = iter_menu_json(items, header, footer, meta)
+    else:
+        chunks = iter_menu_json_bytes(items, header, footer, meta)
+    for chunk in chunks:
+        fp.write(chunk)
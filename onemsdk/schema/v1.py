@@ -1,12 +1,17 @@
 from enum import Enum
+from time import perf_counter
 from typing import List, Union, Optional
 
-from pydantic import BaseModel, Schema
+from pydantic import Schema
 
+from onemsdk import instrumentation
 from onemsdk.exceptions import ONEmSDKException
 from onemsdk.parser import (FormTag, SectionTag, LiTag, PTag, BrTag, UlTag,
                             ATag, HeaderTag, FooterTag, InputTag)
-from onemsdk.parser.tag import InputTagType
+from onemsdk.parser.tag import InputTagType, Tag
+from onemsdk.parser.visitor import TagDispatcher
+from onemsdk.parser.util import load_html, render_template_cached
+from onemsdk.trusted import TrustedModel
 
 
 class MenuItemType(str, Enum):
@@ -25,7 +30,7 @@ class HttpMethod(str, Enum):
     TRACE = 'TRACE'
 
 
-class MenuItem(BaseModel):
+class MenuItem(TrustedModel):
     """
     [`Menu`](#menu) related component used to display menu items, selectable or
     raw
@@ -68,33 +73,37 @@ class MenuItem(BaseModel):
 
     @classmethod
     def from_tag(cls, tag: Union[LiTag, PTag, BrTag, str]) -> Optional['MenuItem']:
-        if isinstance(tag, str):
-            description = tag
-        else:
-            description = tag.render()
-
+        description, text_search, method, path = menu_item_fields(tag)
         if not description:
             return None
 
-        method = None
-        path = None
-        text_search = None
-
-        if isinstance(tag, LiTag):
-            child = tag.children[0]
-            if isinstance(child, ATag):
-                method = child.attrs.method
-                path = child.attrs.href
-                text_search = tag.attrs.text_search
-
         return MenuItem(description=description, text_search=text_search, method=method,
                         path=path)
 
 
 MenuItem.update_forward_refs()
 
+# The functions returning the (description, text_search, method, path) of the
+# MenuItem of a tag
+menu_item_fields = TagDispatcher(
+    'MenuItem builder', default=lambda tag: (tag.render(), None, None, None)
+)
+
+
+@menu_item_fields.register(str)
+def _menu_item_text_fields(text: str):
+    return text, None, None, None
+
+
+@menu_item_fields.register(LiTag)
+def _menu_item_li_fields(tag: LiTag):
+    child = tag.children[0]
+    if isinstance(child, ATag):
+        return tag.render(), tag.attrs.text_search, child.attrs.method, child.attrs.href
+    return tag.render(), None, None, None
+
 
-class MenuMeta(BaseModel):
+class MenuMeta(TrustedModel):
     """
    [`Menu`](#menu) related component holding configuration fields for the menu
     """
@@ -108,7 +117,7 @@ class MenuMeta(BaseModel):
 MenuMeta.update_forward_refs()
 
 
-class Menu(BaseModel):
+class Menu(TrustedModel):
     """
     A top level component used to display a menu or raw text
     """
@@ -135,24 +144,14 @@ class Menu(BaseModel):
 
     @classmethod
     def from_tag(cls, section_tag: SectionTag) -> 'Menu':
-        body = []
-        header = None
-        footer = None
-
+        parts = _MenuParts()
         for child in section_tag.children:
-            if isinstance(child, UlTag):
-                body.extend([MenuItem.from_tag(li) for li in child.children])
-            elif isinstance(child, HeaderTag):
-                header = child.render()
-            elif isinstance(child, FooterTag):
-                footer = child.render()
-            else:
-                body.append(MenuItem.from_tag(child))
+            menu_child_handlers(child, parts)
 
         return Menu(
-            body=list(filter(None, body)),
-            header=header or section_tag.attrs.header,
-            footer=footer or section_tag.attrs.footer,
+            body=list(filter(None, parts.body)),
+            header=parts.header or section_tag.attrs.header,
+            footer=parts.footer or section_tag.attrs.footer,
             meta=MenuMeta(
                 auto_select=section_tag.attrs.auto_select
             )
@@ -162,6 +161,36 @@ class Menu(BaseModel):
 Menu.update_forward_refs()
 
 
+class _MenuParts:
+    __slots__ = ('body', 'header', 'footer')
+
+    def __init__(self):
+        self.body = []
+        self.header = None
+        self.footer = None
+
+
+# The functions adding the children of a <section> to the parts of a Menu
+menu_child_handlers = TagDispatcher(
+    'Menu builder', default=lambda child, parts: parts.body.append(MenuItem.from_tag(child))
+)
+
+
+@menu_child_handlers.register(UlTag)
+def _menu_ul(child: UlTag, parts: _MenuParts):
+    parts.body.extend([MenuItem.from_tag(li) for li in child.children])
+
+
+@menu_child_handlers.register(HeaderTag)
+def _menu_header(child: HeaderTag, parts: _MenuParts):
+    parts.header = child.render()
+
+
+@menu_child_handlers.register(FooterTag)
+def _menu_footer(child: FooterTag, parts: _MenuParts):
+    parts.footer = child.render()
+
+
 class FormItemType(str, Enum):
     string = 'string'  # the user should enter a string during this step
     date = 'date'  # the user should enter a date
@@ -176,7 +205,7 @@ class FormItemType(str, Enum):
     regex_ = 'regex'  # validated against an ECMA script regex pattern
 
 
-class MenuItemFormItem(BaseModel):
+class MenuItemFormItem(TrustedModel):
     """
     [`FormItem`](#formitem) related component used to display menu items,
     selectable or raw
@@ -212,29 +241,36 @@ class MenuItemFormItem(BaseModel):
     @classmethod
     def from_tag(cls, tag: Union[LiTag, PTag, BrTag, str]
                  ) -> Union['MenuItemFormItem', None]:
-        value = None
-        text_search = None
-
-        if isinstance(tag, str):
-            description = tag
-        else:
-            description = tag.render()
-
+        description, value, text_search = menu_item_form_item_fields(tag)
         if not description:
             return None
 
-        if isinstance(tag, LiTag):
-            value = tag.attrs.value
-            text_search = tag.attrs.text_search
-
         return MenuItemFormItem(value=value, description=description,
                                 text_search=text_search)
 
 
 MenuItemFormItem.update_forward_refs()
 
+_MENU_ITEM_FORM_ITEM_FIELDS = set(MenuItemFormItem.__fields__)
+
+# The functions returning the (description, value, text_search) of the
+# MenuItemFormItem of a tag
+menu_item_form_item_fields = TagDispatcher(
+    'MenuItemFormItem builder', default=lambda tag: (tag.render(), None, None)
+)
+
+
+@menu_item_form_item_fields.register(str)
+def _menu_item_form_item_text_fields(text: str):
+    return text, None, None
+
+
+@menu_item_form_item_fields.register(LiTag)
+def _menu_item_form_item_li_fields(tag: LiTag):
+    return tag.render(), tag.attrs.value, tag.attrs.text_search
 
-class MenuFormItemMeta(BaseModel):
+
+class MenuFormItemMeta(TrustedModel):
     """
     [`FormItem`](#formitem) related component holding configuration field for
     a menu inside a form item
@@ -257,7 +293,7 @@ class MenuFormItemMeta(BaseModel):
 MenuFormItemMeta.update_forward_refs()
 
 
-class FormItem(BaseModel):
+class FormItem(TrustedModel):
     """
     [`Form`](#form) related component used to acquire certain information from
     the user
@@ -411,118 +447,45 @@ class FormItem(BaseModel):
 
     @classmethod
     def from_tag(cls, section: SectionTag) -> 'FormItem':
-        type_ = None
-        header = None
-        footer = None
-        body = []
-        value = None
-        min_value = None
-        min_value_error = None
-        min_length = None
-        min_length_error = None
-        max_value = None
-        max_value_error = None
-        max_length = None
-        max_length_error = None
-        description = None
-        pattern = None
-
-        content_types_map = {
-            InputTagType.date: FormItemType.date,
-            InputTagType.datetime: FormItemType.datetime,
-            InputTagType.text: FormItemType.string,
-            InputTagType.hidden: FormItemType.hidden,
-            InputTagType.email: FormItemType.email,
-            InputTagType.location: FormItemType.location,
-            InputTagType.url: FormItemType.url,
-        }
-
+        parts = _FormItemParts(section)
         for child in section.children:
-            if isinstance(child, InputTag):
-                input_type = child.attrs.type
-
-                # HTML does not have type "int" or "float", it has "number"
-                # If the input type is "number", determine if it's "int" or "float"
-                if input_type == InputTagType.number:
-                    if child.attrs.step == 1:
-                        type_ = FormItemType.int
-                    else:
-                        type_ = FormItemType.float
-                elif input_type == InputTagType.hidden:
-                    value = child.attrs.value
-                    if value is None:
-                        raise ONEmSDKException(
-                            'value attribute is required for input type="hidden"'
-                        )
-
-                is_regex_type = child.attrs.pattern is not None
-                if is_regex_type:
-                    # Override type with 'regex' if pattern is declared
-                    type_ = FormItemType.regex_
-
-                if type_ is None:
-                    type_ = content_types_map[input_type]
-
-                min_value = child.attrs.min
-                min_value_error = child.attrs.min_error
-                min_length = child.attrs.minlength
-                min_length_error = child.attrs.minlength_error
-                max_value = child.attrs.max
-                max_value_error = child.attrs.max_error
-                max_length = child.attrs.maxlength
-                max_length_error = child.attrs.maxlength_error
-                description = section.render(True, True)
-                pattern = child.attrs.pattern
-
-                # Ignore other <input> tags if exist
-                break
-            if isinstance(child, UlTag):
-                type_ = FormItemType.form_menu
-
-                for child2 in section.children:
-                    if isinstance(child2, UlTag):
-                        for li in child.children:
-                            menu_item_form_item = MenuItemFormItem.from_tag(li)
-                            if menu_item_form_item:
-                                body.append(menu_item_form_item)
-                    elif isinstance(child2, HeaderTag):
-                        pass
-                    elif isinstance(child2, FooterTag):
-                        pass
-                    else:
-                        menu_item_form_item = MenuItemFormItem.from_tag(child2)
-                        if menu_item_form_item:
-                            body.append(menu_item_form_item)
+            if form_item_child_handlers(child, parts):
                 break
-        else:
+
+        if parts.type is None:
             raise ONEmSDKException(
                 'When <section> plays the role of a form item, '
                 'it must contain a <input/> or <ul></ul>'
             )
 
+        header = None
+        footer = None
         if isinstance(section.children[0], HeaderTag):
             header = section.children[0].render()
         if isinstance(section.children[-1], FooterTag):
             footer = section.children[-1].render()
 
-        return FormItem(
-            type=type_,
+        # Only the first item of the body is validated: pydantic copies the
+        # validated models and the items are built from the validated tags
+        body = parts.body or None
+        form_item = FormItem(
+            type=parts.type,
             name=section.attrs.name,
-            description=description,
+            description=parts.description,
             header=header or section.attrs.header,
             footer=footer or section.attrs.footer,
-            body=body or None,
-            value=value,
+            body=body and body[:1],
+            value=parts.value,
             chunking_footer=section.attrs.chunking_footer,
             confirmation_label=section.attrs.confirmation_label,
-            min_value=min_value,
-            min_value_error=min_value_error,
-            min_length=min_length,
-            min_length_error=min_length_error,
-            max_value=max_value,
-            max_value_error=max_value_error,
-            max_length=max_length,
-            max_length_error=max_length_error,
+            min_value=parts.min_value,
+            min_value_error=parts.min_value_error,
+            min_length=parts.min_length,
+            min_length_error=parts.min_length_error,
+            max_value=parts.max_value,
+            max_value_error=parts.max_value_error,
+            max_length=parts.max_length,
+            max_length_error=parts.max_length_error,
             meta=MenuFormItemMeta(
                 auto_select=section.attrs.auto_select,
                 multi_select=section.attrs.multi_select,
@@ -530,7 +493,7 @@ class FormItem(BaseModel):
             ),
             method=section.attrs.method,
             required=section.attrs.required,
-            pattern=pattern,
+            pattern=parts.pattern,
             status_exclude=section.attrs.status_exclude,
             status_prepend=section.attrs.status_prepend,
             url=section.attrs.url,
@@ -538,12 +501,146 @@ class FormItem(BaseModel):
             validate_type_error_footer=section.attrs.validate_type_error_footer,
             validate_url=section.attrs.validate_url,
         )
+        if body:
+            form_item.__dict__['body'] = body
+        return form_item
 
 
 FormItem.update_forward_refs()
 
 
-class FormMeta(BaseModel):
+_INPUT_FORM_ITEM_TYPES = {
+    InputTagType.date: FormItemType.date,
+    InputTagType.datetime: FormItemType.datetime,
+    InputTagType.text: FormItemType.string,
+    InputTagType.hidden: FormItemType.hidden,
+    InputTagType.email: FormItemType.email,
+    InputTagType.location: FormItemType.location,
+    InputTagType.url: FormItemType.url,
+}
+
+
+class _FormItemParts:
+    """ The fields of a FormItem, filled while its <section> is walked """
+    __slots__ = ('section', 'type', 'description', 'body', 'value', 'min_value',
+                 'min_value_error', 'min_length', 'min_length_error', 'max_value',
+                 'max_value_error', 'max_length', 'max_length_error', 'pattern',
+                 'pending')
+
+    def __init__(self, section: SectionTag):
+        self.section = section
+        self.type = None
+        self.description = None
+        self.body = []
+        self.value = None
+        self.min_value = None
+        self.min_value_error = None
+        self.min_length = None
+        self.min_length_error = None
+        self.max_value = None
+        self.max_value_error = None
+        self.max_length = None
+        self.max_length_error = None
+        self.pattern = None
+        # The children met before the type of the FormItem is known
+        self.pending = []
+
+    def add_menu_item(self, tag) -> None:
+        menu_item_form_item = MenuItemFormItem.from_tag(tag)
+        if menu_item_form_item:
+            self.body.append(menu_item_form_item)
+
+    def add_option(self, li: LiTag) -> None:
+        """ Adds the option of a <li>. Its fields come from the validated tag,
+        so the `MenuItemFormItem` is built without being validated again
+        """
+        description, value, text_search = menu_item_form_item_fields(li)
+        if description:
+            self.body.append(MenuItemFormItem.construct({
+                'type': MenuItemType.option if value else MenuItemType.content,
+                'description': description,
+                'value': value,
+                'text_search': text_search,
+            }, set(_MENU_ITEM_FORM_ITEM_FIELDS)))
+
+
+# The functions adding the children of a <section> to the parts of a FormItem.
+# They return True when the rest of the children must be ignored
+form_item_child_handlers = TagDispatcher('FormItem builder')
+
+
+@form_item_child_handlers.register(InputTag)
+def _form_item_input(child: InputTag, parts: _FormItemParts) -> bool:
+    if parts.type is not None:
+        # An <input> following a <ul> is not rendered in the form-menu
+        return False
+
+    input_type = child.attrs.type
+
+    # HTML does not have type "int" or "float", it has "number"
+    # If the input type is "number", determine if it's "int" or "float"
+    if input_type == InputTagType.number:
+        if child.attrs.step == 1:
+            parts.type = FormItemType.int
+        else:
+            parts.type = FormItemType.float
+    elif input_type == InputTagType.hidden:
+        parts.value = child.attrs.value
+        if parts.value is None:
+            raise ONEmSDKException(
+                'value attribute is required for input type="hidden"'
+            )
+
+    if child.attrs.pattern is not None:
+        # Override type with 'regex' if pattern is declared
+        parts.type = FormItemType.regex_
+
+    if parts.type is None:
+        parts.type = _INPUT_FORM_ITEM_TYPES[input_type]
+
+    parts.min_value = child.attrs.min
+    parts.min_value_error = child.attrs.min_error
+    parts.min_length = child.attrs.minlength
+    parts.min_length_error = child.attrs.minlength_error
+    parts.max_value = child.attrs.max
+    parts.max_value_error = child.attrs.max_error
+    parts.max_length = child.attrs.maxlength
+    parts.max_length_error = child.attrs.maxlength_error
+    parts.description = parts.section.render(True, True)
+    parts.pattern = child.attrs.pattern
+
+    # Ignore other <input> tags if exist
+    return True
+
+
+@form_item_child_handlers.register(UlTag)
+def _form_item_ul(child: UlTag, parts: _FormItemParts) -> bool:
+    if parts.type is None:
+        parts.type = FormItemType.form_menu
+        for tag in parts.pending:
+            parts.add_menu_item(tag)
+        parts.pending = None
+
+    for li in child.children:
+        parts.add_option(li)
+    return False
+
+
+@form_item_child_handlers.register(HeaderTag, FooterTag)
+def _form_item_header_footer(child: Tag, parts: _FormItemParts) -> bool:
+    return False
+
+
+@form_item_child_handlers.register(str, Tag)
+def _form_item_content(child: Union[Tag, str], parts: _FormItemParts) -> bool:
+    if parts.type is None:
+        parts.pending.append(child)
+    else:
+        parts.add_menu_item(child)
+    return False
+
+
+class FormMeta(TrustedModel):
     """
     [`Form`](#form) related component holding configuration fields for the form
     """
@@ -569,7 +666,7 @@ class FormMeta(BaseModel):
 FormMeta.update_forward_refs()
 
 
-class Form(BaseModel):
+class Form(TrustedModel):
     """
     A top level component used to acquire information from the user
     """
@@ -633,7 +730,7 @@ class MessageContentType(str, Enum):
     menu = 'menu'
 
 
-class Response(BaseModel):
+class Response(TrustedModel):
     """
     Root component wrapping a `Menu` or a `Form`
     """
@@ -659,11 +756,32 @@ class Response(BaseModel):
 
     @classmethod
     def from_tag(cls, tag: Union[FormTag, SectionTag]):
+        if instrumentation.enabled:
+            started_at = perf_counter()
+            response = cls._from_tag(tag)
+            instrumentation.emit(instrumentation.Stage.schema, started_at)
+            return response
+        return cls._from_tag(tag)
+
+    @classmethod
+    def _from_tag(cls, tag: Union[FormTag, SectionTag]):
         if isinstance(tag, FormTag):
             return Response(content=Form.from_tag(tag))
         if isinstance(tag, SectionTag):
             return Response(content=Menu.from_tag(tag))
         raise ONEmSDKException(f'Cannot create response from {tag.Config.tag_name} tag')
 
+    @classmethod
+    def from_template(cls, template_file: str, **data) -> 'Response':
+        """ Renders a jinja template into a `Response`. The result is memoized
+        like the one of `load_template`, see `memoize_templates`
+        """
+        return render_template_cached('response', template_file, data,
+                                      _response_from_html)
+
 
 Response.update_forward_refs()
+
+
+def _response_from_html(html: str) -> Response:
+    return Response.from_tag(load_html(html_str=html))
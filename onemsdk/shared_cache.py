@@ -0,0 +1,350 @@
+"""
+A cache shared by the processes of a node, e.g. the workers of a gunicorn or
+uwsgi server, in a memory mapped file. Put the file on a tmpfs (`/dev/shm`)
+so its pages are never written to disk.
+
+Layout (little endian):
+
+- header: magic `ONEMSHMC`, version (u16), reserved (u16), set count (u32),
+  ways (u32), block size (u32)
+- the clock hand of each set (u8)
+- the slots, `ways` per set: key digest (16 bytes), sequence (u32), length
+  (u32), crc32 (u32), expiry time (f64, 0 if none), flags (u8), referenced
+  (u8), padding (2 bytes)
+- the data blocks, one of `block size` bytes per slot
+
+A key is hashed into a set, whose slots hold the entries of that key and of
+the colliding keys. When a set is full, its clock hand evicts the first slot
+which was not read since the hand last passed it.
+
+The writers hold an exclusive `flock` of the file. The readers do not lock:
+a writer makes the sequence of a slot odd while it changes the slot, and makes
+it even again once the rest of the slot is written. The readers read the
+sequence first and check that it did not change after they copied the value,
+that the value is not empty and that its crc32 matches, otherwise they miss.
+Empty values are not stored.
+"""
+import hmac
+import mmap
+import os
+import pickle
+import stat
+import struct
+import time
+import zlib
+from hashlib import blake2b
+from threading import Lock
+from typing import Any, Hashable, Optional, Tuple
+
+from onemsdk.cache import CacheInfo
+from onemsdk.config import get_sdk_version
+from onemsdk.exceptions import ONEmSDKException
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover, Windows
+    fcntl = None
+
+__all__ = ['SharedResponseCache']
+
+MAGIC = b'ONEMSHMC'
+VERSION = 1
+
+_HEADER = struct.Struct('<8sHHIII')
+_SLOT = struct.Struct('<16sIIIdBB2x')
+_SEQUENCE = struct.Struct('<I')
+_SEQUENCE_OFFSET = 16
+_REFERENCED_OFFSET = _SLOT.size - 3
+
+_PICKLED = 1
+_FREE_KEY = bytes(16)
+_MAC_SIZE = 32
+
+
+def _open_cache_file(path: str) -> Tuple[int, os.stat_result]:
+    """ Opens (or creates) the cache file, refusing a symbolic link and a file
+    which other users own or may read or write: they could plant values
+    """
+    fd = os.open(path, os.O_RDWR | os.O_CREAT | getattr(os, 'O_NOFOLLOW', 0), 0o600)
+    try:
+        file_stat = os.fstat(fd)
+        if not stat.S_ISREG(file_stat.st_mode):
+            raise ONEmSDKException(f'{path} is not a regular file')
+        if hasattr(os, 'geteuid'):
+            if file_stat.st_uid != os.geteuid():
+                raise ONEmSDKException(f'{path} is owned by another user')
+            if file_stat.st_mode & 0o077:
+                raise ONEmSDKException(
+                    f'{path} is accessible to other users, its mode must be 0600')
+    except BaseException:
+        os.close(fd)
+        raise
+    return fd, file_stat
+
+
+def _writing_sequence(sequence: int) -> int:
+    """ The odd sequence of a slot which is changing """
+    return (sequence + 1) & 0xFFFFFFFF | 1
+
+
+class SharedResponseCache:
+    """ A cache of `bytes` (the json of the converted responses) or picklable
+    values (the memoized templates) in the memory mapped file `path`, shared
+    by all the processes which open it with the same geometry
+
+    The file holds `maxbytes // block_size` slots in sets of `ways` slots. A
+    value longer than `block_size` bytes, once pickled, is not stored. If
+    `ttl` is set, the entries expire `ttl` seconds after they were set.
+
+    The file is created with the mode 0600. An existing file is refused if it
+    is a symbolic link, belongs to another user or is accessible to the other
+    users. The values other than `bytes` can only be stored with a `secret`
+    (e.g. the Django SECRET_KEY): they are pickled and authenticated with an
+    HMAC of that secret, which is checked before they are unpickled.
+
+    The keys are hashed with the version of the SDK, so the entries written by
+    another version are not read. The hits and misses are counted in this
+    process, `clear()` drops the entries of all the processes. Without
+    `fcntl` (on Windows) the writes are only serialized within the process.
+    """
+
+    def __init__(self, path: str, maxbytes: int = 64 * 1024 * 1024,
+                 block_size: int = 16 * 1024, ways: int = 8, ttl: Optional[float] = None,
+                 secret: Optional[bytes] = None):
+        if not 1 <= ways <= 255:
+            raise ONEmSDKException('ways must be between 1 and 255')
+        if block_size < 1 or maxbytes < block_size * ways:
+            raise ONEmSDKException('maxbytes must hold at least one set of ways blocks')
+
+        self.path = os.path.abspath(path)
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = Lock()
+        self._person = blake2b(get_sdk_version().encode('utf-8'), digest_size=16).digest()
+        if isinstance(secret, str):
+            secret = secret.encode('utf-8')
+        self._secret = secret
+
+        sets = maxbytes // (block_size * ways)
+        self._fd, file_stat = _open_cache_file(self.path)
+        self._file_id = (file_stat.st_dev, file_stat.st_ino)
+        self._pid = os.getpid()
+        try:
+            with self._file_lock():
+                size = os.fstat(self._fd).st_size
+                if size == 0:
+                    self._create(sets, ways, block_size)
+                    size = os.fstat(self._fd).st_size
+                self._mmap = mmap.mmap(self._fd, size)
+                self._read_header(sets, ways, block_size, size)
+        except BaseException:
+            os.close(self._fd)
+            raise
+
+    def _create(self, sets: int, ways: int, block_size: int) -> None:
+        header = _HEADER.pack(MAGIC, VERSION, 0, sets, ways, block_size)
+        size = (_HEADER.size + sets + sets * ways * _SLOT.size
+                + sets * ways * block_size)
+        os.ftruncate(self._fd, size)
+        os.pwrite(self._fd, header, 0)
+
+    def _read_header(self, sets: int, ways: int, block_size: int, size: int) -> None:
+        if size < _HEADER.size:
+            raise ONEmSDKException(f'{self.path} is not a shared response cache')
+        magic, version, _, file_sets, file_ways, file_block_size = \
+            _HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ONEmSDKException(f'{self.path} is not a shared response cache')
+        if (file_sets, file_ways, file_block_size) != (sets, ways, block_size):
+            raise ONEmSDKException(
+                f'{self.path} holds {file_sets} sets of {file_ways} blocks of '
+                f'{file_block_size} bytes, remove it to change the geometry')
+
+        self.sets = sets
+        self.ways = ways
+        self.block_size = block_size
+        self._hands_offset = _HEADER.size
+        self._slots_offset = self._hands_offset + sets
+        self._data_offset = self._slots_offset + sets * ways * _SLOT.size
+
+    def _file_lock(self):
+        return _FileLock(self)
+
+    def _digest(self, key: Hashable) -> bytes:
+        digest = blake2b(repr(key).encode('utf-8'), digest_size=16,
+                         person=self._person).digest()
+        # The all zero digest marks the free slots
+        return digest if digest != _FREE_KEY else b'\x01' + digest[1:]
+
+    def _mac(self, data: bytes) -> bytes:
+        return hmac.new(self._secret, data, 'sha256').digest()
+
+    def _first_slot(self, digest: bytes) -> int:
+        return int.from_bytes(digest[:8], 'little') % self.sets * self.ways
+
+    def _count(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        digest = self._digest(key)
+        first = self._first_slot(digest)
+        mm = self._mmap
+
+        for slot in range(first, first + self.ways):
+            offset = self._slots_offset + slot * _SLOT.size
+            sequence = _SEQUENCE.unpack_from(mm, offset + _SEQUENCE_OFFSET)[0]
+            slot_key, _, length, crc, expires_at, flags, _ = _SLOT.unpack_from(mm, offset)
+            if slot_key != digest:
+                continue
+            if (sequence & 1 or not length
+                    or (expires_at and expires_at <= time.time())):
+                break
+
+            start = self._data_offset + slot * self.block_size
+            value = mm[start:start + length]
+            if (_SEQUENCE.unpack_from(mm, offset + _SEQUENCE_OFFSET)[0] != sequence
+                    or zlib.crc32(value) != crc):
+                break
+
+            if flags & _PICKLED:
+                mac, value = value[:_MAC_SIZE], value[_MAC_SIZE:]
+                if self._secret is None or not hmac.compare_digest(mac, self._mac(value)):
+                    break
+                value = pickle.loads(value)
+
+            mm[offset + _REFERENCED_OFFSET] = 1
+            self._count(True)
+            return value
+
+        self._count(False)
+        return default
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if isinstance(value, bytes):
+            data, flags = value, 0
+        else:
+            if self._secret is None:
+                raise ONEmSDKException('A SharedResponseCache needs a secret to store '
+                                       'the values other than bytes')
+            data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+            data, flags = self._mac(data) + data, _PICKLED
+        if not data or len(data) > self.block_size:
+            return
+
+        digest = self._digest(key)
+        first = self._first_slot(digest)
+        expires_at = time.time() + self.ttl if self.ttl is not None else 0.0
+
+        with self._lock, self._file_lock():
+            slot = self._victim(digest, first)
+            offset = self._slots_offset + slot * _SLOT.size
+            sequence = _SEQUENCE.unpack_from(self._mmap, offset + _SEQUENCE_OFFSET)[0]
+            writing = _writing_sequence(sequence)
+
+            # The sequence is odd while the slot changes and is made even in a
+            # separate store, once the rest of the slot is written
+            _SEQUENCE.pack_into(self._mmap, offset + _SEQUENCE_OFFSET, writing)
+            start = self._data_offset + slot * self.block_size
+            self._mmap[start:start + len(data)] = data
+            _SLOT.pack_into(self._mmap, offset, digest, writing, len(data),
+                            zlib.crc32(data), expires_at, flags, 0)
+            _SEQUENCE.pack_into(self._mmap, offset + _SEQUENCE_OFFSET,
+                                (writing + 1) & 0xFFFFFFFF)
+
+    def _victim(self, digest: bytes, first: int) -> int:
+        """ The slot of the set of `digest` to write: the slot of that key, a
+        free or expired slot, or the slot chosen by the clock of the set
+        """
+        mm = self._mmap
+        now = time.time()
+        free = None
+        for slot in range(first, first + self.ways):
+            slot_key, _, _, _, expires_at, _, _ = \
+                _SLOT.unpack_from(mm, self._slots_offset + slot * _SLOT.size)
+            if slot_key == digest:
+                return slot
+            if free is None and (slot_key == _FREE_KEY or
+                                 (expires_at and expires_at <= now)):
+                free = slot
+        if free is not None:
+            return free
+
+        hand_offset = self._hands_offset + first // self.ways
+        hand = mm[hand_offset] % self.ways
+        while True:
+            referenced = (self._slots_offset + (first + hand) * _SLOT.size
+                          + _REFERENCED_OFFSET)
+            if not mm[referenced]:
+                mm[hand_offset] = (hand + 1) % self.ways
+                return first + hand
+            mm[referenced] = 0
+            hand = (hand + 1) % self.ways
+
+    def clear(self) -> None:
+        with self._lock, self._file_lock():
+            for slot in range(self.sets * self.ways):
+                offset = self._slots_offset + slot * _SLOT.size
+                sequence = _SEQUENCE.unpack_from(self._mmap, offset + _SEQUENCE_OFFSET)[0]
+                _SLOT.pack_into(self._mmap, offset, _FREE_KEY,
+                                (_writing_sequence(sequence) + 1) & 0xFFFFFFFF,
+                                0, 0, 0.0, 0, 0)
+            self._mmap[self._hands_offset:self._slots_offset] = bytes(self.sets)
+            self.hits = 0
+            self.misses = 0
+
+    def info(self) -> CacheInfo:
+        """ The hits and misses of this process, and the bytes stored by all
+        the processes
+        """
+        now = time.time()
+        currsize = 0
+        for slot in range(self.sets * self.ways):
+            slot_key, _, length, _, expires_at, _, _ = \
+                _SLOT.unpack_from(self._mmap, self._slots_offset + slot * _SLOT.size)
+            if slot_key != _FREE_KEY and not (expires_at and expires_at <= now):
+                currsize += length
+        with self._lock:
+            return CacheInfo(self.hits, self.misses,
+                             self.sets * self.ways * self.block_size, currsize)
+
+    def close(self) -> None:
+        self._mmap.close()
+        os.close(self._fd)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class _FileLock:
+    """ The exclusive `flock` of the cache file. A forked process opens the
+    file again, the lock of a file description shared with the parent would
+    not exclude the parent
+    """
+
+    def __init__(self, cache: SharedResponseCache):
+        self.cache = cache
+
+    def __enter__(self):
+        cache = self.cache
+        if fcntl is None:
+            return
+        if cache._pid != os.getpid():
+            os.close(cache._fd)
+            cache._fd, file_stat = _open_cache_file(cache.path)
+            if (file_stat.st_dev, file_stat.st_ino) != cache._file_id:
+                os.close(cache._fd)
+                raise ONEmSDKException(f'{cache.path} was replaced')
+            cache._pid = os.getpid()
+        fcntl.flock(cache._fd, fcntl.LOCK_EX)
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if fcntl is not None:
+            fcntl.flock(self.cache._fd, fcntl.LOCK_UN)
@@ -0,0 +1,130 @@
+import threading
+from contextlib import contextmanager
+from copy import deepcopy
+from enum import Enum
+from typing import Any, Dict, Iterator, Optional, Set, Tuple, Type, Union
+
+from pydantic import BaseModel
+from pydantic.fields import Field, Shape
+
+__all__ = ['TrustedModel', 'trusted', 'set_trusted_mode', 'get_trusted_mode']
+
+_trusted_mode = False
+
+# The mode set by trusted() in the current thread, overrides _trusted_mode
+_local = threading.local()
+
+
+def get_trusted_mode() -> bool:
+    enabled = getattr(_local, 'trusted', None)
+    return _trusted_mode if enabled is None else enabled
+
+
+def set_trusted_mode(enabled: bool) -> None:
+    """ Enables the trusted mode globally, see `TrustedModel` """
+    global _trusted_mode
+    _trusted_mode = enabled
+
+
+@contextmanager
+def trusted(enabled: bool = True) -> Iterator[None]:
+    """ Enables (or disables) the trusted mode in the current thread, for the
+    duration of the `with` block
+    """
+    previous = getattr(_local, 'trusted', None)
+    _local.trusted = enabled
+    try:
+        yield
+    finally:
+        _local.trusted = previous
+
+
+# The types which must match exactly: pydantic converts the subclasses, e.g.
+# the bools given to an int field or the str enums given to a str field
+_EXACT_TYPES = (str, int, float, bool)
+
+_IMMUTABLE_DEFAULTS = (type(None), str, int, float, bool, Enum)
+
+# (exact types, instance types) accepted as they are by each field, or None if
+# the values of a field are always validated
+_accepted_types: Dict[Tuple[Type[BaseModel], str], Optional[Tuple[tuple, tuple]]] = {}
+
+
+def _field_accepted_types(field: Field) -> Optional[Tuple[tuple, tuple]]:
+    if field.shape == Shape.LIST:
+        # The items are not checked, they are built by the SDK itself
+        return (list,), ()
+    if field.shape != Shape.SINGLETON:
+        return None
+
+    type_ = field.type_
+    if type_ is Any:
+        return (), (object,)
+    if getattr(type_, '__origin__', None) is Union:
+        types = type_.__args__
+    else:
+        types = (type_,)
+    if not all(isinstance(t, type) for t in types):
+        return None
+
+    exact = tuple(t for t in types if t in _EXACT_TYPES)
+    instance = tuple(t for t in types if t not in _EXACT_TYPES)
+    return exact, instance
+
+
+def _trusted_values(model: BaseModel, data: Dict[str, Any]) -> Tuple[dict, Set[str]]:
+    values = {}
+    fields_set = set()
+    model_cls = type(model)
+
+    for name, field in model.__fields__.items():
+        if name not in data:
+            if field.required:
+                # Raises the same error as the validation
+                BaseModel.__init__(model, **data)
+            default = field.default
+            if not isinstance(default, _IMMUTABLE_DEFAULTS):
+                default = deepcopy(default)
+            values[name] = default
+            continue
+
+        fields_set.add(name)
+        value = data[name]
+        if value is not None:
+            key = (model_cls, name)
+            try:
+                accepted = _accepted_types[key]
+            except KeyError:
+                accepted = _accepted_types[key] = _field_accepted_types(field)
+
+            if (accepted is None or
+                    type(value) not in accepted[0] and
+                    not isinstance(value, accepted[1])):
+                # The value must be converted, e.g. a str to an enum
+                value, errors = field.validate(value, values, loc=field.alias,
+                                               cls=model_cls)
+                if errors:
+                    BaseModel.__init__(model, **data)
+        values[name] = value
+
+    return values, fields_set
+
+
+class TrustedModel(BaseModel):
+    """ A model which skips the pydantic validation of the values which
+    already have the type of their field while the trusted mode is enabled
+
+    The trusted mode is meant for the documents known to be valid, e.g. the
+    templates checked by the tests: the objects are the same as the ones built
+    with the validation (the values which need a conversion are still
+    converted) but the constraints of the fields, like the `None` given to a
+    required field or the types of the list items, are not checked. The
+    structural checks of the tags and of the schema models still run.
+    """
+    def __init__(__pydantic_self__, **data: Any) -> None:
+        if not get_trusted_mode():
+            super().__init__(**data)
+            return
+        values, fields_set = _trusted_values(__pydantic_self__, data)
+        object.__setattr__(__pydantic_self__, '__dict__', values)
+        object.__setattr__(__pydantic_self__, '__fields_set__', fields_set)
@@ -0,0 +1,105 @@
+"""
+Precompiles the html files of a static dir into ready to send `Response` json
+artifacts, with a manifest of their content hashes, to be served by
+`onemsdk.precompiled.PrecompiledResponses`:
+
+    python scripts/precompile.py <static_dir> <output_dir>
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+from os.path import abspath, dirname, join
+
+from onemsdk.bundle import write_bundle
+from onemsdk.exceptions import ONEmSDKException
+from onemsdk.parser.util import load_html
+from onemsdk.precompiled import MANIFEST_FILE, MANIFEST_VERSION
+from onemsdk.schema.encoder import encode_json_bytes
+from onemsdk.schema.v1 import Response
+
+BASE_DIR: str = dirname(dirname(abspath(__file__)))
+
+with open(join(BASE_DIR, 'VERSION')) as f:
+    VERSION = f.read().strip()
+
+
+def find_html_files(static_dir: str, extensions):
+    for root, dirs, files in os.walk(static_dir):
+        dirs.sort()
+        for name in sorted(files):
+            if name.endswith(tuple(extensions)):
+                path = join(root, name)
+                yield os.path.relpath(path, static_dir).replace(os.sep, '/')
+
+
+def precompile(static_dir: str, output_dir: str, extensions=('.html',),
+               bundle: str = None):
+    """ Writes the json artifact of each html file and the manifest, and
+    also all the json into a `bundle` file if it is set. Returns the errors by
+    file
+    """
+    files = {}
+    errors = {}
+    contents = []
+
+    for html_file in find_html_files(static_dir, extensions):
+        path = join(static_dir, html_file)
+        with open(path, 'rb') as f:
+            source = f.read()
+        try:
+            content = encode_json_bytes(Response.from_tag(load_html(html_file=path)))
+        except (ONEmSDKException, Exception) as e:
+            errors[html_file] = f'{type(e).__name__}: {e}'
+            continue
+
+        artifact = html_file + '.json'
+        artifact_path = join(output_dir, artifact)
+        os.makedirs(dirname(artifact_path), exist_ok=True)
+        with open(artifact_path, 'wb') as f:
+            f.write(content)
+        if bundle:
+            contents.append((html_file, content))
+
+        files[html_file] = {
+            'artifact': artifact,
+            'source_sha256': hashlib.sha256(source).hexdigest(),
+            'sha256': hashlib.sha256(content).hexdigest(),
+            'size': len(content),
+        }
+
+    manifest = {
+        'version': MANIFEST_VERSION,
+        'onemsdk_version': VERSION,
+        'files': files,
+    }
+    with open(join(output_dir, MANIFEST_FILE), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+    if bundle:
+        write_bundle(bundle, contents)
+
+    return errors
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='precompile.py', description=__doc__.strip())
+    parser.add_argument('static_dir')
+    parser.add_argument('output_dir')
+    parser.add_argument('--ext', action='append', dest='extensions',
+                        help='extension of the html files, .html by default')
+    parser.add_argument('--bundle', help='also write all the responses into this '
+                                         'bundle file, see onemsdk.bundle')
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    errors = precompile(args.static_dir, args.output_dir,
+                        tuple(args.extensions or ['.html']), args.bundle)
+    for html_file, error in sorted(errors.items()):
+        print(f'{html_file}: {error}', file=sys.stderr)
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
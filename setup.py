@@ -25,7 +25,7 @@ setup(
     author='romeo1m',
     author_email='romeo.tudureanu@onem.com',
     keywords='sdk onem python',
-    packages=find_packages(exclude=['contrib', 'docs', 'tests', 'scripts']),
+    packages=find_packages(exclude=['contrib', 'docs', 'tests', 'scripts', 'benchmarks']),
     python_requires='>=3.6, <4',
     install_requires=required_packages,
     classifiers=[
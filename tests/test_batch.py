@@ -0,0 +1,76 @@
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from unittest import TestCase, skipIf
+
+from onemsdk import set_static_dir
+from onemsdk.batch import load_html_many, render_responses
+from onemsdk.exceptions import ONEmSDKException
+from onemsdk.parser import SectionTag, FormTag, load_html
+from onemsdk.schema.v1 import Response
+
+from tests.test_compiler import TEMPLATE_DATA
+
+set_static_dir(os.path.join(os.path.dirname(__file__), 'static'))
+
+HTML_STRS = [
+    '<section><p>First</p></section>',
+    '<section><li>Bad</li></section>',
+    '<form action="/"><section name="a"><input type="text"/></section></form>',
+    '<section><p>Unclosed</section>',
+]
+
+
+class TestBatch(TestCase):
+    def assertBatch(self, results):
+        self.assertEqual([0, 1, 2, 3], [result.index for result in results])
+        self.assertIsInstance(results[0].value, SectionTag)
+        self.assertIsInstance(results[2].value, FormTag)
+        self.assertIsNone(results[0].error)
+        self.assertIsNone(results[1].value)
+        self.assertIsInstance(results[1].error, ONEmSDKException)
+        self.assertIn('<li> cannot be child for <section>', str(results[1].error))
+        self.assertIsInstance(results[3].error, ONEmSDKException)
+
+    def test_load_html_many_processes(self):
+        self.assertBatch(list(load_html_many(HTML_STRS, max_workers=2)))
+
+    def test_load_html_many_threads(self):
+        self.assertBatch(list(load_html_many(HTML_STRS, use_threads=True)))
+
+    def test_load_html_many_executor(self):
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            results = sorted(load_html_many(HTML_STRS, executor=executor, ordered=False))
+        self.assertBatch(results)
+
+    def test_render_responses(self):
+        items = [
+            HTML_STRS[0],
+            ('index.jinja2', TEMPLATE_DATA),
+            ('missing.jinja2', {}),
+        ]
+        results = list(render_responses(items, max_workers=2))
+
+        self.assertEqual(Response.from_tag(load_html(html_str=HTML_STRS[0])).json(),
+                         results[0].value)
+        self.assertEqual('form', json.loads(results[1].value)['content_type'])
+        self.assertIsNotNone(results[2].error)
+        self.assertIsNone(results[2].value)
+
+    @skipIf(sys.version_info < (3, 7), 'ProcessPoolExecutor has no mp_context before 3.7')
+    def test_spawned_workers_get_the_configuration(self):
+        from multiprocessing import get_context
+
+        from onemsdk.exceptions import ParseLimitException
+        from onemsdk.parser import set_parse_limits
+
+        set_parse_limits(max_depth=2)
+        try:
+            with ProcessPoolExecutor(max_workers=1, mp_context=get_context('spawn')) as executor:
+                results = list(render_responses(
+                    [('index.jinja2', TEMPLATE_DATA), HTML_STRS[0]], executor=executor))
+        finally:
+            set_parse_limits()
+        self.assertIsInstance(results[0].error, ParseLimitException)
+        self.assertIsNotNone(results[1].value)
@@ -0,0 +1,86 @@
+import io
+import os
+import tempfile
+from unittest import TestCase
+
+from onemsdk.bundle import ResponseBundle, write_bundle
+from onemsdk.exceptions import ONEmSDKException
+
+from tests.test_django import settings
+
+DOCUMENTS = [
+    ('menus/main.html', b'{"content_type": "menu"}'),
+    ('form.html', b'{"content_type": "form", "content": {}}'),
+    ('empty.html', b''),
+    ('été.html', b'{}'),
+]
+
+
+class TestBundle(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, 'responses.bundle')
+        write_bundle(self.path, DOCUMENTS)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_get(self):
+        with ResponseBundle(self.path) as bundle:
+            self.assertEqual(4, len(bundle))
+            self.assertEqual(sorted(name for name, _ in DOCUMENTS), list(bundle))
+            for name, content in DOCUMENTS:
+                with bundle.get(name) as view:
+                    self.assertIsInstance(view, memoryview)
+                    self.assertEqual(content, view.tobytes())
+            self.assertNotIn('missing.html', bundle)
+            with self.assertRaises(ONEmSDKException):
+                bundle.get('missing.html')
+
+    def test_invalid_files(self):
+        with self.assertRaises(ONEmSDKException):
+            write_bundle(self.path, [('a', b'1'), ('a', b'2')])
+
+        with open(self.path, 'wb') as f:
+            f.write(b'not a bundle at all')
+        with self.assertRaises(ONEmSDKException):
+            ResponseBundle(self.path)
+
+    def test_replaced_bundle(self):
+        bundle = ResponseBundle(self.path)
+        write_bundle(self.path, [('menus/main.html', b'{"new": true}')])
+
+        self.assertEqual(DOCUMENTS[0][1], bundle.get('menus/main.html').tobytes())
+        with self.assertRaises(ONEmSDKException):
+            bundle.open_slice('menus/main.html')
+        bundle.close()
+
+        with ResponseBundle(self.path) as bundle:
+            self.assertEqual(b'{"new": true}', bundle.get('menus/main.html').tobytes())
+
+    def test_slice(self):
+        with ResponseBundle(self.path) as bundle:
+            offset, length = bundle.locate('form.html')
+            with bundle.open_slice('form.html') as f:
+                self.assertEqual(offset, f.tell())
+                self.assertEqual(offset, os.lseek(f.fileno(), 0, os.SEEK_CUR))
+                self.assertEqual(b'{"content', f.read(9))
+                self.assertEqual(DOCUMENTS[1][1][9:], f.read())
+                self.assertEqual(b'', f.read())
+
+                f.seek(0, io.SEEK_END)
+                self.assertEqual(offset + length, f.tell())
+                f.seek(offset)
+                self.assertEqual(DOCUMENTS[1][1], f.read(1000))
+
+    def test_django_response(self):
+        if settings is None:
+            self.skipTest('Django is not installed')
+        from onemsdk.contrib.django import bundle_response
+
+        with ResponseBundle(self.path) as bundle:
+            response = bundle_response(bundle, 'menus/main.html')
+            self.assertEqual('application/json', response['Content-Type'])
+            self.assertEqual(str(len(DOCUMENTS[0][1])), response['Content-Length'])
+            self.assertEqual(DOCUMENTS[0][1], b''.join(response.streaming_content))
+            response.close()
@@ -0,0 +1,45 @@
+from unittest import TestCase, mock
+
+from onemsdk.cache import BytesLRUCache, CacheInfo
+
+
+class TestBytesLRUCache(TestCase):
+    def test_evicts_to_the_byte_budget(self):
+        cache = BytesLRUCache(maxbytes=10)
+        cache.set('a', b'aaaa')
+        cache.set('b', b'bbbb')
+        self.assertEqual(b'aaaa', cache.get('a'))
+
+        cache.set('c', b'cccc')
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(['a', 'c'], list(cache._data))
+        self.assertEqual(CacheInfo(hits=1, misses=1, maxsize=10, currsize=8), cache.info())
+
+        cache.set('a', b'a')
+        cache.set('d', b'x' * 11)
+        self.assertEqual(5, cache.currbytes)
+        self.assertNotIn('d', cache)
+
+        cache.resize(4)
+        self.assertEqual(['a'], list(cache._data))
+        self.assertEqual(b'a', cache.pop('a'))
+        self.assertEqual(0, cache.currbytes)
+
+    def test_ttl(self):
+        cache = BytesLRUCache(maxbytes=10, ttl=5)
+        with mock.patch('onemsdk.cache.time.monotonic', return_value=100):
+            cache.set('a', b'aaaa')
+        with mock.patch('onemsdk.cache.time.monotonic', return_value=105):
+            self.assertIsNone(cache.get('a'))
+        self.assertEqual(0, cache.currbytes)
+
+    def test_hit_rate(self):
+        cache = BytesLRUCache(maxbytes=10)
+        self.assertEqual(0, cache.info().hit_rate)
+        cache.set('a', b'a')
+        for key in ('a', 'a', 'a', 'b'):
+            cache.get(key)
+        self.assertEqual(0.75, cache.info().hit_rate)
+
+        cache.clear()
+        self.assertEqual(CacheInfo(0, 0, 10, 0), cache.info())
@@ -0,0 +1,242 @@
+import json
+import os
+import tempfile
+from unittest import TestCase, mock
+
+from pydantic import ValidationError
+
+from onemsdk import set_static_dir
+from onemsdk.exceptions import ONEmSDKException, MalformedHTMLException
+from onemsdk.parser import (compile_html, compile_html_json, load_html, compile_template,
+                            compile_template_json)
+from onemsdk.parser.compiler import Compiler
+from onemsdk.schema.v1 import Response
+
+set_static_dir(os.path.join(os.path.dirname(__file__), 'static'))
+
+DOCUMENTS = [
+    """
+    <section header="Attr header" footer="Attr footer" auto-select>
+      <header>Menu header</header>
+      Some text
+      <p>Paragraph</p>
+      <p></p>
+      <br/>
+      <label>Label</label>
+      <ul>
+        <li>Separator</li>
+        <li text-search="ignored">Plain item</li>
+        <li text-search="opt 1"><a href="/route-1">Option 1</a></li>
+        <li><a href="/route-2" method="POST">Option 2</a></li>
+        <li><a href="">Empty href</a></li>
+      </ul>
+      <input type="text"/>
+      <footer></footer>
+    </section>
+    """,
+    """
+    <form action="/form" method="PATCH" header="Form header" completion-status-show
+          skip-confirmation>
+      <section name="number" method="PUT" required status-exclude status-prepend
+               url="/url" chunking-footer="chunk" confirmation-label="confirm"
+               validate-type-error="err" validate-type-error-footer="err footer"
+               validate-url="/validate">
+        <header>Number</header>
+        <label>Give a number</label>
+        <input type="number" step="1" min="1" max="10.5" min-error="too small"
+               max-error="too big"/>
+        <footer>Footer</footer>
+      </section>
+      <section name="float">
+        <p>Give a float</p>
+        <br/>
+        <input type="number" min="0.5" max="2"/>
+      </section>
+      <section name="string">
+        <p>Text</p>
+        <input type="text" minlength="2" maxlength="5" minlength-error="short"
+               maxlength-error="long"/>
+        <input type="date"/>
+      </section>
+      <section name="hidden">
+        <input type="hidden" value="secret"/>
+      </section>
+      <section name="regex">
+        <input type="email" pattern="^a.*"/>
+      </section>
+      <section name="menu" auto-select multi-select numbered header="ignored">
+        <header>Pick</header>
+        Before
+        <p>Para</p>
+        <ul>
+          <li>Separator</li>
+          <li value="v1" text-search="one">One</li>
+          <li value="v2"><a href="/two">Two</a></li>
+        </ul>
+        <input type="text"/>
+        <footer>Reply</footer>
+      </section>
+      <section name="location"><input type="location"/></section>
+      <section name="url"><input type="url"/></section>
+      <section name="datetime"><input type="datetime"/></section>
+    </form>
+    """,
+    """
+    <section>
+      <ul><li>Only</li></ul>
+    </section>
+    """,
+    """
+    <form action="/form">
+      <section name="twice">
+        <ul><li value="a">A</li></ul>
+        <ul><li value="b">B</li></ul>
+      </section>
+    </form>
+    """,
+]
+
+
+class TestCompiler(TestCase):
+    def assertSameAsReference(self, html):
+        expected = Response.from_tag(load_html(html_str=html)).json()
+        # Valid documents must never go through the regular conversion path
+        with mock.patch('onemsdk.parser.compiler._reference_response_dict',
+                        side_effect=AssertionError('fallback used')):
+            self.assertEqual(expected, compile_html_json(html))
+
+    def test_static_files(self):
+        static_dir = os.path.join(os.path.dirname(__file__), 'static')
+        for filename in ('index.html', 'form-big.html'):
+            with open(os.path.join(static_dir, filename)) as f:
+                html = f.read()
+            with self.subTest(filename=filename):
+                self.assertSameAsReference(html)
+
+    def test_documents(self):
+        for html in DOCUMENTS:
+            with self.subTest(html=html):
+                self.assertSameAsReference(html)
+
+    def test_entities_and_stray_brackets(self):
+        html = '<section><p>a &lt; b &gt; c</p>x < y</section>'
+        self.assertSameAsReference(html)
+
+    def test_compile_html_returns_plain_dict(self):
+        response = compile_html('<section><ul><li><a href="/a">A</a></li></ul></section>')
+        self.assertEqual({
+            'content_type': 'menu',
+            'content': {
+                'type': 'menu',
+                'body': [{
+                    'type': 'option',
+                    'description': 'A',
+                    'text_search': None,
+                    'method': 'GET',
+                    'path': '/a'
+                }],
+                'header': None,
+                'footer': None,
+                'meta': {'auto_select': False}
+            }
+        }, response)
+
+    def test_errors_are_the_reference_errors(self):
+        cases = [
+            ('<section><li>a</li></section>', ONEmSDKException,
+             '<li> cannot be child for <section>'),
+            ('<section><header>a<br/></header></section>', ONEmSDKException,
+             '<header> must have max 1 text child'),
+            ('<section><ul>a</ul></section>', ONEmSDKException,
+             '<ul> must have min 1 <li> child'),
+            ('<form action="/"><section><input type="text"/></section></form>',
+             ONEmSDKException, 'can contain only named <section> tags'),
+            ('<form action="/"></form>', ONEmSDKException,
+             '<form> must have at least 1 child'),
+            ('<form action="/"><section name="a"><p>a</p></section></form>',
+             ONEmSDKException, 'it must contain a <input/> or <ul></ul>'),
+            ('<form action="/"><section name="a"><input type="hidden"/></section></form>',
+             ONEmSDKException, 'value attribute is required for input type="hidden"'),
+            ('<section><div>a</div></section>', ONEmSDKException,
+             'Tag <div> is not supported'),
+            ('<ul><li>a</li></ul>', ONEmSDKException,
+             'Cannot create response from ul tag'),
+            ('<section><p>a</section>', MalformedHTMLException,
+             '<p> is the last opened tag, but </section> was received.'),
+            ('<section><ul><li><a>a</a></li></ul></section>', ValidationError, 'href'),
+            ('<section><ul><li><a href="/" method="get">a</a></li></ul></section>',
+             ValidationError, 'method'),
+            ('<form action="/"><section name="a"><input type="file"/></section></form>',
+             ValidationError, 'type'),
+            ('<form action="/"><section name="a">'
+             '<input type="text" minlength="1.5"/></section></form>',
+             ValidationError, 'minlength'),
+        ]
+        for html, exc_cls, message in cases:
+            with self.subTest(html=html):
+                with self.assertRaises(exc_cls) as context:
+                    compile_html(html)
+                self.assertIn(message, str(context.exception))
+
+
+TEMPLATE_DATA = {
+    'li': {
+        '2': {'value': 'opt-21'},
+    },
+    'section': {
+        '3': {'name': 'third-step'}
+    },
+    'items': [
+        {
+            'value': f'opt-3{i}',
+            'href': f'route-{i}',
+            'desc': f'Option {i} section 3',
+            'text_search': f'Context for option {i} section 3'
+        }
+        for i in range(1, 4)
+    ]
+}
+
+
+class TestCompileTemplate(TestCase):
+    def test_same_as_response_from_template(self):
+        expected = Response.from_template('index.jinja2', **TEMPLATE_DATA).json()
+        with mock.patch('onemsdk.parser.compiler._reference_response_dict',
+                        side_effect=AssertionError('fallback used')):
+            self.assertEqual(expected, compile_template_json('index.jinja2', **TEMPLATE_DATA))
+
+    def test_errors_are_the_reference_errors(self):
+        data = dict(TEMPLATE_DATA, items=[
+            {'value': 'opt', 'href': '/', 'desc': '', 'text_search': ''}
+        ])
+        with self.assertRaises(ONEmSDKException) as context:
+            compile_template('index.jinja2', **data)
+        self.assertIn('<a> must have 1 text child', str(context.exception))
+
+    def test_static_template_is_compiled_once(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            static_file = os.path.join(tmp_dir, 'static.jinja2')
+            dynamic_file = os.path.join(tmp_dir, 'dynamic.jinja2')
+            with open(static_file, 'w') as f:
+                f.write('<section><p>Static</p></section>')
+            with open(dynamic_file, 'w') as f:
+                f.write('<section><p>{{ text }}</p></section>')
+
+            with mock.patch('onemsdk.parser.util.get_static_dir', return_value=None):
+                with mock.patch.object(Compiler, 'close_document', autospec=True,
+                                       side_effect=Compiler.close_document) as close:
+                    first = compile_template(static_file)
+                    second = compile_template(static_file, text='ignored')
+                    self.assertEqual(first, second)
+                    self.assertEqual(json.dumps(first), compile_template_json(static_file))
+                    self.assertEqual(1, close.call_count)
+
+                # The callers do not share the result
+                self.assertIsNot(first, second)
+                second['content']['body'].clear()
+                self.assertEqual(first, compile_template(static_file))
+
+                self.assertEqual('one', compile_template(
+                    dynamic_file, text='one')['content']['body'][0]['description'])
+                self.assertEqual('two', compile_template(
+                    dynamic_file, text='two')['content']['body'][0]['description'])
@@ -0,0 +1,399 @@
+import asyncio
+import os
+import tempfile
+import threading
+from unittest import TestCase, mock, skipIf
+
+from onemsdk.cache import CacheInfo
+
+try:
+    from django.conf import settings
+    from django.http import HttpResponse
+except ImportError:  # pragma: no cover
+    settings = None
+else:
+    if not settings.configured:
+        settings.configure()
+
+
+def get_request(**headers):
+    from django.test import RequestFactory
+    return RequestFactory().get('/', **headers)
+
+
+HTML = b'<section><header>Menu</header><ul><li><a href="/a">A</a></li></ul></section>'
+
+
+@skipIf(settings is None, 'Django is not installed')
+class TestAsyncMiddleware(TestCase):
+    def setUp(self):
+        from onemsdk.contrib.django import ConversionPool
+        self.pool = ConversionPool(max_workers=2)
+
+    def tearDown(self):
+        self.pool.shutdown()
+
+    def _middleware(self, get_response):
+        from onemsdk.contrib.django import AsyncHtmlToOnemResponseMiddleware
+
+        middleware = AsyncHtmlToOnemResponseMiddleware(get_response)
+        middleware.pool = self.pool
+        return middleware
+
+    def _expected(self):
+        from onemsdk.contrib.django import HtmlToOnemResponseMiddleware
+        return HtmlToOnemResponseMiddleware(lambda request: HttpResponse(HTML))(get_request())
+
+    def test_sync(self):
+        middleware = self._middleware(lambda request: HttpResponse(HTML))
+
+        self.assertFalse(asyncio.iscoroutinefunction(middleware))
+        response = middleware(get_request())
+        self.assertEqual(self._expected().content, response.content)
+        self.assertEqual('application/json', response['Content-Type'])
+
+    def test_async(self):
+        threads = []
+
+        async def get_response(request):
+            return HttpResponse(HTML)
+
+        middleware = self._middleware(get_response)
+        self.assertTrue(asyncio.iscoroutinefunction(middleware))
+
+        async def run():
+            return await asyncio.gather(*[middleware(get_request()) for _ in range(5)])
+
+        loop = asyncio.new_event_loop()
+        try:
+            responses = loop.run_until_complete(run())
+        finally:
+            loop.close()
+
+        for response in responses:
+            self.assertEqual(self._expected().content, response.content)
+            self.assertEqual('application/json', response['Content-Type'])
+        self.assertEqual(0, self.pool.pending)
+        self.assertEqual(0, self.pool.queue_depth)
+
+    def test_queue_depth(self):
+        from onemsdk.contrib import django
+
+        release = threading.Event()
+        convert_content = django.convert_content
+
+        def blocking_convert(content):
+            release.wait()
+            return convert_content(content)
+
+        async def run():
+            tasks = [asyncio.ensure_future(self.pool.convert(HTML)) for _ in range(5)]
+            await asyncio.sleep(0.05)
+            depth = (self.pool.pending, self.pool.queue_depth)
+            release.set()
+            await asyncio.gather(*tasks)
+            return depth
+
+        django.convert_content = blocking_convert
+        loop = asyncio.new_event_loop()
+        try:
+            self.assertEqual((5, 3), loop.run_until_complete(run()))
+        finally:
+            django.convert_content = convert_content
+            loop.close()
+        self.assertEqual(0, self.pool.queue_depth)
+
+    def test_not_converted(self):
+        async def get_response(request):
+            return HttpResponse(HTML, status=404)
+
+        middleware = self._middleware(get_response)
+        loop = asyncio.new_event_loop()
+        try:
+            response = loop.run_until_complete(middleware(get_request()))
+        finally:
+            loop.close()
+        self.assertEqual(HTML, response.content)
+
+
+    def test_process_pool(self):
+        from onemsdk.contrib.django import ConversionPool
+        from onemsdk.exceptions import ParseLimitException
+        from onemsdk.parser import set_parse_limits
+
+        pool = ConversionPool(max_workers=1, use_processes=True)
+        loop = asyncio.new_event_loop()
+        try:
+            self.assertEqual(self._expected().content,
+                             loop.run_until_complete(pool.convert(HTML)))
+            set_parse_limits(max_depth=2)
+            with self.assertRaises(ParseLimitException):
+                loop.run_until_complete(pool.convert(HTML))
+        finally:
+            set_parse_limits()
+            loop.close()
+            pool.shutdown()
+
+@skipIf(settings is None, 'Django is not installed')
+class TestParseLimitsSetting(TestCase):
+    def tearDown(self):
+        from onemsdk.parser import set_parse_limits
+        set_parse_limits()
+
+    def test_parse_limits(self):
+        from django.test import override_settings
+
+        from onemsdk.contrib.django import HtmlToOnemResponseMiddleware
+        from onemsdk.exceptions import ParseLimitException
+        from onemsdk.parser import ParseLimits, get_parse_limits
+
+        with override_settings(ONEMSDK_PARSE_LIMITS={'max_depth': 3, 'max_nodes': 100}):
+            middleware = HtmlToOnemResponseMiddleware(lambda request: HttpResponse(HTML))
+
+        self.assertEqual(ParseLimits(max_depth=3, max_nodes=100), get_parse_limits())
+        with self.assertRaises(ParseLimitException):
+            middleware(get_request())
+
+
+@skipIf(settings is None, 'Django is not installed')
+class TestResponseCache(TestCase):
+    def setUp(self):
+        from onemsdk.contrib import django
+        django._response_cache = None
+
+    tearDown = setUp
+
+    def _middleware(self, cache_setting, get_response):
+        from django.test import override_settings
+
+        from onemsdk.contrib.django import AsyncHtmlToOnemResponseMiddleware
+
+        with override_settings(ONEMSDK_RESPONSE_CACHE=cache_setting):
+            return AsyncHtmlToOnemResponseMiddleware(get_response)
+
+    def _assert_cached(self, cache_setting):
+        from onemsdk.contrib import django
+        from onemsdk.contrib.django import convert_content, response_cache_info
+
+        middleware = self._middleware(cache_setting, lambda request: HttpResponse(HTML))
+        expected = convert_content(HTML)
+        with mock.patch.object(django, 'convert_content',
+                               side_effect=convert_content) as convert:
+            for _ in range(3):
+                self.assertEqual(expected, middleware(get_request()).content)
+            self.assertEqual(1, convert.call_count)
+
+        info = response_cache_info()
+        self.assertEqual((2, 1), (info.hits, info.misses))
+        self.assertAlmostEqual(2 / 3, info.hit_rate)
+        return info
+
+    def test_locmem(self):
+        info = self._assert_cached({'BACKEND': 'locmem'})
+        self.assertEqual(16 * 1024 * 1024, info.maxsize)
+        self.assertGreater(info.currsize, 0)
+
+    def test_django_cache(self):
+        from django.core.cache import caches
+        from django.test import override_settings
+
+        from onemsdk.contrib.django import content_key
+
+        cache_setting = {'BACKEND': 'django', 'OPTIONS': {'alias': 'onem'}}
+        caches_setting = {'onem': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'onem',
+        }}
+        with override_settings(CACHES=caches_setting):
+            self._assert_cached(cache_setting)
+            self.assertIsNotNone(caches['onem'].get('onemsdk:' + content_key(HTML)))
+
+    def test_async(self):
+        from onemsdk.contrib.django import response_cache_info
+
+        async def get_response(request):
+            return HttpResponse(HTML)
+
+        middleware = self._middleware({'OPTIONS': {'maxbytes': 1024}}, get_response)
+        loop = asyncio.new_event_loop()
+        try:
+            first = loop.run_until_complete(middleware(get_request()))
+            second = loop.run_until_complete(middleware(get_request()))
+        finally:
+            loop.close()
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(CacheInfo(1, 1, 1024, len(first.content)), response_cache_info())
+
+    def test_async_blocking_backend_runs_off_the_event_loop(self):
+        from django.test import override_settings
+
+        from onemsdk.contrib.django import DjangoResponseCache
+
+        threads = []
+        get, set_ = DjangoResponseCache.get, DjangoResponseCache.set
+
+        def record(func):
+            def wrapper(*args):
+                threads.append(threading.get_ident())
+                return func(*args)
+            return wrapper
+
+        async def get_response(request):
+            return HttpResponse(HTML)
+
+        caches_setting = {'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'onem-async',
+        }}
+        with override_settings(CACHES=caches_setting), \
+                mock.patch.object(DjangoResponseCache, 'get', record(get)), \
+                mock.patch.object(DjangoResponseCache, 'set', record(set_)):
+            middleware = self._middleware({'BACKEND': 'django'}, get_response)
+            loop = asyncio.new_event_loop()
+            try:
+                first = loop.run_until_complete(middleware(get_request()))
+                second = loop.run_until_complete(middleware(get_request()))
+            finally:
+                loop.close()
+
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(3, len(threads))
+        self.assertNotIn(threading.get_ident(), threads)
+        self.assertEqual(1, middleware.response_cache.info().hits)
+
+    def test_errors_are_not_cached(self):
+        from onemsdk.exceptions import ONEmSDKException
+
+        middleware = self._middleware({}, lambda request: HttpResponse(b'<section>'))
+        for _ in range(2):
+            with self.assertRaises(ONEmSDKException):
+                middleware(get_request())
+        self.assertEqual(0, middleware.response_cache.info().currsize)
+
+    def test_shared(self):
+        from onemsdk.contrib.django import get_response_cache
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'cache')
+            info = self._assert_cached({'BACKEND': 'shared', 'OPTIONS': {
+                'path': path, 'maxbytes': 1024 * 1024}})
+            self.assertEqual(1024 * 1024, info.maxsize)
+            get_response_cache().close()
+
+    def test_disabled_by_default(self):
+        from onemsdk.contrib.django import HtmlToOnemResponseMiddleware, response_cache_info
+
+        middleware = HtmlToOnemResponseMiddleware(lambda request: HttpResponse(HTML))
+        self.assertIsNone(middleware.response_cache)
+        self.assertIsNone(response_cache_info())
+
+
+@skipIf(settings is None, 'Django is not installed')
+class TestETags(TestCase):
+    def _middleware(self, get_response=lambda request: HttpResponse(HTML), **overrides):
+        from django.test import override_settings
+
+        from onemsdk.contrib.django import HtmlToOnemResponseMiddleware
+
+        with override_settings(**overrides):
+            return HtmlToOnemResponseMiddleware(get_response)
+
+    def test_etag(self):
+        from onemsdk.contrib.django import content_key
+
+        middleware = self._middleware()
+        response = middleware(get_request())
+        self.assertEqual(f'"{content_key(HTML)}"', response['ETag'])
+        self.assertEqual(response['ETag'], middleware(get_request())['ETag'])
+        self.assertNotEqual(content_key(HTML), content_key(HTML + b' '))
+
+    def test_not_modified(self):
+        from onemsdk.contrib import django
+
+        middleware = self._middleware()
+        etag = middleware(get_request())['ETag']
+
+        with mock.patch.object(django, 'convert_content') as convert:
+            for if_none_match in (etag, 'W/' + etag, f'"other", {etag}', '*'):
+                with self.subTest(if_none_match=if_none_match):
+                    response = middleware(get_request(HTTP_IF_NONE_MATCH=if_none_match))
+                    self.assertEqual(304, response.status_code)
+                    self.assertEqual(etag, response['ETag'])
+                    self.assertEqual(b'', response.content)
+            convert.assert_not_called()
+
+        response = middleware(get_request(HTTP_IF_NONE_MATCH='"other"'))
+        self.assertEqual(200, response.status_code)
+        self.assertEqual('application/json', response['Content-Type'])
+
+    def test_upstream_etag(self):
+        from django.test import RequestFactory
+
+        from onemsdk.config import get_sdk_version
+        from onemsdk.contrib import django
+
+        def get_response(request):
+            response = HttpResponse(HTML)
+            response['ETag'] = request.GET['etag']
+            return response
+
+        middleware = self._middleware(get_response)
+        for upstream, expected in (('"v1"', f'"v1-onem-{get_sdk_version()}"'),
+                                   ('W/"v1"', f'W/"v1-onem-{get_sdk_version()}"')):
+            with self.subTest(upstream=upstream):
+                request = RequestFactory().get('/', {'etag': upstream})
+                response = middleware(request)
+                self.assertEqual(200, response.status_code)
+                self.assertEqual(expected, response['ETag'])
+
+                request = RequestFactory().get('/', {'etag': upstream},
+                                               HTTP_IF_NONE_MATCH=expected)
+                with mock.patch.object(django, 'convert_content') as convert, \
+                        mock.patch.object(django, 'content_key') as key:
+                    self.assertEqual(304, middleware(request).status_code)
+                convert.assert_not_called()
+                key.assert_not_called()
+
+    def test_async(self):
+        from onemsdk.contrib.django import AsyncHtmlToOnemResponseMiddleware, ConversionPool
+
+        async def get_response(request):
+            return HttpResponse(HTML)
+
+        middleware = AsyncHtmlToOnemResponseMiddleware(get_response)
+        middleware.pool = pool = ConversionPool(max_workers=1)
+        loop = asyncio.new_event_loop()
+        try:
+            etag = loop.run_until_complete(middleware(get_request()))['ETag']
+            response = loop.run_until_complete(
+                middleware(get_request(HTTP_IF_NONE_MATCH=etag)))
+        finally:
+            loop.close()
+            pool.shutdown()
+        self.assertEqual(304, response.status_code)
+
+    def test_cached_conversions_hash_once(self):
+        from onemsdk.contrib import django
+
+        django._response_cache = None
+        try:
+            middleware = self._middleware(ONEMSDK_RESPONSE_CACHE={})
+            with mock.patch.object(django, 'content_key',
+                                   side_effect=django.content_key) as key:
+                middleware(get_request())
+                middleware(get_request())
+            self.assertEqual(2, key.call_count)
+            self.assertEqual(1, middleware.response_cache.info().hits)
+        finally:
+            django._response_cache = None
+
+    def test_disabled(self):
+        response = self._middleware(ONEMSDK_ETAGS=False)(get_request())
+        self.assertNotIn('ETag', response)
+        self.assertEqual('application/json', response['Content-Type'])
+
+    def test_sdk_version(self):
+        from onemsdk.config import get_sdk_version
+
+        with open('VERSION') as f:
+            self.assertEqual(f.read().strip(), get_sdk_version())
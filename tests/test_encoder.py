@@ -0,0 +1,57 @@
+import os
+from unittest import TestCase
+
+from onemsdk import set_static_dir
+from onemsdk.parser import load_html
+from onemsdk.schema.encoder import encode_json, encode_json_bytes
+from onemsdk.schema.v1 import (Response, Menu, MenuItem, MenuMeta, Form, FormItem,
+                               FormItemType, MenuItemFormItem, MenuFormItemMeta,
+                               HttpMethod, FormMeta)
+
+from tests.test_compiler import DOCUMENTS
+
+set_static_dir(os.path.join(os.path.dirname(__file__), 'static'))
+
+
+class TestEncoder(TestCase):
+    def assertSameAsJson(self, model):
+        self.assertEqual(model.json(), encode_json(model))
+        self.assertEqual(model.json().encode('utf-8'), encode_json_bytes(model))
+
+    def test_documents(self):
+        for html in DOCUMENTS:
+            with self.subTest(html=html):
+                self.assertSameAsJson(Response.from_tag(load_html(html_str=html)))
+
+    def test_static_files(self):
+        for filename in ('index.html', 'form-big.html'):
+            with self.subTest(filename=filename):
+                self.assertSameAsJson(Response.from_tag(load_html(html_file=filename)))
+
+    def test_menu(self):
+        menu = Menu(body=[
+            MenuItem(description='Ünïcode "quoted" \\ \n text'),
+            MenuItem(description='Option', path='/path', method=HttpMethod.POST,
+                     text_search='search'),
+        ], header='header')
+        self.assertSameAsJson(Response(content=menu))
+        self.assertSameAsJson(menu)
+        self.assertSameAsJson(Menu(body=[], meta=MenuMeta(auto_select=True)))
+
+    def test_form(self):
+        form = Form(
+            path='/form',
+            body=[
+                FormItem(type=FormItemType.float, name='float', min_value=0.1,
+                         max_value=1e20, min_value_error='error', required=True),
+                FormItem(type=FormItemType.int, name='int', min_value=float('-inf'),
+                         max_value=float('nan'), min_length=3),
+                FormItem(type=FormItemType.form_menu, name='menu',
+                         body=[MenuItemFormItem(description='A', value='a'),
+                               MenuItemFormItem(description='separator')],
+                         meta=MenuFormItemMeta(multi_select=True)),
+                FormItem(type=FormItemType.regex_, name='regex', pattern='^a+$'),
+            ],
+            meta=FormMeta(skip_confirmation=True)
+        )
+        self.assertSameAsJson(Response(content=form))
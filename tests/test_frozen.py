@@ -0,0 +1,131 @@
+import pickle
+import threading
+from unittest import TestCase, mock
+
+from onemsdk.parser import (LiTag, PTag, TagChildren, UlTag, frozen, get_frozen_mode,
+                            invalidate_render_caches, load_html, set_frozen_mode)
+from onemsdk.schema.v1 import Response
+
+from tests.test_compiler import DOCUMENTS
+
+HTML = """
+<section>
+  <header>Header</header>
+  <p>Paragraph</p>
+  <ul>
+    <li>One</li>
+    <li>Two</li>
+  </ul>
+  <footer>Footer</footer>
+</section>
+"""
+
+
+class TestFrozenMode(TestCase):
+    def tearDown(self):
+        set_frozen_mode(False)
+
+    def test_same_output_as_mutable_mode(self):
+        for html in DOCUMENTS:
+            with self.subTest(html=html):
+                tag = load_html(html_str=html)
+                response = Response.from_tag(tag)
+                with frozen():
+                    frozen_response = Response.from_tag(tag)
+                    self.assertEqual(response.json(), Response.from_tag(tag).json())
+
+                self.assertEqual(response.json(), frozen_response.json())
+
+    def test_rendered_once_per_arguments(self):
+        section = load_html(html_str=HTML)
+        with mock.patch.object(PTag, 'render', autospec=True,
+                               side_effect=PTag.render) as p_render:
+            with frozen():
+                text = section.render()
+                self.assertIs(text, section.render())
+                self.assertEqual(1, p_render.call_count)
+
+                without_header_footer = section.render(True, True)
+                self.assertIs(without_header_footer, section.render(True, True))
+                self.assertEqual(2, p_render.call_count)
+
+        self.assertEqual('Header\nParagraph\nOne\nTwo\nFooter', text)
+        self.assertEqual('Paragraph\nOne\nTwo', without_header_footer)
+
+    def test_not_cached_out_of_frozen_mode(self):
+        section = load_html(html_str=HTML)
+        with frozen():
+            section.render()
+        with mock.patch.object(PTag, 'render', autospec=True,
+                               side_effect=PTag.render) as p_render:
+            section.render()
+            section.render()
+            self.assertEqual(2, p_render.call_count)
+
+    def test_changes_invalidate_the_caches(self):
+        section = load_html(html_str=HTML)
+        ul = section.children[2]
+
+        with frozen():
+            section.render()
+
+            section.children[1].children[0] = 'Changed'
+            self.assertEqual('Header\nChanged\nOne\nTwo\nFooter', section.render())
+
+            ul.children.append(LiTag(children=['Three']))
+            self.assertEqual('Header\nChanged\nOne\nTwo\nThree\nFooter', section.render())
+
+            ul.children[0].children = ['First']
+            self.assertEqual('Header\nChanged\nFirst\nTwo\nThree\nFooter',
+                             section.render())
+
+            del section.children[0]
+            self.assertEqual('Changed\nFirst\nTwo\nThree\nFooter', section.render())
+
+            section.children = [PTag(children=['Only'])]
+            self.assertIsInstance(section.children, TagChildren)
+            self.assertEqual('Only', section.render())
+
+    def test_invalidate_render_caches(self):
+        section = load_html(html_str=HTML)
+        with frozen():
+            text = section.render()
+            invalidate_render_caches()
+            self.assertIsNot(text, section.render())
+            self.assertEqual(text, section.render())
+
+    def test_copies_with_plain_children_are_not_cached(self):
+        ul = UlTag(children=[LiTag(children=['One'])])
+        copy = ul.copy(update={'children': [LiTag(children=['Two'])]})
+        with frozen():
+            self.assertEqual('Two', copy.render())
+            copy.children.append(LiTag(children=['Three']))
+            self.assertEqual('Two\nThree', copy.render())
+
+    def test_children(self):
+        ul = UlTag(children=[LiTag(children=['One'])])
+        self.assertIsInstance(ul.children, TagChildren)
+        self.assertEqual([LiTag(children=['One'])], ul.children)
+        self.assertEqual({'attrs': None, 'children': [
+            {'attrs': {'value': None, 'text_search': None}, 'children': ['One']}
+        ]}, ul.dict())
+
+        unpickled = pickle.loads(pickle.dumps(ul))
+        self.assertEqual(ul, unpickled)
+        self.assertIsInstance(unpickled.children, TagChildren)
+
+    def test_modes(self):
+        self.assertFalse(get_frozen_mode())
+        with frozen():
+            self.assertTrue(get_frozen_mode())
+            with frozen(False):
+                self.assertFalse(get_frozen_mode())
+            self.assertTrue(get_frozen_mode())
+        self.assertFalse(get_frozen_mode())
+
+        set_frozen_mode(True)
+        modes = []
+        thread = threading.Thread(target=lambda: modes.append(get_frozen_mode()))
+        thread.start()
+        thread.join()
+        self.assertEqual([True], modes)
@@ -0,0 +1,84 @@
+import os
+from unittest import TestCase
+
+from onemsdk import instrumentation, set_static_dir
+from onemsdk.instrumentation import Metrics, Stage, StageEvent
+from onemsdk.parser import load_html, load_template
+from onemsdk.schema.encoder import encode_json
+from onemsdk.schema.v1 import Response
+
+from tests.test_compiler import TEMPLATE_DATA
+
+set_static_dir(os.path.join(os.path.dirname(__file__), 'static'))
+
+HTML = """
+<section>
+    <header>Header</header>
+    <ul>
+        <li><a href="/first">First</a></li>
+        <li><a href="/second">Second</a></li>
+    </ul>
+</section>
+"""
+
+
+class TestInstrumentation(TestCase):
+    def setUp(self):
+        self.events = []
+        instrumentation.add_listener(self.events.append)
+
+    def tearDown(self):
+        instrumentation.clear_listeners()
+
+    def test_stages(self):
+        encode_json(Response.from_tag(load_html(html_str=HTML)))
+
+        self.assertEqual([Stage.parse, Stage.tag, Stage.schema, Stage.serialize],
+                         [event.stage for event in self.events])
+        parse, tag, schema, serialize = self.events
+        self.assertEqual(len(HTML), parse.size)
+        self.assertEqual(7, parse.nodes)
+        self.assertEqual(7, tag.nodes)
+        self.assertIsNone(schema.size)
+        self.assertGreater(serialize.size, 0)
+        for event in self.events:
+            self.assertGreaterEqual(event.duration, 0)
+
+    def test_template(self):
+        load_template('index.jinja2', **TEMPLATE_DATA)
+
+        self.assertEqual([Stage.template, Stage.parse, Stage.tag],
+                         [event.stage for event in self.events])
+        self.assertEqual(self.events[0].size, self.events[1].size)
+
+    def test_listeners(self):
+        instrumentation.add_listener(self.events.append)
+        load_html(html_str=HTML)
+        self.assertEqual(2, len(self.events))
+
+        instrumentation.remove_listener(self.events.append)
+        self.assertFalse(instrumentation.enabled)
+        load_html(html_str=HTML)
+        self.assertEqual(2, len(self.events))
+
+    def test_metrics(self):
+        metrics = Metrics(buckets=[0.1, 1])
+        metrics(StageEvent(Stage.parse, 0.05, 100, 3))
+        metrics(StageEvent(Stage.parse, 0.5, 200, 5))
+        metrics(StageEvent(Stage.parse, 2, None, None))
+        metrics(StageEvent(Stage.schema, 0.1, None, None))
+
+        snapshot = metrics.snapshot()
+        self.assertEqual({Stage.parse, Stage.schema}, set(snapshot))
+        parse = snapshot[Stage.parse]
+        self.assertEqual(3, parse.count)
+        self.assertAlmostEqual(2.55, parse.total_duration)
+        self.assertEqual(2, parse.max_duration)
+        self.assertEqual([(0.1, 1), (1, 2), (float('inf'), 3)], parse.buckets)
+        self.assertEqual(300, parse.total_size)
+        self.assertEqual(8, parse.total_nodes)
+        self.assertEqual([(0.1, 1), (1, 1), (float('inf'), 1)],
+                         snapshot[Stage.schema].buckets)
+
+        metrics.reset()
+        self.assertEqual({}, metrics.snapshot())
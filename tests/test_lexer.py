@@ -0,0 +1,112 @@
+import os
+from unittest import TestCase
+
+from onemsdk import set_static_dir
+from onemsdk.exceptions import MalformedHTMLException, ONEmSDKException
+from onemsdk.parser.lexer import lex_node
+from onemsdk.parser.util import (build_node, build_node_from_chunks, get_default_parser,
+                                 set_default_parser)
+
+from tests import test_parser
+from tests.test_compiler import DOCUMENTS
+
+set_static_dir(os.path.join(os.path.dirname(__file__), 'static'))
+
+
+class TestParserWithLexer(test_parser.TestParser):
+    """ The parser tests, run with the lexer as default parser """
+
+    def setUp(self):
+        set_default_parser('lexer')
+        super(TestParserWithLexer, self).setUp()
+
+    def tearDown(self):
+        super(TestParserWithLexer, self).tearDown()
+        set_default_parser('html.parser')
+
+
+class TestLexer(TestCase):
+    def test_same_nodes_as_html_parser(self):
+        documents = list(DOCUMENTS)
+        for name in ('index.html', 'form-big.html'):
+            with open(os.path.join('tests', 'static', name)) as f:
+                documents.append(f.read())
+        documents.append("""
+            <!DOCTYPE html>
+            <SECTION Header='Caf&eacute;' auto-select>
+              <!-- a <p>comment</p> -->
+              Ça &amp; 3 < 4 &lt; 5
+              <UL>
+                <li value=plain text-search = "a > b"><a href=/x/>X&nbsp;&#65;</a></li>
+              </ul >
+              <br/><br />
+            </section>
+        """)
+
+        for html in documents:
+            with self.subTest(html=html):
+                expected = build_node(html, 'html.parser')
+                self.assertEqual(expected, lex_node(html))
+                for size in (1, 5, 64):
+                    chunks = [html[i:i + size] for i in range(0, len(html), size)]
+                    self.assertEqual(expected, build_node_from_chunks(chunks,
+                                                                      parser='lexer'))
+
+    def test_quoted_brackets_split_in_chunks(self):
+        html = ('<section><p title="x>y<z">hi</p>'
+                "<ul><li value='a<b>c'>A</li></ul></section>")
+        expected = build_node(html, 'html.parser')
+        for size in range(1, len(html) + 1):
+            with self.subTest(size=size):
+                chunks = [html[i:i + size] for i in range(0, len(html), size)]
+                self.assertEqual(expected, build_node_from_chunks(chunks, parser='lexer'))
+
+    def test_malformed_start_tag_in_chunks(self):
+        html = "<section>\n<p a='x>y</p></section>"
+        for size in (1, 4, len(html)):
+            chunks = [html[i:i + size] for i in range(0, len(html), size)]
+            with self.assertRaises(MalformedHTMLException) as context:
+                build_node_from_chunks(chunks, parser='lexer')
+            self.assertEqual('Malformed start tag (line 2, column 1)',
+                             str(context.exception))
+
+    def test_attributes(self):
+        node = lex_node('<section a="1" B=\'2\' c=3 d f="&lt;&amp;" e=></section>')
+        self.assertEqual({'a': '1', 'b': '2', 'c': '3', 'd': None, 'e': '',
+                          'f': '<&'}, node.attrs)
+
+    def test_errors_report_the_position(self):
+        cases = [
+            ('<section>\n  <p>text</ul>\n</section>',
+             '<p> is the last opened tag, but </ul> was received.', 2, 10),
+            ('<section></section>\n<section></section>',
+             'Only one root tag permitted', 2, 1),
+            ('<section></section>\n  text', 'Text is only permitted inside the root tag',
+             2, 3),
+            ('<section></section>\n</p>', '</p> was received, but no tag is opened', 2, 1),
+            ('<section>\n  <p a="1"', 'Unterminated tag', 2, 3),
+            ('<section>\n  <p>\n', '<p> is not closed', 3, 1),
+            ('<section><p a=\'x>y</p></section>', 'Malformed start tag', 1, 10),
+        ]
+        for html, message, line, column in cases:
+            with self.subTest(html=html):
+                with self.assertRaises(MalformedHTMLException) as context:
+                    lex_node(html)
+                self.assertEqual(f'{message} (line {line}, column {column})',
+                                 str(context.exception))
+                self.assertEqual((line, column),
+                                 (context.exception.line, context.exception.column))
+
+    def test_errors_in_chunks_report_the_position(self):
+        html = '<section>\n  <p>\n    <br/>\n  </p>\n  </ul>\n</section>'
+        for size in (1, 3, len(html)):
+            chunks = [html[i:i + size] for i in range(0, len(html), size)]
+            with self.assertRaises(MalformedHTMLException) as context:
+                build_node_from_chunks(chunks, parser='lexer')
+            self.assertEqual((5, 3), (context.exception.line, context.exception.column))
+
+    def test_default_parser(self):
+        self.assertEqual('html.parser', get_default_parser())
+        with self.assertRaises(ONEmSDKException):
+            set_default_parser('lxml')
+        self.assertEqual('html.parser', get_default_parser())
@@ -0,0 +1,108 @@
+import os
+import pickle
+from unittest import TestCase, mock
+
+from onemsdk import set_static_dir
+from onemsdk.exceptions import ONEmSDKException, ParseLimitException
+from onemsdk.parser import (ParseLimits, SectionTag, compile_html, compile_template,
+                            get_parse_limits, load_html, set_parse_limits)
+from onemsdk.parser.util import build_node, build_node_from_chunks
+from onemsdk.schema.v1 import Response
+
+from tests.test_compiler import DOCUMENTS, TEMPLATE_DATA
+
+set_static_dir(os.path.join(os.path.dirname(__file__), 'static'))
+
+PARSERS = ('html.parser', 'lexer')
+
+
+def nested_html(depth: int) -> str:
+    return '<section>' + '<p>' * depth + 'text' + '</p>' * depth + '</section>'
+
+
+class TestParseLimits(TestCase):
+    def tearDown(self):
+        set_parse_limits()
+
+    def assertLimitExceeded(self, limit, html):
+        for parser in PARSERS:
+            with self.subTest(parser=parser):
+                with self.assertRaises(ParseLimitException) as context:
+                    build_node(html, parser)
+                self.assertEqual(limit, context.exception.limit)
+
+                with self.assertRaises(ParseLimitException):
+                    build_node_from_chunks([html[:10], html[10:]], parser=parser)
+
+        with self.assertRaises(ParseLimitException):
+            compile_html(html)
+
+    def test_no_limits_by_default(self):
+        self.assertEqual(ParseLimits(), get_parse_limits())
+
+    def test_max_depth(self):
+        set_parse_limits(max_depth=3)
+        for parser in PARSERS:
+            build_node(nested_html(2), parser)
+        self.assertLimitExceeded('max_depth', nested_html(3))
+        self.assertLimitExceeded('max_depth', '<section><p><p><br/></p></p></section>')
+
+    def test_max_nodes(self):
+        set_parse_limits(max_nodes=6)
+        html = '<section><ul><li>A</li><li>B</li></ul></section>'
+        for parser in PARSERS:
+            build_node(html, parser)
+        self.assertLimitExceeded('max_nodes', html.replace('</ul>', '<li>C</li></ul>'))
+        self.assertLimitExceeded('max_nodes', html.replace('</ul>', '</ul><br/>'))
+        # The text nodes are counted as well as the tags
+        self.assertLimitExceeded('max_nodes', '<section>A<br/>B<br/>C<br/>D</section>')
+
+    def test_max_text_bytes(self):
+        set_parse_limits(max_text_bytes=10)
+        for parser in PARSERS:
+            # The whitespace of the text is collapsed before it is counted
+            build_node('<section>  ab  cd  <a href="/x">ef</a></section>', parser)
+        self.assertLimitExceeded('max_text_bytes', '<section>abcde<p>ééé</p></section>')
+        self.assertLimitExceeded('max_text_bytes',
+                                 '<section>abcde<a href="/abcdef">x</a></section>')
+
+    def test_max_attributes(self):
+        set_parse_limits(max_attributes=2)
+        for parser in PARSERS:
+            build_node('<section a="1" b><br/></section>', parser)
+        self.assertLimitExceeded('max_attributes', '<section a="1" b c><br/></section>')
+        self.assertLimitExceeded('max_attributes', '<section><br a b c/></section>')
+
+    def test_documents_within_the_limits(self):
+        set_parse_limits(max_depth=5, max_nodes=100, max_text_bytes=1000,
+                         max_attributes=20)
+        for html in DOCUMENTS:
+            Response.from_tag(load_html(html_str=html))
+
+    def test_aborts_early(self):
+        set_parse_limits(max_depth=10)
+        with self.assertRaises(ParseLimitException) as context:
+            load_html(html_str=nested_html(100000))
+        self.assertEqual('The document exceeds max_depth=10', str(context.exception))
+
+    def test_compiler_does_not_fall_back(self):
+        set_parse_limits(max_depth=2)
+        with mock.patch('onemsdk.parser.compiler._reference_response_dict') as reference:
+            with self.assertRaises(ParseLimitException):
+                compile_html(nested_html(100))
+            with self.assertRaises(ParseLimitException):
+                compile_template('index.jinja2', **TEMPLATE_DATA)
+        reference.assert_not_called()
+
+    def test_exception_is_picklable(self):
+        error = pickle.loads(pickle.dumps(ParseLimitException('message', 'max_nodes')))
+        self.assertEqual(('message', 'max_nodes'), (str(error), error.limit))
+
+
+class TestDeepDocuments(TestCase):
+    def test_from_node_is_not_recursive(self):
+        for parser in PARSERS:
+            node = build_node(nested_html(20000), parser)
+            with self.assertRaises(ONEmSDKException) as context:
+                SectionTag.from_node(node)
+            self.assertEqual('<p> must have max 1 text child', str(context.exception))
@@ -0,0 +1,96 @@
+from unittest import TestCase
+
+from onemsdk.exceptions import ONEmSDKException
+from onemsdk.parser import load_html
+from onemsdk.schema.pagination import (decode_cursor, encode_cursor, page_cursor,
+                                       paginate_form_item, paginate_menu)
+from onemsdk.schema.v1 import FormItem, Menu, MenuItem, MenuMeta
+
+
+def make_menu(count):
+    return Menu(body=[MenuItem(description=f'Item {i}', path=f'/items/{i}')
+                      for i in range(count)],
+                header='Header', footer='Footer', meta=MenuMeta(auto_select=True))
+
+
+class TestPagination(TestCase):
+    def test_cursor(self):
+        for page in (0, 1, 35, 36, 12345):
+            self.assertEqual(page, decode_cursor(encode_cursor(page)))
+        self.assertEqual('z', encode_cursor(35))
+        self.assertEqual(0, decode_cursor(None))
+        for cursor in ('!', '-1', '-z', '+1', ' 1', '1 ', '1_0', 'Z', '\u0661', 1):
+            with self.subTest(cursor=cursor):
+                with self.assertRaises(ONEmSDKException):
+                    decode_cursor(cursor)
+
+    def test_invalid_cursors_are_rejected(self):
+        menu = make_menu(25)
+        for cursor in ('-1', '-z', ' 1'):
+            with self.subTest(cursor=cursor):
+                with self.assertRaises(ONEmSDKException):
+                    paginate_menu(menu, '/catalogue', cursor, page_size=10)
+
+    def test_menu_pages(self):
+        menu = make_menu(25)
+
+        first = paginate_menu(menu, '/catalogue', page_size=10)
+        self.assertEqual([f'Item {i}' for i in range(10)] + ['Next'],
+                         [item.description for item in first.body])
+        self.assertEqual('/catalogue?page=1', first.body[-1].path)
+        self.assertEqual(('Header', 'Footer', menu.meta),
+                         (first.header, first.footer, first.meta))
+
+        second = paginate_menu(menu, '/catalogue?sort=asc', '1', page_size=10)
+        self.assertEqual(['Item 10', 'Next', 'Previous'],
+                         [second.body[0].description] +
+                         [item.description for item in second.body[-2:]])
+        self.assertEqual('/catalogue?sort=asc&page=2', second.body[-2].path)
+        self.assertEqual('/catalogue?sort=asc&page=0', second.body[-1].path)
+
+        last = paginate_menu(menu, '/catalogue', '2', page_size=10)
+        self.assertEqual(['Item 20', 'Item 21', 'Item 22', 'Item 23', 'Item 24',
+                          'Previous'], [item.description for item in last.body])
+
+        with self.assertRaises(ONEmSDKException):
+            paginate_menu(menu, '/catalogue', '3', page_size=10)
+
+    def test_single_page(self):
+        menu = make_menu(3)
+        self.assertEqual(menu, paginate_menu(menu, '/catalogue', page_size=10))
+        self.assertEqual(make_menu(0), paginate_menu(make_menu(0), '/', page_size=10))
+
+    def test_max_chars(self):
+        menu = make_menu(30)
+        cursor = None
+        descriptions = []
+        while True:
+            page = paginate_menu(menu, '/catalogue', cursor, max_chars=50)
+            self.assertLessEqual(sum(len(item.description) + 1 for item in page.body), 50)
+            descriptions.extend(item.description for item in page.body
+                                if item.description not in ('Next', 'Previous'))
+            next_paths = [item.path for item in page.body if item.description == 'Next']
+            if not next_paths:
+                break
+            cursor = next_paths[0].split('page=')[1]
+        self.assertEqual([item.description for item in menu.body], descriptions)
+
+    def test_form_item(self):
+        section = load_html(html_str='<form action="/"><section name="choice"><ul>' +
+                                     ''.join(f'<li value="v{i}">Option {i}</li>'
+                                             for i in range(7)) +
+                                     '</ul></section></form>').children[0]
+        form_item = FormItem.from_tag(section)
+
+        page = paginate_form_item(form_item, '1', page_size=3)
+        self.assertEqual(['v3', 'v4', 'v5', 'page:2', 'page:0'],
+                         [item.value for item in page.body])
+        self.assertEqual('choice', page.name)
+        self.assertEqual(7, len(form_item.body))
+
+        self.assertEqual('2', page_cursor('page:2'))
+        self.assertIsNone(page_cursor('v3'))
+
+        text_item = FormItem(type='string', name='text')
+        with self.assertRaises(ONEmSDKException):
+            paginate_form_item(text_item, page_size=3)
@@ -1,8 +1,17 @@
 import os
-from unittest import TestCase
+import tempfile
+from unittest import TestCase, mock
 
 from onemsdk import set_static_dir
-from onemsdk.parser.util import build_node, _load_template
+from onemsdk.parser import SectionTag
+from onemsdk.parser.node import LightNode, Node
+from onemsdk.exceptions import MalformedHTMLException, ONEmSDKException
+from onemsdk.parser.util import (build_node, _load_template, load_html, clear_html_cache,
+                                 invalidate_html_cache, html_cache_info,
+                                 set_html_cache_size, build_node_from_chunks,
+                                 configure_templates, _get_template, load_template,
+                                 memoize_templates, template_cache_info, context_hash)
+from onemsdk.schema.v1 import Response
 
 set_static_dir(os.path.join(os.path.dirname(__file__), 'static'))
 
@@ -84,6 +93,49 @@ class TestParser(TestCase):
         self.assertEqual(1, len(second_paragraph.children))
         self.assertEqual('Paragraph 2 section 3', second_paragraph.children[0])
 
+    def test_build_node_to_node(self):
+        html = '<section><ul><li value="1"><a href="/a">A</a></li></ul>text</section>'
+        light_node = build_node(html)
+
+        self.assertIsInstance(light_node, LightNode)
+        self.assertFalse(hasattr(light_node, '__dict__'))
+
+        node = light_node.to_node()
+
+        self.assertIsInstance(node, Node)
+        self.assertIsInstance(node.children[0].children[0], Node)
+        self.assertEqual({'value': '1'}, node.children[0].children[0].attrs)
+        self.assertEqual('A', node.children[0].children[0].children[0].children[0])
+        self.assertEqual('text', node.children[1])
+        self.assertEqual(light_node, node)
+
+    def test_build_node_from_chunks(self):
+        with open('tests/static/index.html', mode='rb') as f:
+            data = f.read()
+            f.seek(0)
+            self.assertEqual(build_node(data.decode('utf-8')), build_node_from_chunks(f))
+
+        with open('tests/static/index.html', mode='r') as f:
+            html = f.read()
+        html += '<!-- ignored -->'
+        html = html.replace('Paragraph 2 section 3', 'Ça &amp; 3 < 4 &lt; 5')
+        expected = build_node(html)
+
+        for size in (1, 2, 3, 7, 64, len(html)):
+            str_chunks = [html[i:i + size] for i in range(0, len(html), size)]
+            self.assertEqual(expected, build_node_from_chunks(str_chunks))
+
+            data = html.encode('utf-8')
+            bytes_chunks = [data[i:i + size] for i in range(0, len(data), size)]
+            self.assertEqual(expected, build_node_from_chunks(bytes_chunks))
+
+    def test_build_node_from_chunks_malformed(self):
+        with self.assertRaises(MalformedHTMLException):
+            build_node_from_chunks(['<section><p>', 'text</p>'])
+
+        with self.assertRaises(MalformedHTMLException):
+            build_node_from_chunks([b'<section><p>', b'text</section>'])
+
     def test_load_template(self):
         data = {
             'li': {
@@ -118,3 +170,157 @@ class TestParser(TestCase):
             html = f.read()
 
         self.assertEqual(html, rendered_html)
+
+
+class TestHtmlCache(TestCase):
+    def setUp(self):
+        clear_html_cache()
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.html_file = os.path.join(self.tmp_dir.name, 'menu.html')
+        self._write('<section><p>First</p></section>')
+
+    def tearDown(self):
+        set_html_cache_size(128)
+        clear_html_cache()
+        self.tmp_dir.cleanup()
+
+    def _write(self, html, mtime_ns=None):
+        with open(self.html_file, 'w') as f:
+            f.write(html)
+        if mtime_ns is not None:
+            os.utime(self.html_file, ns=(mtime_ns, mtime_ns))
+
+    def test_load_html_file_is_cached(self):
+        tag = load_html(html_file=self.html_file)
+        self.assertIsInstance(tag, SectionTag)
+        self.assertIs(tag, load_html(html_file=self.html_file))
+        self.assertEqual((1, 1, 128, 1), tuple(html_cache_info()))
+
+    def test_relative_and_absolute_paths_share_entry(self):
+        tag = load_html(html_file='index.html')
+        static_dir = os.path.join(os.path.dirname(__file__), 'static')
+        self.assertIs(tag, load_html(html_file=os.path.join(static_dir, 'index.html')))
+
+    def test_changed_file_is_reparsed(self):
+        self._write('<section><p>First</p></section>', mtime_ns=10 ** 18)
+        first = load_html(html_file=self.html_file)
+        self._write('<section><p>Second</p></section>', mtime_ns=2 * 10 ** 18)
+        second = load_html(html_file=self.html_file)
+
+        self.assertIsNot(first, second)
+        self.assertEqual('Second', second.render())
+        self.assertEqual(1, html_cache_info().currsize)
+
+    def test_invalidate(self):
+        tag = load_html(html_file=self.html_file)
+        invalidate_html_cache(self.html_file)
+        self.assertIsNot(tag, load_html(html_file=self.html_file))
+
+    def test_lru_eviction(self):
+        set_html_cache_size(1)
+        tag = load_html(html_file=self.html_file)
+        load_html(html_file='index.html')
+        self.assertEqual(1, html_cache_info().currsize)
+        self.assertIsNot(tag, load_html(html_file=self.html_file))
+
+    def test_disabled_cache(self):
+        set_html_cache_size(0)
+        tag = load_html(html_file=self.html_file)
+        self.assertIsNot(tag, load_html(html_file=self.html_file))
+        self.assertEqual(0, html_cache_info().currsize)
+
+
+class TestTemplates(TestCase):
+    def tearDown(self):
+        configure_templates()
+
+    def test_environment_is_reused(self):
+        template = _get_template('index.jinja2')
+        self.assertIs(template.environment, _get_template('index.jinja2').environment)
+        self.assertIs(template, _get_template('index.jinja2'))
+
+    def test_bytecode_cache(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            configure_templates(bytecode_cache_dir=cache_dir, auto_reload=False)
+            template = _get_template('index.jinja2')
+
+            self.assertFalse(template.environment.auto_reload)
+            self.assertEqual(1, len(os.listdir(cache_dir)))
+
+            # A new environment, like the one of another worker, loads the
+            # bytecode instead of compiling the template again
+            configure_templates(bytecode_cache_dir=cache_dir)
+            env = _get_template('index.jinja2').environment
+            self.assertIsNot(template.environment, env)
+            self.assertTrue(env.auto_reload)
+
+    def test_bytecode_cache_dir_must_exist(self):
+        with self.assertRaises(ONEmSDKException):
+            configure_templates(bytecode_cache_dir='/non/existent/dir')
+
+
+class TestTemplateMemoization(TestCase):
+    def setUp(self):
+        memoize_templates(maxsize=2)
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.template_file = os.path.join(self.tmp_dir.name, 'menu.jinja2')
+        self._write('<section><p>{{ text }}</p></section>', mtime_ns=10 ** 18)
+
+    def tearDown(self):
+        memoize_templates(maxsize=0)
+        self.tmp_dir.cleanup()
+
+    def _write(self, template, mtime_ns):
+        with open(self.template_file, 'w') as f:
+            f.write(template)
+        os.utime(self.template_file, ns=(mtime_ns, mtime_ns))
+
+    def test_context_hash(self):
+        self.assertEqual(context_hash({'a': [1, {'b': {2, 3}}], 'c': None}),
+                         context_hash({'c': None, 'a': [1, {'b': {3, 2}}]}))
+        self.assertNotEqual(context_hash({'a': [1]}), context_hash({'a': (1,)}))
+        self.assertNotEqual(context_hash({'a': 1}), context_hash({'a': '1'}))
+
+        with self.assertRaises(TypeError):
+            context_hash({'a': object()})
+
+    def test_memoized_by_context(self):
+        with mock.patch('onemsdk.parser.util.get_static_dir', return_value=None):
+            tag = load_template(self.template_file, text='one')
+            self.assertIs(tag, load_template(self.template_file, text='one'))
+            self.assertIsNot(tag, load_template(self.template_file, text='two'))
+
+            self.assertEqual(1, template_cache_info().hits)
+            self.assertEqual(2, template_cache_info().currsize)
+
+    def test_response_variant(self):
+        with mock.patch('onemsdk.parser.util.get_static_dir', return_value=None):
+            response = Response.from_template(self.template_file, text='one')
+            self.assertIsInstance(response, Response)
+            self.assertEqual('one', response.content.body[0].description)
+            self.assertIs(response, Response.from_template(self.template_file, text='one'))
+            self.assertIsNot(load_template(self.template_file, text='one'), response)
+
+    def test_changed_template_is_rendered_again(self):
+        with mock.patch('onemsdk.parser.util.get_static_dir', return_value=None):
+            self.assertEqual('one', load_template(self.template_file, text='one').render())
+            self._write('<section><p>{{ text }}!</p></section>', mtime_ns=2 * 10 ** 18)
+            self.assertEqual('one!', load_template(self.template_file, text='one').render())
+
+    def test_ttl(self):
+        memoize_templates(ttl=60)
+        with mock.patch('onemsdk.parser.util.get_static_dir', return_value=None):
+            tag = load_template(self.template_file, text='one')
+            with mock.patch('onemsdk.cache.time.monotonic', return_value=10 ** 9):
+                self.assertIsNot(tag, load_template(self.template_file, text='one'))
+
+    def test_data_which_cannot_be_hashed_is_not_memoized(self):
+        class Text:
+            def __str__(self):
+                return 'one'
+
+        with mock.patch('onemsdk.parser.util.get_static_dir', return_value=None):
+            tag = load_template(self.template_file, text=Text())
+            self.assertEqual('one', tag.render())
+            self.assertIsNot(tag, load_template(self.template_file, text=Text()))
+            self.assertEqual(0, template_cache_info().currsize)
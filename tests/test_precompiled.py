@@ -0,0 +1,102 @@
+import importlib.util
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from unittest import TestCase
+
+from onemsdk.bundle import ResponseBundle
+from onemsdk.exceptions import ONEmSDKException
+from onemsdk.parser import load_html
+from onemsdk.precompiled import PrecompiledResponses
+from onemsdk.schema.v1 import Response
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STATIC_DIR = os.path.join(BASE_DIR, 'tests', 'static')
+
+
+def load_precompile_script():
+    spec = importlib.util.spec_from_file_location(
+        'precompile', os.path.join(BASE_DIR, 'scripts', 'precompile.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class TestPrecompiled(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.static_dir = os.path.join(self.tmp_dir.name, 'static')
+        self.output_dir = os.path.join(self.tmp_dir.name, 'out')
+        shutil.copytree(STATIC_DIR, self.static_dir)
+        os.makedirs(os.path.join(self.static_dir, 'menus'))
+        with open(os.path.join(self.static_dir, 'menus', 'main.html'), 'w') as f:
+            f.write('<section><header>Main</header><p>Hello</p></section>')
+        os.makedirs(self.output_dir)
+        self.precompile = load_precompile_script()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_precompile(self):
+        errors = self.precompile.precompile(self.static_dir, self.output_dir)
+        self.assertEqual({}, errors)
+
+        responses = PrecompiledResponses(self.output_dir, verify=True)
+        self.assertEqual(3, len(responses))
+        self.assertNotIn('index.jinja2', responses)
+        for html_file in ('index.html', 'form-big.html', 'menus/main.html'):
+            path = os.path.join(self.static_dir, *html_file.split('/'))
+            expected = Response.from_tag(load_html(html_file=path)).json()
+            self.assertEqual(expected.encode('utf-8'), responses.get(html_file))
+            self.assertEqual(64, len(responses.etag(html_file)))
+
+        with self.assertRaises(ONEmSDKException):
+            responses.get('missing.html')
+
+    def test_bundle(self):
+        bundle_path = os.path.join(self.tmp_dir.name, 'responses.bundle')
+        self.precompile.precompile(self.static_dir, self.output_dir, bundle=bundle_path)
+
+        responses = PrecompiledResponses(self.output_dir)
+        with ResponseBundle(bundle_path) as bundle:
+            self.assertEqual(sorted(responses.files), list(bundle))
+            for html_file in responses.files:
+                with bundle.get(html_file) as content:
+                    self.assertEqual(responses.get(html_file), content.tobytes())
+
+    def test_stale_files(self):
+        self.precompile.precompile(self.static_dir, self.output_dir)
+        responses = PrecompiledResponses(self.output_dir)
+        self.assertEqual([], responses.stale_files(self.static_dir))
+
+        with open(os.path.join(self.static_dir, 'menus', 'main.html'), 'a') as f:
+            f.write('\n')
+        os.remove(os.path.join(self.static_dir, 'index.html'))
+        self.assertEqual(['index.html', 'menus/main.html'],
+                         responses.stale_files(self.static_dir))
+
+    def test_verify(self):
+        self.precompile.precompile(self.static_dir, self.output_dir)
+        with open(os.path.join(self.output_dir, 'index.html.json'), 'ab') as f:
+            f.write(b' ')
+
+        self.assertTrue(PrecompiledResponses(self.output_dir).get('index.html'))
+        with self.assertRaises(ONEmSDKException):
+            PrecompiledResponses(self.output_dir, verify=True).get('index.html')
+
+    def test_invalid_files(self):
+        with open(os.path.join(self.static_dir, 'bad.html'), 'w') as f:
+            f.write('<section><li>Bad</li></section>')
+
+        self.assertEqual(1, self.precompile.main([self.static_dir, self.output_dir]))
+        responses = PrecompiledResponses(self.output_dir)
+        self.assertNotIn('bad.html', responses)
+        self.assertIn('index.html', responses)
+
+    def test_loader_does_not_import_the_parser(self):
+        code = ('import sys, onemsdk.precompiled; '
+                'sys.exit(any(m.startswith(("onemsdk.parser", "onemsdk.schema", '
+                '"pydantic", "jinja2")) for m in sys.modules))')
+        subprocess.run([sys.executable, '-c', code], cwd=BASE_DIR, check=True)
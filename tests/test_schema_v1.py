@@ -8,7 +8,7 @@ from onemsdk import set_static_dir
 from onemsdk.exceptions import ONEmSDKException
 from onemsdk.parser import SectionTag
 from onemsdk.parser.util import load_html
-from onemsdk.schema.v1 import Response, FormItem, FormItemType
+from onemsdk.schema.v1 import Response, FormItem, FormItemType, MenuItemFormItem
 
 set_static_dir(os.path.join(os.path.dirname(__file__), 'static'))
 
@@ -739,3 +739,28 @@ class TestFormItem(TestCase):
             "validate_url": "The val url"
         }
         self.assertEqual(json.dumps(expected, indent=2), form_item.json(indent=2))
+
+    def test_from_tag__each_ul_adds_its_own_options(self):
+        html = """
+        <section name="name">
+            <ul>
+                <li value="a">A</li>
+                <li>Separator</li>
+            </ul>
+            Between
+            <ul>
+                <li value="b" text-search="bee"><a href="/b">B</a></li>
+            </ul>
+        </section>
+        """
+        form_item = FormItem.from_tag(load_html(html_str=html))
+
+        self.assertEqual(FormItemType.form_menu, form_item.type)
+        self.assertEqual([
+            MenuItemFormItem(description='A', value='a'),
+            MenuItemFormItem(description='Separator'),
+            MenuItemFormItem(description='Between'),
+            MenuItemFormItem(description='B', value='b', text_search='bee'),
+        ], form_item.body)
+        self.assertEqual({'type', 'description', 'value', 'text_search'},
+                         form_item.body[0].__fields_set__)
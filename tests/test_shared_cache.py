@@ -0,0 +1,204 @@
+import os
+import pickle
+import tempfile
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from unittest import TestCase, mock, skipIf
+
+from onemsdk.cache import CacheInfo
+from onemsdk.exceptions import ONEmSDKException
+from onemsdk.parser import load_template, memoize_templates, template_cache_info
+from onemsdk.shared_cache import SharedResponseCache, _SLOT
+
+
+def _set_in_worker(path: str, key: str, value: bytes) -> None:
+    with SharedResponseCache(path, maxbytes=64 * 1024, block_size=1024) as cache:
+        cache.set(key, value)
+
+
+class TestSharedResponseCache(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, 'cache')
+        self.cache = self._open()
+
+    def tearDown(self):
+        self.cache.close()
+        self.tmp_dir.cleanup()
+
+    def _open(self, **kwargs):
+        options = {'maxbytes': 64 * 1024, 'block_size': 1024, 'secret': b'secret'}
+        options.update(kwargs)
+        return SharedResponseCache(self.path, **options)
+
+    def test_get_set(self):
+        self.assertIsNone(self.cache.get('a'))
+        self.cache.set('a', b'{"json": 1}')
+        self.cache.set(('tag', 'menu.html', 'hash'), (1, ['a', 'tree']))
+        self.assertEqual(b'{"json": 1}', self.cache.get('a'))
+        self.assertEqual((1, ['a', 'tree']), self.cache.get(('tag', 'menu.html', 'hash')))
+
+        self.cache.set('a', b'{"json": 2}')
+        self.assertEqual(b'{"json": 2}', self.cache.get('a'))
+        pickled = pickle.dumps((1, ['a', 'tree']), pickle.HIGHEST_PROTOCOL)
+        self.assertEqual(CacheInfo(3, 1, 64 * 1024, 11 + 32 + len(pickled)),
+                         self.cache.info())
+
+        self.cache.set('large', b'x' * 1025)
+        self.assertIsNone(self.cache.get('large'))
+
+        self.cache.clear()
+        self.assertIsNone(self.cache.get('a'))
+        self.assertEqual(CacheInfo(0, 1, 64 * 1024, 0), self.cache.info())
+
+    def test_refuses_the_files_others_can_write(self):
+        other_path = os.path.join(self.tmp_dir.name, 'planted')
+        with open(other_path, 'wb'):
+            pass
+
+        os.chmod(other_path, 0o666)
+        with self.assertRaises(ONEmSDKException) as context:
+            SharedResponseCache(other_path)
+        self.assertIn('mode must be 0600', str(context.exception))
+
+        os.chmod(other_path, 0o640)
+        with self.assertRaises(ONEmSDKException):
+            SharedResponseCache(other_path)
+
+        link_path = os.path.join(self.tmp_dir.name, 'link')
+        os.symlink(self.path, link_path)
+        with self.assertRaises(OSError):
+            SharedResponseCache(link_path)
+
+    @skipIf(not hasattr(os, 'geteuid') or os.geteuid() != 0, 'chown needs root')
+    def test_refuses_the_files_of_other_users(self):
+        other_path = os.path.join(self.tmp_dir.name, 'planted')
+        fd = os.open(other_path, os.O_CREAT | os.O_WRONLY, 0o600)
+        os.close(fd)
+        os.chown(other_path, 12345, -1)
+        with self.assertRaises(ONEmSDKException) as context:
+            SharedResponseCache(other_path)
+        self.assertIn('owned by another user', str(context.exception))
+
+    def test_pickled_values_are_authenticated(self):
+        self.cache.set('a', {'tree': 1})
+        with self._open(secret=b'other') as other:
+            self.assertIsNone(other.get('a'))
+        with self._open(secret=None) as other:
+            self.assertIsNone(other.get('a'))
+            self.assertEqual(b'A', other.get('b', b'A'))
+            with self.assertRaises(ONEmSDKException):
+                other.set('c', {'tree': 2})
+
+        # A value forged without the secret, with a valid crc
+        offset = self._slot_offset('a')
+        slot = (offset - self.cache._slots_offset) // _SLOT.size
+        forged = bytes(32) + pickle.dumps({'tree': 'forged'})
+        start = self.cache._data_offset + slot * self.cache.block_size
+        self.cache._mmap[start:start + len(forged)] = forged
+        _SLOT.pack_into(self.cache._mmap, offset, self.cache._digest('a'), 2, len(forged),
+                        zlib.crc32(forged), 0.0, 1, 0)
+        self.assertIsNone(self.cache.get('a'))
+
+    def test_shared_between_processes(self):
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            list(executor.map(_set_in_worker, [self.path] * 2, ['a', 'b'], [b'A', b'B']))
+        self.assertEqual([b'A', b'B'], [self.cache.get('a'), self.cache.get('b')])
+
+        with self._open() as other:
+            other.set('c', b'C')
+        self.assertEqual(b'C', self.cache.get('c'))
+
+    def test_clock_eviction(self):
+        self.cache.close()
+        os.unlink(self.path)
+        self.cache = self._open(maxbytes=2 * 1024, ways=2)
+
+        self.cache.set('a', b'A')
+        self.cache.set('b', b'B')
+        self.cache.get('a')
+        self.cache.set('c', b'C')
+        self.assertEqual([b'A', None, b'C'], [self.cache.get(key) for key in 'abc'])
+
+        # Both were read since the hand passed, so the hand goes around once
+        self.cache.set('d', b'D')
+        self.assertEqual([None, b'C', b'D'], [self.cache.get(key) for key in 'acd'])
+
+    def test_ttl(self):
+        cache = self._open(ttl=60)
+        with mock.patch('onemsdk.shared_cache.time.time', return_value=1000):
+            cache.set('a', b'A')
+            self.assertEqual(b'A', cache.get('a'))
+        with mock.patch('onemsdk.shared_cache.time.time', return_value=1060):
+            self.assertIsNone(cache.get('a'))
+            self.assertEqual(0, cache.info().currsize)
+        cache.close()
+
+    def _slot_offset(self, key: str) -> int:
+        digest = self.cache._digest(key)
+        for slot in range(self.cache.sets * self.cache.ways):
+            offset = self.cache._slots_offset + slot * _SLOT.size
+            if self.cache._mmap[offset:offset + 16] == digest:
+                return offset
+        raise AssertionError(f'{key} is not cached')
+
+    def test_changing_or_corrupted_slots_miss(self):
+        self.cache.set('a', b'A')
+        offset = self._slot_offset('a')
+        sequence = self.cache._mmap[offset + 16]
+
+        self.cache._mmap[offset + 16] = sequence + 1
+        self.assertIsNone(self.cache.get('a'))
+
+        self.cache._mmap[offset + 16] = sequence
+        self.assertEqual(b'A', self.cache.get('a'))
+        slot = (offset - self.cache._slots_offset) // _SLOT.size
+        self.cache._mmap[self.cache._data_offset + slot * self.cache.block_size] = ord('B')
+        self.assertIsNone(self.cache.get('a'))
+
+    def test_half_published_slots_miss(self):
+        self.cache.set('a', b'A')
+        offset = self._slot_offset('a')
+
+        # A writer preempted after the key and an even sequence, before the length
+        _SLOT.pack_into(self.cache._mmap, offset, self.cache._digest('a'), 2, 0, 0, 0.0, 0, 0)
+        self.assertIsNone(self.cache.get('a'))
+
+        self.cache.set('b', b'')
+        self.assertIsNone(self.cache.get('b'))
+        self.assertFalse(self._is_stored('b'))
+
+    def _is_stored(self, key: str) -> bool:
+        try:
+            self._slot_offset(key)
+        except AssertionError:
+            return False
+        return True
+
+    def test_geometry(self):
+        with self.assertRaises(ONEmSDKException):
+            self._open(block_size=2048)
+        with self.assertRaises(ONEmSDKException):
+            self._open(maxbytes=1024)
+
+        with open(self.path + '.other', 'wb') as f:
+            f.write(b'not a cache' * 10)
+        with self.assertRaises(ONEmSDKException):
+            SharedResponseCache(self.path + '.other')
+
+    def test_template_memoization(self):
+        with open(os.path.join(self.tmp_dir.name, 'menu.jinja2'), 'w') as f:
+            f.write('<section><p>{{ text }}</p></section>')
+
+        memoize_templates(cache=self.cache)
+        try:
+            with mock.patch('onemsdk.parser.util.get_static_dir', return_value=None):
+                template_file = os.path.join(self.tmp_dir.name, 'menu.jinja2')
+                tag = load_template(template_file, text='one')
+                self.assertEqual(tag, load_template(template_file, text='one'))
+                with self._open() as other:
+                    memoize_templates(cache=other)
+                    self.assertEqual(tag, load_template(template_file, text='one'))
+                    self.assertEqual(1, template_cache_info().hits)
+        finally:
+            memoize_templates(maxsize=0)
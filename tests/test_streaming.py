@@ -0,0 +1,68 @@
+import io
+import json
+import tempfile
+from unittest import TestCase
+
+from onemsdk.parser import load_html
+from onemsdk.schema.streaming import iter_menu_json, iter_menu_json_bytes, write_menu_json
+from onemsdk.schema.v1 import Menu, MenuItem, MenuMeta, Response
+
+
+def make_items(count):
+    for i in range(count):
+        yield MenuItem(description=f'Item {i}', path=f'/items/{i}',
+                       text_search=f'Item {i} "search"')
+
+
+class TestStreaming(TestCase):
+    def expected(self, items, **kwargs):
+        return Response(content=Menu(body=list(items), **kwargs)).json()
+
+    def test_same_as_response_json(self):
+        meta = MenuMeta(auto_select=True)
+        for count in (0, 1, 3, 500):
+            with self.subTest(count=count):
+                self.assertEqual(
+                    self.expected(make_items(count), header='Héader', meta=meta),
+                    ''.join(iter_menu_json(make_items(count), header='Héader',
+                                           meta=meta, chunk_size=100))
+                )
+
+    def test_chunks(self):
+        chunks = list(iter_menu_json(make_items(100), chunk_size=1000))
+        self.assertGreater(len(chunks), 5)
+        for chunk in chunks[:-1]:
+            self.assertGreaterEqual(len(chunk), 1000)
+        self.assertEqual(1, len(list(iter_menu_json(make_items(100)))))
+
+    def test_tags(self):
+        section = load_html(html_str="""
+        <section>
+          <p>Paragraph</p>
+          <br/>
+          <ul>
+            <li>Separator</li>
+            <li text-search="first"><a href="/first" method="POST">First</a></li>
+          </ul>
+        </section>
+        """)
+        items = [section.children[0], section.children[1], *section.children[2].children,
+                 'Text', '']
+        expected = self.expected([MenuItem.from_tag(item) for item in items if item])
+        self.assertEqual(expected, ''.join(iter_menu_json(iter(items))))
+
+    def test_write(self):
+        expected = self.expected(make_items(10), footer='Footer')
+
+        text = io.StringIO()
+        write_menu_json(text, make_items(10), footer='Footer')
+        self.assertEqual(expected, text.getvalue())
+
+        with tempfile.TemporaryFile() as f:
+            write_menu_json(f, make_items(10), footer='Footer')
+            f.seek(0)
+            self.assertEqual(expected.encode('ascii'), f.read())
+
+    def test_bytes(self):
+        content = b''.join(iter_menu_json_bytes(make_items(10)))
+        self.assertEqual(10, len(json.loads(content)['content']['body']))
@@ -0,0 +1,100 @@
+import os
+import threading
+from unittest import TestCase, mock
+
+from pydantic import ValidationError
+
+from onemsdk import set_static_dir
+from onemsdk.exceptions import ONEmSDKException
+from onemsdk.parser import configure_templates, load_html, load_template
+from onemsdk.schema.v1 import HttpMethod, Response
+from onemsdk.trusted import get_trusted_mode, set_trusted_mode, trusted
+
+from tests.test_compiler import DOCUMENTS, TEMPLATE_DATA
+
+set_static_dir(os.path.join(os.path.dirname(__file__), 'static'))
+
+
+class TestTrustedMode(TestCase):
+    def tearDown(self):
+        set_trusted_mode(False)
+
+    def test_same_output_as_validated_mode(self):
+        for html in DOCUMENTS:
+            with self.subTest(html=html):
+                tag = load_html(html_str=html)
+                response = Response.from_tag(tag)
+                with trusted():
+                    trusted_tag = load_html(html_str=html)
+                    trusted_response = Response.from_tag(trusted_tag)
+
+                self.assertEqual(tag, trusted_tag)
+                self.assertEqual(response.dict(), trusted_response.dict())
+                self.assertEqual(response.json(), trusted_response.json())
+
+    def test_values_are_converted(self):
+        with trusted():
+            tag = load_html(html_str='<form action="/"><section name="a">'
+                                     '<input type="number" min="2" max="2.5"/>'
+                                     '</section></form>')
+            response = Response.from_tag(tag)
+
+        attrs = tag.children[0].children[0].attrs
+        self.assertEqual((2, 2.5), (attrs.min, attrs.max))
+        item = response.content.body[0]
+        self.assertIs(float, type(item.min_value))
+        self.assertIs(HttpMethod.POST, response.content.method)
+
+    def test_errors(self):
+        with trusted():
+            with self.assertRaises(ValidationError):
+                load_html(html_str='<form action="/"><section name="a">'
+                                   '<input type="bogus"/></section></form>')
+            with self.assertRaises(ONEmSDKException):
+                load_html(html_str='<section><p>One</p><p>Two</p><a href="/">A</a>'
+                                   '</section>')
+
+    def test_modes(self):
+        self.assertFalse(get_trusted_mode())
+        with trusted():
+            self.assertTrue(get_trusted_mode())
+            with trusted(False):
+                self.assertFalse(get_trusted_mode())
+            self.assertTrue(get_trusted_mode())
+        self.assertFalse(get_trusted_mode())
+
+        set_trusted_mode(True)
+        self.assertTrue(get_trusted_mode())
+        with trusted(False):
+            self.assertFalse(get_trusted_mode())
+
+    def test_context_is_per_thread(self):
+        modes = []
+        with trusted():
+            thread = threading.Thread(target=lambda: modes.append(get_trusted_mode()))
+            thread.start()
+            thread.join()
+        self.assertEqual([False], modes)
+
+
+class TestTrustValidatedTemplates(TestCase):
+    def setUp(self):
+        configure_templates(trust_validated=True)
+
+    def tearDown(self):
+        configure_templates()
+
+    def test_validated_once(self):
+        modes = []
+        build_tag = 'onemsdk.parser.util._build_tag'
+
+        with mock.patch(build_tag, side_effect=lambda html: modes.append(
+                get_trusted_mode())):
+            load_template('index.jinja2', **TEMPLATE_DATA)
+            load_template('index.jinja2', **TEMPLATE_DATA)
+            # Another kind of result is validated on its own
+            Response.from_template('index.jinja2', **TEMPLATE_DATA)
+
+        self.assertEqual([False, True], modes)
+        self.assertEqual(Response.from_tag(load_template('index.jinja2', **TEMPLATE_DATA)),
+                         Response.from_template('index.jinja2', **TEMPLATE_DATA))
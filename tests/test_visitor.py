@@ -0,0 +1,80 @@
+from unittest import TestCase
+
+from onemsdk.exceptions import ONEmSDKException
+from onemsdk.parser import (PTag, Tag, TagDispatcher, load_html, register_tag_cls,
+                            section_child_renderers, unregister_tag_cls)
+from onemsdk.schema.v1 import FormItem, Menu, menu_item_fields, menu_item_form_item_fields
+
+
+class HrTag(Tag):
+    class Config:
+        tag_name = 'hr'
+
+    def render(self):
+        return '-----'
+
+
+HrTag.update_forward_refs()
+
+
+class TestTagDispatcher(TestCase):
+    def test_dispatch(self):
+        class SpecialPTag(PTag):
+            pass
+
+        dispatcher = TagDispatcher('test')
+        dispatcher.register(str)(lambda text: 'str')
+        dispatcher.register(PTag)(lambda tag, suffix='': 'p' + suffix)
+
+        self.assertEqual('str', dispatcher('text'))
+        self.assertEqual('p!', dispatcher(PTag(children=['x']), suffix='!'))
+        # The function of the closest base class
+        self.assertEqual('p', dispatcher(SpecialPTag(children=['x'])))
+        with self.assertRaises(ONEmSDKException):
+            dispatcher(HrTag())
+
+        dispatcher.default = lambda tag: 'default'
+        dispatcher.unregister(PTag)
+        self.assertEqual('default', dispatcher(PTag(children=['x'])))
+        self.assertFalse(TagDispatcher('empty').handles(str))
+
+
+class TestCustomTag(TestCase):
+    def setUp(self):
+        register_tag_cls(HrTag)
+        section_child_renderers.register(HrTag)(
+            lambda tag, exclude_header, exclude_footer: (tag.render(), True)
+        )
+
+    def tearDown(self):
+        unregister_tag_cls(HrTag)
+        section_child_renderers.unregister(HrTag)
+        menu_item_fields.unregister(HrTag)
+        menu_item_form_item_fields.unregister(HrTag)
+
+    def test_custom_tag_in_section(self):
+        section = load_html(html_str='<section><p>Above</p>Text<hr/>Below</section>')
+        self.assertEqual('Above\nText\n-----\nBelow', section.render())
+
+        menu = Menu.from_tag(section)
+        self.assertEqual(['Above', 'Text', '-----', 'Below'],
+                         [item.description for item in menu.body])
+
+        menu_item_fields.register(HrTag)(lambda tag: ('', None, None, None))
+        menu = Menu.from_tag(section)
+        self.assertEqual(['Above', 'Text', 'Below'],
+                         [item.description for item in menu.body])
+
+    def test_custom_tag_in_form_menu(self):
+        menu_item_form_item_fields.register(HrTag)(lambda tag: ('===', None, None))
+        section = load_html(html_str='<form action="/"><section name="a"><hr/>'
+                                     '<ul><li value="1">One</li></ul></section></form>'
+                            ).children[0]
+        self.assertEqual(['===', 'One'],
+                         [item.description for item in FormItem.from_tag(section).body])
+
+    def test_unknown_section_child(self):
+        section_child_renderers.unregister(HrTag)
+        with self.assertRaises(ONEmSDKException) as context:
+            load_html(html_str='<section><hr/></section>')
+        self.assertEqual('<hr> cannot be child for <section>', str(context.exception))